@@ -0,0 +1,20 @@
+"""Add (user_id, created_at) index on responses for windowed performance stats
+
+Revision ID: 0b1c2d3e4f5a
+Revises: 9a0b1c2d3e4f
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0b1c2d3e4f5a'
+down_revision = '9a0b1c2d3e4f'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_responses_user_created', 'responses', ['user_id', 'created_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_responses_user_created', table_name='responses')
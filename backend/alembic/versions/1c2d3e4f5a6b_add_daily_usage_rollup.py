@@ -0,0 +1,31 @@
+"""Add daily_usage_rollup table and responses created_at index
+
+Revision ID: 1c2d3e4f5a6b
+Revises: 0b1c2d3e4f5a
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '1c2d3e4f5a6b'
+down_revision = '0b1c2d3e4f5a'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Rows are backfilled by the in-process rollup job on startup
+    op.create_table('daily_usage_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('active_users', sa.Integer(), nullable=False),
+    sa.Column('answers', sa.Integer(), nullable=False),
+    sa.Column('discipline_counts', sa.Text(), nullable=False),
+    sa.Column('user_sketch', sa.LargeBinary(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_index('ix_responses_created_at', 'responses', ['created_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_responses_created_at', table_name='responses')
+    op.drop_table('daily_usage_rollup')
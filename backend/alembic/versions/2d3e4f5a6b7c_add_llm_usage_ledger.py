@@ -0,0 +1,29 @@
+"""Add llm_usage_ledger table
+
+Revision ID: 2d3e4f5a6b7c
+Revises: 1c2d3e4f5a6b
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '2d3e4f5a6b7c'
+down_revision = '1c2d3e4f5a6b'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('llm_usage_ledger',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('operation', sa.String(), nullable=False),
+    sa.Column('calls', sa.Integer(), nullable=False),
+    sa.Column('tokens', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day', 'operation')
+    )
+
+def downgrade() -> None:
+    op.drop_table('llm_usage_ledger')
@@ -0,0 +1,36 @@
+"""Add question inventory flag and claim index (and the difficulty column it covers)
+
+Revision ID: 3a4b5c6d7e8f
+Revises: 2a3b4c5d6e7f
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3a4b5c6d7e8f'
+down_revision = '2a3b4c5d6e7f'
+branch_labels = None
+depends_on = None
+
+def _has_difficulty() -> bool:
+    # Databases started by the app before this revision already got it from the startup ALTERs
+    columns = sa.inspect(op.get_bind()).get_columns('questions')
+    return any(column['name'] == 'difficulty' for column in columns)
+
+def upgrade() -> None:
+    if not _has_difficulty():
+        op.add_column('questions', sa.Column('difficulty', sa.String(), nullable=True))
+    op.add_column('questions', sa.Column('in_inventory', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+    op.create_index(
+        'ix_questions_inventory',
+        'questions',
+        ['discipline', 'difficulty', 'id'],
+        unique=False,
+        postgresql_where=sa.text('in_inventory'),
+        sqlite_where=sa.text('in_inventory = 1'),
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_questions_inventory', table_name='questions')
+    op.drop_column('questions', 'in_inventory')
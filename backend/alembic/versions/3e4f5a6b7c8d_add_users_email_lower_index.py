@@ -0,0 +1,20 @@
+"""Add lower(email) index on users for case-insensitive roster matching
+
+Revision ID: 3e4f5a6b7c8d
+Revises: 2d3e4f5a6b7c
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '3e4f5a6b7c8d'
+down_revision = '2d3e4f5a6b7c'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,20 @@
+"""Add feedback_status to responses for deferred feedback
+
+Revision ID: 4b5c6d7e8f9a
+Revises: 3a4b5c6d7e8f
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '4b5c6d7e8f9a'
+down_revision = '3a4b5c6d7e8f'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('responses', sa.Column('feedback_status', sa.String(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('responses', 'feedback_status')
@@ -0,0 +1,36 @@
+"""Add feedback_cache table
+
+Revision ID: 5c6d7e8f9a0b
+Revises: 4b5c6d7e8f9a
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '5c6d7e8f9a0b'
+down_revision = '4b5c6d7e8f9a'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('feedback_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('answer_key', sa.String(), nullable=False),
+    sa.Column('question_hash', sa.String(), nullable=False),
+    sa.Column('feedback', sa.Text(), nullable=False),
+    sa.Column('hit_count', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('question_id', 'answer_key', name='uq_feedback_cache_question_answer')
+    )
+    op.create_index(op.f('ix_feedback_cache_id'), 'feedback_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_feedback_cache_last_used_at'), 'feedback_cache', ['last_used_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_feedback_cache_last_used_at'), table_name='feedback_cache')
+    op.drop_index(op.f('ix_feedback_cache_id'), table_name='feedback_cache')
+    op.drop_table('feedback_cache')
@@ -0,0 +1,22 @@
+"""Add indexes for adaptive question selection
+
+Revision ID: 6d7e8f9a0b1c
+Revises: 5c6d7e8f9a0b
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '6d7e8f9a0b1c'
+down_revision = '5c6d7e8f9a0b'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_questions_selection', 'questions', ['discipline', 'difficulty', 'question_type', 'id'], unique=False)
+    op.create_index('ix_responses_user_question', 'responses', ['user_id', 'question_id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_responses_user_question', table_name='responses')
+    op.drop_index('ix_questions_selection', table_name='questions')
@@ -0,0 +1,38 @@
+"""Add review_cards table for spaced-repetition reviews
+
+Revision ID: 7e8f9a0b1c2d
+Revises: 6d7e8f9a0b1c
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '7e8f9a0b1c2d'
+down_revision = '6d7e8f9a0b1c'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table('review_cards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('repetitions', sa.Integer(), nullable=False),
+    sa.Column('interval_days', sa.Float(), nullable=False),
+    sa.Column('ease_factor', sa.Float(), nullable=False),
+    sa.Column('lapses', sa.Integer(), nullable=False),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('last_reviewed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'question_id', name='uq_review_cards_user_question')
+    )
+    op.create_index(op.f('ix_review_cards_id'), 'review_cards', ['id'], unique=False)
+    op.create_index('ix_review_cards_user_due', 'review_cards', ['user_id', 'due_at'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_review_cards_user_due', table_name='review_cards')
+    op.drop_index(op.f('ix_review_cards_id'), table_name='review_cards')
+    op.drop_table('review_cards')
@@ -0,0 +1,59 @@
+"""Add question_tags table and populate it from the JSON tag columns
+
+Revision ID: 8f9a0b1c2d3e
+Revises: 7e8f9a0b1c2d
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '8f9a0b1c2d3e'
+down_revision = '7e8f9a0b1c2d'
+branch_labels = None
+depends_on = None
+
+TAG_DIMENSIONS = ('disciplines', 'body_systems', 'specialties', 'pathophysiology')
+CHUNK_SIZE = 1000
+
+def upgrade() -> None:
+    question_tags = op.create_table('question_tags',
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('question_id', 'dimension', 'value')
+    )
+    op.create_index('ix_question_tags_dimension_value', 'question_tags', ['dimension', 'value', 'question_id'], unique=False)
+
+    # Data migration: one row per value in the JSON tag columns, read in id order
+    questions = sa.table('questions', sa.column('id', sa.Integer), *[sa.column(d, sa.Text) for d in TAG_DIMENSIONS])
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(questions).where(questions.c.id > last_id).order_by(questions.c.id).limit(CHUNK_SIZE)
+        ).mappings().all()
+        if not rows:
+            break
+        tags = []
+        for row in rows:
+            for dimension in TAG_DIMENSIONS:
+                try:
+                    values = json.loads(row[dimension] or '[]')
+                except ValueError:
+                    continue
+                if isinstance(values, list):
+                    tags.extend(
+                        {'question_id': row['id'], 'dimension': dimension, 'value': value}
+                        for value in dict.fromkeys(v for v in values if isinstance(v, str) and v)
+                    )
+        if tags:
+            op.bulk_insert(question_tags, tags)
+        last_id = rows[-1]['id']
+
+def downgrade() -> None:
+    op.drop_index('ix_question_tags_dimension_value', table_name='question_tags')
+    op.drop_table('question_tags')
@@ -0,0 +1,31 @@
+"""Add user_category_stats rollup table
+
+Revision ID: 9a0b1c2d3e4f
+Revises: 8f9a0b1c2d3e
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '9a0b1c2d3e4f'
+down_revision = '8f9a0b1c2d3e'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Rows are filled lazily per user on first read or answer, or up front with
+    # python -m backend.cli.rebuild_category_stats
+    op.create_table('user_category_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(), nullable=False),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('correct', sa.Integer(), nullable=False),
+    sa.Column('last_answered_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'dimension', 'category')
+    )
+
+def downgrade() -> None:
+    op.drop_table('user_category_stats')
@@ -3,22 +3,38 @@ from sqlalchemy.orm import Session
 
 from backend.database import get_db
 from backend.models import User
-from backend.auth.jwt import oauth2_scheme, verify_token
+from backend.auth.jwt import oauth2_scheme
+from backend.auth.principal import Principal, principal_cache
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    """
-    A dependency to validate the JWT and return the authenticated user's data.
-    """
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    user_id = verify_token(token, credentials_exception)
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """
+    A dependency to validate the JWT and return the authenticated user's data.
+
+    The user is loaded only when the principal cache misses; the session stays unused
+    (no connection checkout) on a hit.
+    """
+    credentials_exception = _credentials_exception()
+    try:
+        claims = principal_cache.claims(token, credentials_exception)
+        principal = principal_cache.principal(claims, lambda user_id: db.get(User, user_id))
+    except ValueError:
+        raise credentials_exception
+    if principal is None:
         raise credentials_exception
         
-    return user
\ No newline at end of file
+    return principal
+
+def get_current_user_id(principal: Principal = Depends(get_current_user)) -> int:
+    """
+    The authenticated user's id, for routes that need nothing else (e.g. analytics answered
+    from cache). Goes through the principal cache, so a warm request still runs no query
+    while deleted users are turned away like in get_current_user.
+    """
+    return principal.id
@@ -1,128 +1,99 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
 
 from backend import schemas
 from backend.database import get_db
-from backend.models import User, Response, Question
-from backend.api.dependencies import get_current_user
+from backend.auth.principal import Principal
+from backend.api.dependencies import get_current_user, get_current_user_id
 from backend.services.test_data_service import get_demo_analytics_data
 from backend.services.analytics_service import analytics_service
+from backend.services.category_stats import category_performance
+from backend.services.analytics_cache import analytics_cache
 
 router = APIRouter()
 
-def _extract_categories_from_question(question: Question, group_by: str) -> list:
-    """Extract categories from a question based on the grouping dimension"""
-    import json
-    
-    try:
-        if group_by == "disciplines":
-            if question.disciplines and question.disciplines.strip():
-                parsed = json.loads(question.disciplines)
-                return parsed if parsed else [question.discipline or "General Medicine"]
-            return [question.discipline or "General Medicine"]
-            
-        elif group_by == "body_systems":
-            if question.body_systems and question.body_systems.strip():
-                parsed = json.loads(question.body_systems)
-                return parsed if parsed else ["General"]
-            return ["General"]
-            
-        elif group_by == "specialties":
-            if question.specialties and question.specialties.strip():
-                parsed = json.loads(question.specialties)
-                return parsed if parsed else ["General Medicine"]
-            return ["General Medicine"]
-            
-        elif group_by == "pathophysiology":
-            if question.pathophysiology and question.pathophysiology.strip():
-                parsed = json.loads(question.pathophysiology)
-                return parsed if parsed else ["Unknown"]
-            return ["Unknown"]
-            
-        elif group_by == "question_type":
-            return [question.question_type] if question.question_type else ["Unknown"]
-            
-        elif group_by == "age_group":
-            return [question.age_group] if question.age_group else ["Unknown"]
-            
-        elif group_by == "acuity":
-            return [question.acuity] if question.acuity else ["Unknown"]
-            
-        else:
-            # Default to disciplines
-            if question.disciplines and question.disciplines.strip():
-                parsed = json.loads(question.disciplines)
-                return parsed if parsed else [question.discipline or "General Medicine"]
-            return [question.discipline or "General Medicine"]
-            
-    except Exception as e:
-        # Fallback on any JSON parsing error
-        print(f"Error parsing categories for group_by={group_by}: {e}")
-        return [question.discipline or "General Medicine"]
+def _cached(user_id: int, endpoint: str, params: Dict, if_none_match: Optional[str], compute: Callable[[], object]):
+    """
+    Serve an analytics payload through the versioned cache: 304 when the client's
+    ETag is still current (no database access), the cached body on a hit, and the
+    freshly computed body on a miss. Every response carries the ETag.
+    """
+    if not analytics_cache.enabled:
+        return compute()
+
+    etag, not_modified, body = analytics_cache.lookup(user_id, endpoint, params, if_none_match)
+    if etag is None:
+        return compute()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body = jsonable_encoder(compute())
+        analytics_cache.store(etag, body)
+    return JSONResponse(body, headers=headers)
 
 @router.get("/summary", response_model=schemas.AnalyticsSummary)
 def get_analytics_summary(
-    current_user: User = Depends(get_current_user),
+    user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db),
     useTestData: bool = False,
-    group_by: str = "disciplines"
+    group_by: str = "disciplines",
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Returns a performance summary for the authenticated user,
-    grouped by specified taxonomy dimension.
+    grouped by specified taxonomy dimension. Served from the per-user
+    category rollup, so the cost doesn't grow with the answer history,
+    and cached per user until their next answer.
     """
     if useTestData:
         return get_demo_analytics_data(group_by)
 
-    # Get all user responses with their question details
-    user_responses = db.query(Response, Question).join(
-        Question, Response.question_id == Question.id
-    ).filter(
-        Response.user_id == current_user.id
-    ).all()
-
-    # Aggregate stats by the selected grouping dimension
-    category_stats = {}
-    
-    for response, question in user_responses:
-        categories = _extract_categories_from_question(question, group_by)
-        
-        # Count stats for each category this question belongs to
-        for category in categories:
-            if category not in category_stats:
-                category_stats[category] = {"total": 0, "correct": 0}
-            
-            category_stats[category]["total"] += 1
-            if response.is_correct:
-                category_stats[category]["correct"] += 1
+    def compute():
+        performance_by_discipline = [
+            schemas.DisciplinePerformance(
+                discipline=category,
+                total_answered=total,
+                correct_count=correct or 0,
+                accuracy=((correct or 0) / total) if total > 0 else 0
+            ) for category, total, correct in category_performance(db, user_id, group_by)
+        ]
+        return {"performance_by_discipline": performance_by_discipline}
 
-    performance_by_discipline = [
-        schemas.DisciplinePerformance(
-            discipline=category,
-            total_answered=stats["total"],
-            correct_count=stats["correct"],
-            accuracy=(stats["correct"] / stats["total"]) if stats["total"] > 0 else 0
-        ) for category, stats in category_stats.items()
-    ]
-
-    return {"performance_by_discipline": performance_by_discipline}
+    return _cached(user_id, "summary", {"group_by": group_by}, if_none_match, compute)
 
 @router.get("/detailed")
 def get_detailed_analytics(
     days: int = 30,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
-    Get comprehensive user performance analytics with logging data.
+    Get comprehensive user performance analytics with logging data, for the last
+    `days` days or an explicit [start, end) window.
     """
-    return analytics_service.get_user_performance_stats(current_user.id, db, days)
+    # An open-ended window moves with the clock, so its entries only hold for the day
+    as_of = datetime.utcnow().date() if end is None else None
+    return _cached(user_id, "detailed", {"days": days, "start": start, "end": end, "as_of": as_of}, if_none_match,
+                   lambda: analytics_service.get_user_performance_stats(user_id, db, days, start=start, end=end))
+
+@router.get("/cache-stats")
+def get_analytics_cache_stats(user_id: int = Depends(get_current_user_id)):
+    """Analytics response cache counters (monitoring endpoint)."""
+    return analytics_cache.stats()
 
 @router.get("/system-stats")
 def get_system_statistics(
     days: int = 30,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
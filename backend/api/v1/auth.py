@@ -1,5 +1,8 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -8,12 +11,20 @@ from authlib.integrations.starlette_client import OAuth
 from backend import schemas
 from backend.models import Identity, SSOConfiguration
 from backend.database import get_db
-from backend.services.user_service import get_or_create_user_from_identity
-from backend.auth.password import get_password_hash, verify_password
+from backend.services.user_service import RosterProvisioner, get_or_create_user_from_identity
+from backend.auth.password import PasswordHashingError, get_password_hash, verify_and_update_password
 from backend.auth.jwt import create_access_token
 
 router = APIRouter()
 
+def _hashing_busy(error: PasswordHashingError) -> HTTPException:
+    # 429 when the hashing queue is saturated, 503 while a crashed pool is being replaced
+    return HTTPException(
+        status_code=error.status_code,
+        detail="Too many sign-in attempts right now, please retry shortly.",
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
 oauth = OAuth()
 oauth.register(
     name='google',
@@ -36,6 +47,12 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
             detail="An account with this email already exists.",
         )
     
+    # Hash before creating the user, so a rejected request leaves nothing half-created
+    try:
+        hashed_password = get_password_hash(user.password)
+    except PasswordHashingError as e:
+        raise _hashing_busy(e)
+
     new_user = get_or_create_user_from_identity(
         db=db,
         provider="password",
@@ -44,7 +61,6 @@ def signup(user: schemas.UserCreate, db: Session = Depends(get_db)):
         name=user.name
     )
 
-    hashed_password = get_password_hash(user.password)
     identity = db.query(Identity).filter(Identity.user_id == new_user.id, Identity.provider == "password").first()
     identity.password_hash = hashed_password
     db.commit()
@@ -58,13 +74,25 @@ def login(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm =
         Identity.provider_user_id == form_data.username
     ).first()
 
-    if not identity or not identity.password_hash or not verify_password(form_data.password, identity.password_hash):
+    valid, new_hash = False, None
+    if identity and identity.password_hash:
+        try:
+            valid, new_hash = verify_and_update_password(form_data.password, identity.password_hash)
+        except PasswordHashingError as e:
+            raise _hashing_busy(e)
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # Hashed with outdated parameters; upgrade transparently now that the password is known
+        identity.password_hash = new_hash
+        db.commit()
+
     access_token = create_access_token(data={"sub": str(identity.user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -110,4 +138,47 @@ def sso_login(email: schemas.EmailStr, db: Session = Depends(get_db)):
 
 @router.post("/sso/callback")
 def sso_callback(request: Request):
-    return {"message": "SSO callback received. User would be processed here."}
\ No newline at end of file
+    return {"message": "SSO callback received. User would be processed here."}
+
+def _check_provisioning_key(provided: Optional[str]):
+    expected = os.getenv("SSO_PROVISIONING_API_KEY")
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Bulk provisioning is not configured.")
+    if not provided or not hmac.compare_digest(provided.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid provisioning key.")
+
+def _active_sso_config(db: Session, domain: str) -> SSOConfiguration:
+    sso_config = db.query(SSOConfiguration).filter(SSOConfiguration.domain == domain.lower()).first()
+    if not sso_config or not sso_config.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No active SSO configuration for this institution."
+        )
+    return sso_config
+
+@router.post("/sso/{domain}/provision")
+async def provision_sso_users(
+    domain: str,
+    request: Request,
+    x_provisioning_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or link users for an institution's roster, streamed as the request body.
+
+    Send text/csv (header row with email, name and optional external_id) or
+    application/x-ndjson (one {"email", "name", "external_id"} object per line).
+    Returns created/linked/skipped/invalid counts; batches already committed stay
+    committed if a later one fails.
+    """
+    _check_provisioning_key(x_provisioning_key)
+    sso_config = await run_in_threadpool(_active_sso_config, db, domain)
+
+    fmt = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    provisioner = RosterProvisioner(db, sso_config, fmt)
+    async for chunk in request.stream():
+        for batch in provisioner.feed(chunk):
+            await run_in_threadpool(provisioner.provision, batch)
+    for batch in provisioner.finish():
+        await run_in_threadpool(provisioner.provision, batch)
+    return provisioner.report()
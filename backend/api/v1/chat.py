@@ -1,180 +1,596 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import json
 import logging
+from typing import Dict, List, Optional
 
 from backend import schemas
 from backend.database import get_db
-from backend.models import User, Question, Response
-from backend.api.dependencies import get_current_user
-from backend.services.openai_service import OpenAIService
+from backend.models import Question, Response
+from backend.api.dependencies import get_current_user, get_current_user_id
+from backend.auth.principal import Principal
+from backend.services.openai_service import get_openai_service, FEEDBACK_UNAVAILABLE
+from backend.services.feedback_service import (
+    feedback_service,
+    feedback_status_for,
+    FEEDBACK_PENDING,
+    FEEDBACK_READY,
+    FEEDBACK_FAILED,
+    BUDGET_FEEDBACK
+)
 from backend.services.tagging_service import get_tagging_service
+from backend.services.question_service import build_question, tag_question_data_async
+from backend.services.question_tags import record_question_tags
+from backend.services.question_inventory import question_inventory
+from backend.services.question_coalescer import question_coalescer
+from backend.services.question_selector import question_selector
+from backend.services.review_scheduler import review_scheduler
+from backend.services import category_stats
+from backend.services.analytics_cache import analytics_cache
+from backend.services.resilience import breaker_states
+from backend.services.metrics import record_fallback
+from backend.services.llm_usage import llm_usage
 
 logger = logging.getLogger(__name__)
-openai_service = OpenAIService()
+openai_service = get_openai_service()
 
 router = APIRouter()
 
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/test")
-def test_endpoint(current_user: User = Depends(get_current_user)):
+def test_endpoint(user_id: int = Depends(get_current_user_id)):
     """Test endpoint to verify auth and basic functionality"""
-    return {"message": "Chat API is working", "user_id": current_user.id}
+    return {"message": "Chat API is working", "user_id": user_id}
 
-@router.get("/question", response_model=schemas.Question)
-def get_next_question(
-    specialty: str = "General Medicine",
-    difficulty: str = "Intermediate", 
-    current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db)
-):
+def _serve_stored_question(db: Session, specialty: str, difficulty: str, current_user: Principal):
     """
-    Generate a new clinical question using Azure OpenAI or return existing question.
+    Serve an unseen question from the bank, else claim a stocked inventory question;
+    returns None when both are empty and a new question has to be generated. The bank
+    goes first on purpose: a claim is what tells the inventory that the bank can no
+    longer serve the pair, and only claimed pairs are restocked.
     """
+    question = question_selector.select(db, current_user.id, specialty, difficulty)
+    if question is not None:
+        return question
+
+    question = question_inventory.claim(db, specialty, difficulty)
+    if question is not None:
+        db.refresh(question)
+        logger.info(f"Served inventory question {question.id} to user {current_user.id} - Specialty: {specialty}, Difficulty: {difficulty}")
+    return question
+
+def _llm_unavailable(specialty: str, difficulty: str) -> bool:
+    """True while the provider's circuit breaker is open, so routes skip generation entirely"""
+    if openai_service.resilience.available():
+        return False
+    logger.warning(f"LLM circuit open, serving fallback question - Specialty: {specialty}, Difficulty: {difficulty}")
+    return True
+
+def _over_budget(db: Session, current_user: Principal) -> bool:
+    """True once the user has spent their daily LLM tokens; routes then serve without LLM calls"""
+    return llm_usage.over_budget(db, current_user.id)
+
+def _stream_tokens(usage: Dict, content: str) -> int:
+    """Tokens a finished stream used: the provider's count, else ~4 characters per token of output"""
+    return usage.get("tokens_used") or len(content) // 4
+
+def _store_generated_question(db: Session, question: Question, current_user: Principal, specialty: str, difficulty: str) -> Question:
+    """Persist a freshly generated question and charge its generation and tagging tokens to the user"""
+    tokens_used = getattr(question, "tokens_used", 0)
+    tagging_tokens_used = getattr(question, "tagging_tokens_used", 0)
+    db.add(question)
+    record_question_tags(db, [question])
+    db.commit()
+    db.refresh(question)
+    llm_usage.record(db, current_user.id, "question", tokens_used)
+    if tagging_tokens_used:
+        llm_usage.record(db, current_user.id, "tagging", tagging_tokens_used)
+    
+    # Log question generation for analytics
+    logger.info(f"Generated question {question.id} for user {current_user.id} - Specialty: {specialty}, Difficulty: {difficulty}")
+    
+    return question
+
+def _fallback_question(db: Session, specialty: str, difficulty: str, current_user: Principal,
+                       reason: str = "generation_error") -> Question:
+    """Return an existing question for the specialty, creating a templated one if none exists"""
+    record_fallback("question", reason)
+    # Fallback to an existing question first: unseen at any difficulty, else any in the specialty
+    existing_question = question_selector.select(db, current_user.id, specialty, difficulty=None)
+    if existing_question is None:
+        existing_question = db.query(Question).filter(
+            Question.discipline == specialty,
+            Question.in_inventory == False
+        ).order_by(func.random()).first()
+    if existing_question:
+        logger.info(f"Returning existing question {existing_question.id} for user {current_user.id}")
+        return existing_question
+    
+    # If no existing question, create a fallback
     try:
-        # Try to generate new question using OpenAI first
-        logger.info(f"Attempting to generate question for specialty: {specialty}, difficulty: {difficulty}")
-        question_data = openai_service.generate_clinical_question(
-            specialty=specialty,
-            difficulty=difficulty
-        )
-        logger.info(f"Successfully generated question: {question_data.get('question', 'N/A')[:100]}...")
+        fallback_content = f"Sample {specialty} clinical question: A patient presents with symptoms related to {specialty.lower()}. What is the most appropriate next diagnostic step?"
+        fallback_options = {"A": "Order basic lab work", "B": "Perform physical examination", "C": "Order imaging study", "D": "Refer to specialist"}
         
-        # Tag the question using AI
+        # Tag the fallback question
         try:
             tagging_service = get_tagging_service()
-            tags = tagging_service.tag_question(
-                question_content=question_data["question"],
-                question_options=question_data["options"]
+            fallback_tags = tagging_service.tag_question(
+                question_content=fallback_content,
+                question_options=fallback_options
             )
-            logger.info(f"Question tagged successfully: {tags}")
-        except Exception as tag_error:
-            logger.error(f"Error tagging question: {str(tag_error)}")
-            tags = {}
-
-        # Store in database with structured tags
-        question = Question(
-            content=question_data["question"],
-            discipline=question_data["specialty"],  # Legacy field
-            options=json.dumps(question_data["options"]),
-            correct_answer=question_data["correct_answer"],
-            explanation=question_data["explanation"],
-            difficulty=question_data["difficulty"],
-            topics=json.dumps(question_data.get("topics", [])),  # Legacy field
+        except Exception:
+            fallback_tags = {}
+        
+        fallback_question = Question(
+            content=fallback_content,
+            discipline=specialty,  # Legacy field
+            options=json.dumps(fallback_options),
+            correct_answer="B",
+            explanation="A thorough physical examination is always an appropriate initial step in patient evaluation.",
+            difficulty=difficulty,
+            topics='["Clinical Assessment", "Diagnostic Approach"]',  # Legacy field
             
             # New structured taxonomy fields
-            disciplines=json.dumps(tags.get("disciplines", [])),
-            body_systems=json.dumps(tags.get("body_systems", [])),
-            specialties=json.dumps(tags.get("specialties", [])),
-            question_type=tags.get("question_type"),
-            age_group=tags.get("age_group"),
-            acuity=tags.get("acuity"),
-            pathophysiology=json.dumps(tags.get("pathophysiology", []))
+            disciplines=json.dumps(fallback_tags.get("disciplines", [specialty.lower().replace(" ", "_")])),
+            body_systems=json.dumps(fallback_tags.get("body_systems", ["general"])),
+            specialties=json.dumps(fallback_tags.get("specialties", ["internal_medicine"])),
+            question_type=fallback_tags.get("question_type", "diagnosis"),
+            age_group=fallback_tags.get("age_group", "adult"),
+            acuity=fallback_tags.get("acuity", "routine"),
+            pathophysiology=json.dumps(fallback_tags.get("pathophysiology", []))
         )
-        db.add(question)
+        db.add(fallback_question)
+        record_question_tags(db, [fallback_question])
         db.commit()
-        db.refresh(question)
+        db.refresh(fallback_question)
+        if fallback_tags.get("tokens_used"):
+            llm_usage.record(db, current_user.id, "tagging", fallback_tags["tokens_used"])
         
-        # Log question generation for analytics
-        logger.info(f"Generated question {question.id} for user {current_user.id} - Specialty: {specialty}, Difficulty: {difficulty}")
+        logger.info(f"Created fallback question {fallback_question.id} for user {current_user.id}")
+        return fallback_question
         
+    except Exception as db_error:
+        logger.error(f"Database error creating fallback question: {str(db_error)}")
+        raise HTTPException(status_code=500, detail="Unable to generate or retrieve question")
+
+@router.get("/question", response_model=schemas.Question)
+def get_next_question(
+    specialty: str = "General Medicine",
+    difficulty: str = "Intermediate", 
+    current_user: Principal = Depends(get_current_user), 
+    db: Session = Depends(get_db)
+):
+    """
+    Serve an unseen question from the bank, weighted towards the user's weak question
+    types, or a pre-generated one from the inventory; generate one with Azure OpenAI
+    only when both are empty, falling back to an existing question on errors.
+    """
+    # Serve an unseen bank question or a pre-generated inventory question when there is one
+    question = _serve_stored_question(db, specialty, difficulty, current_user)
+    if question is not None:
         return question
+
+    if _llm_unavailable(specialty, difficulty):
+        return _fallback_question(db, specialty, difficulty, current_user, reason="circuit_open")
+    if _over_budget(db, current_user):
+        return _fallback_question(db, specialty, difficulty, current_user, reason="budget")
+
+    try:
+        # Nothing stored to serve: generate and tag a new question inline, sharing the call with concurrent requests
+        logger.info(f"Attempting to generate question for specialty: {specialty}, difficulty: {difficulty}")
+        question = question_coalescer.generate(specialty, difficulty)
+        return _store_generated_question(db, question, current_user, specialty, difficulty)
         
     except Exception as e:
         logger.error(f"Error generating question with OpenAI: {str(e)}")
-        
-        # Fallback to existing question first
-        existing_question = db.query(Question).filter(Question.discipline == specialty).first()
-        if existing_question:
-            logger.info(f"Returning existing question {existing_question.id} for user {current_user.id}")
-            return existing_question
-        
-        # If no existing question, create a fallback
+        return _fallback_question(db, specialty, difficulty, current_user)
+
+@router.get("/question/async", response_model=schemas.Question)
+async def get_next_question_async(
+    specialty: str = "General Medicine",
+    difficulty: str = "Intermediate",
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Async variant of get_next_question. LLM calls are awaited on the event loop (the
+    coalescer runs flights started here as tasks), so only the short database steps
+    occupy a threadpool thread.
+    """
+    question = await run_in_threadpool(_serve_stored_question, db, specialty, difficulty, current_user)
+    if question is not None:
+        return question
+
+    if _llm_unavailable(specialty, difficulty):
+        return await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user, "circuit_open")
+    if await run_in_threadpool(_over_budget, db, current_user):
+        return await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user, "budget")
+
+    try:
+        logger.info(f"Attempting to generate question for specialty: {specialty}, difficulty: {difficulty}")
+        question = await question_coalescer.generate_async(specialty, difficulty)
+        return await run_in_threadpool(_store_generated_question, db, question, current_user, specialty, difficulty)
+
+    except Exception as e:
+        logger.error(f"Error generating question with OpenAI: {str(e)}")
+        return await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user)
+
+@router.get("/question/stream")
+async def stream_next_question(
+    specialty: str = "General Medicine",
+    difficulty: str = "Intermediate",
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events variant of get_next_question.
+
+    Emits `token` events with the raw completion as it is generated, then a single
+    `question` event with the stored question. Bank, inventory and fallback questions emit the
+    `question` event straight away.
+
+    Generation here is not coalesced: each client watches its own completion being
+    written, which a shared batch call cannot stream. Bursts should use /question/async.
+    """
+    async def events():
         try:
-            fallback_content = f"Sample {specialty} clinical question: A patient presents with symptoms related to {specialty.lower()}. What is the most appropriate next diagnostic step?"
-            fallback_options = {"A": "Order basic lab work", "B": "Perform physical examination", "C": "Order imaging study", "D": "Refer to specialist"}
-            
-            # Tag the fallback question
-            try:
-                tagging_service = get_tagging_service()
-                fallback_tags = tagging_service.tag_question(
-                    question_content=fallback_content,
-                    question_options=fallback_options
-                )
-            except Exception:
-                fallback_tags = {}
-            
-            fallback_question = Question(
-                content=fallback_content,
-                discipline=specialty,  # Legacy field
-                options=json.dumps(fallback_options),
-                correct_answer="B",
-                explanation="A thorough physical examination is always an appropriate initial step in patient evaluation.",
-                difficulty=difficulty,
-                topics='["Clinical Assessment", "Diagnostic Approach"]',  # Legacy field
-                
-                # New structured taxonomy fields
-                disciplines=json.dumps(fallback_tags.get("disciplines", [specialty.lower().replace(" ", "_")])),
-                body_systems=json.dumps(fallback_tags.get("body_systems", ["general"])),
-                specialties=json.dumps(fallback_tags.get("specialties", ["internal_medicine"])),
-                question_type=fallback_tags.get("question_type", "diagnosis"),
-                age_group=fallback_tags.get("age_group", "adult"),
-                acuity=fallback_tags.get("acuity", "routine"),
-                pathophysiology=json.dumps(fallback_tags.get("pathophysiology", []))
-            )
-            db.add(fallback_question)
-            db.commit()
-            db.refresh(fallback_question)
-            
-            logger.info(f"Created fallback question {fallback_question.id} for user {current_user.id}")
-            return fallback_question
-            
-        except Exception as db_error:
-            logger.error(f"Database error creating fallback question: {str(db_error)}")
-            raise HTTPException(status_code=500, detail="Unable to generate or retrieve question")
+            question = await run_in_threadpool(_serve_stored_question, db, specialty, difficulty, current_user)
+            if question is None and _llm_unavailable(specialty, difficulty):
+                question = await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user, "circuit_open")
+            if question is None and await run_in_threadpool(_over_budget, db, current_user):
+                question = await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user, "budget")
+            if question is None:
+                try:
+                    content, usage = "", {}
+                    async for delta in openai_service.stream_clinical_question(specialty=specialty, difficulty=difficulty,
+                                                                               usage=usage):
+                        content += delta
+                        yield _sse("token", {"delta": delta})
+
+                    question_data = openai_service.parse_question_content(content)
+                    tags = await tag_question_data_async(question_data)
+                    question = build_question(question_data, tags, specialty=specialty, difficulty=difficulty)
+                    question.tokens_used = _stream_tokens(usage, content)
+                    question = await run_in_threadpool(_store_generated_question, db, question, current_user, specialty, difficulty)
+
+                except Exception as e:
+                    logger.error(f"Error streaming question generation: {str(e)}")
+                    question = await run_in_threadpool(_fallback_question, db, specialty, difficulty, current_user)
+
+            yield _sse("question", schemas.Question.model_validate(question).model_dump())
+        except HTTPException as e:
+            yield _sse("error", {"detail": e.detail})
+
+    return _event_stream_response(events())
+
+@router.get("/review/next", response_model=List[schemas.Question])
+def get_next_review(
+    limit: int = Query(1, ge=1, le=20),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Pop the user's due spaced-repetition reviews: questions they have already answered,
+    served again at no LLM cost. Returns an empty list when nothing is due.
+    """
+    return review_scheduler.pop_due(db, current_user.id, limit)
+
+@router.get("/usage")
+def get_llm_usage(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Today's LLM token usage and remaining daily budget for the current user."""
+    return llm_usage.usage(db, current_user.id)
+
+@router.get("/inventory")
+def get_inventory_stats(user_id: int = Depends(get_current_user_id)):
+    """Question inventory depth and hit/miss counters (monitoring endpoint)."""
+    return question_inventory.stats()
+
+@router.get("/coalescing")
+def get_coalescing_stats(user_id: int = Depends(get_current_user_id)):
+    """Request coalescing counters for inline question generation (monitoring endpoint)."""
+    return question_coalescer.stats()
+
+@router.get("/selection")
+def get_selection_stats(user_id: int = Depends(get_current_user_id)):
+    """Adaptive bank selection counters (monitoring endpoint)."""
+    return question_selector.stats()
+
+@router.get("/llm-status")
+def get_llm_status(user_id: int = Depends(get_current_user_id)):
+    """Circuit breaker state per LLM provider (monitoring endpoint)."""
+    return breaker_states()
+
+@router.get("/feedback-cache")
+def get_feedback_cache_stats(user_id: int = Depends(get_current_user_id)):
+    """Feedback cache hit/miss counters (monitoring endpoint)."""
+    return feedback_service.cache.stats()
+
+def _get_question_or_404(db: Session, question_id: int) -> Question:
+    question = db.query(Question).filter(Question.id == question_id).first()
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    return question
+
+def _store_response(db: Session, current_user: Principal, question: Question, user_answer: str,
+                    is_answer_correct: bool, feedback: Optional[str],
+                    feedback_status: str = FEEDBACK_READY) -> int:
+    """Persist the user's response and return its id"""
+    # Before the response is added, so a first-time rollup rebuild doesn't count it twice
+    category_stats.record_answer(db, current_user.id, question, is_answer_correct)
+    response = Response(
+        user_id=current_user.id,
+        question_id=question.id,
+        user_answer=user_answer,
+        is_correct=is_answer_correct,
+        feedback=feedback,
+        feedback_status=feedback_status
+    )
+    db.add(response)
+    # Reschedule the question's review card in the same transaction as the response
+    review_scheduler.record_answer(db, current_user.id, question.id, is_answer_correct)
+    db.flush()
+    response_id = response.id
+    db.commit()
+    analytics_cache.bump(current_user.id)
+    
+    # Log answer submission for analytics
+    logger.info(f"User {current_user.id} answered question {question.id} - Correct: {is_answer_correct}")
+    return response_id
+
+def _defer_feedback(answer_in: schemas.AnswerCreate) -> bool:
+    if answer_in.defer_feedback is not None:
+        return answer_in.defer_feedback
+    return feedback_service.deferred_by_default
+
+def _answer_result(is_answer_correct: bool, correct_answer: str, explanation: Optional[str], question_id: int,
+                   response_id: int, feedback: Optional[str], feedback_status: str) -> dict:
+    return {
+        "status": "Answer submitted",
+        "is_correct": is_answer_correct,
+        "correct_answer": correct_answer,
+        "explanation": explanation,
+        "personalized_feedback": feedback,
+        "question_id": question_id,
+        "response_id": response_id,
+        "feedback_status": feedback_status
+    }
 
 @router.post("/answer")
 def submit_answer(
     answer_in: schemas.AnswerCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Submit and evaluate user's answer to a question with AI feedback.
+
+    With `defer_feedback` the response is committed and returned straight away and the
+    feedback is generated in the background; poll GET /answer/{response_id}/feedback for it.
     """
-    question = db.query(Question).filter(Question.id == answer_in.question_id).first()
-    if not question:
-        raise HTTPException(status_code=404, detail="Question not found")
+    question = _get_question_or_404(db, answer_in.question_id)
 
     # Check if answer is correct
     is_answer_correct = answer_in.user_answer.upper() == question.correct_answer.upper()
+
+    if _defer_feedback(answer_in):
+        response_id = _store_response(db, current_user, question, answer_in.user_answer, is_answer_correct,
+                                      None, FEEDBACK_PENDING)
+        feedback_service.submit(response_id)
+        return _answer_result(is_answer_correct, question.correct_answer, question.explanation, question.id,
+                              response_id, None, FEEDBACK_PENDING)
     
     # Generate personalized feedback using AI
-    feedback_data = openai_service.evaluate_answer(
+    feedback_data = feedback_service.generate_feedback(
         question=question.content,
         correct_answer=question.correct_answer,
         user_answer=answer_in.user_answer,
-        explanation=question.explanation or ""
+        explanation=question.explanation,
+        question_id=question.id,
+        db=db,
+        allow_llm=not _over_budget(db, current_user)
     )
+    if feedback_data.get("tokens_used"):
+        llm_usage.record(db, current_user.id, "feedback", feedback_data["tokens_used"])
+    feedback = feedback_data.get("feedback", "")
+    feedback_status = feedback_status_for(feedback_data)
 
     # Store response in database
-    response = Response(
-        user_id=current_user.id,
-        question_id=answer_in.question_id,
+    response_id = _store_response(db, current_user, question, answer_in.user_answer, is_answer_correct,
+                                  feedback, feedback_status)
+
+    return _answer_result(is_answer_correct, question.correct_answer, question.explanation, question.id,
+                          response_id, feedback, feedback_status)
+
+@router.post("/answer/async")
+async def submit_answer_async(
+    answer_in: schemas.AnswerCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Async variant of submit_answer; the feedback completion is awaited on the event loop.
+    """
+    question = await run_in_threadpool(_get_question_or_404, db, answer_in.question_id)
+
+    # Read everything needed up front so nothing lazy-loads on the event loop after commit
+    question_id = question.id
+    question_content = question.content
+    correct_answer = question.correct_answer
+    explanation = question.explanation
+    is_answer_correct = answer_in.user_answer.upper() == correct_answer.upper()
+
+    if _defer_feedback(answer_in):
+        response_id = await run_in_threadpool(
+            _store_response, db, current_user, question, answer_in.user_answer,
+            is_answer_correct, None, FEEDBACK_PENDING
+        )
+        feedback_service.submit(response_id)
+        return _answer_result(is_answer_correct, correct_answer, explanation, question_id,
+                              response_id, None, FEEDBACK_PENDING)
+
+    feedback_data = await feedback_service.generate_feedback_async(
+        question=question_content,
+        correct_answer=correct_answer,
         user_answer=answer_in.user_answer,
-        is_correct=is_answer_correct,
-        feedback=feedback_data.get("feedback", "")
+        explanation=explanation,
+        question_id=question_id,
+        db=db,
+        allow_llm=not await run_in_threadpool(_over_budget, db, current_user)
     )
-    db.add(response)
-    db.commit()
-    
-    # Log answer submission for analytics
-    logger.info(f"User {current_user.id} answered question {question.id} - Correct: {is_answer_correct}")
+    if feedback_data.get("tokens_used"):
+        await run_in_threadpool(llm_usage.record, db, current_user.id, "feedback", feedback_data["tokens_used"])
+    feedback = feedback_data.get("feedback", "")
+    feedback_status = feedback_status_for(feedback_data)
+
+    response_id = await run_in_threadpool(
+        _store_response, db, current_user, question, answer_in.user_answer,
+        is_answer_correct, feedback, feedback_status
+    )
+
+    return _answer_result(is_answer_correct, correct_answer, explanation, question_id,
+                          response_id, feedback, feedback_status)
+
+@router.get("/answer/{response_id}/feedback", response_model=schemas.AnswerFeedback)
+def get_answer_feedback(
+    response_id: int,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Fetch the personalized feedback for one of the user's responses.
+    `status` is "pending" until the background worker has stored it.
+    """
+    response = db.query(Response).filter(
+        Response.id == response_id,
+        Response.user_id == current_user.id
+    ).first()
+    if not response:
+        raise HTTPException(status_code=404, detail="Response not found")
 
     return {
-        "status": "Answer submitted",
-        "is_correct": is_answer_correct,
-        "correct_answer": question.correct_answer,
-        "explanation": question.explanation,
-        "personalized_feedback": feedback_data.get("feedback", ""),
-        "question_id": question.id
-    }
\ No newline at end of file
+        "response_id": response.id,
+        "status": response.feedback_status or FEEDBACK_READY,
+        "personalized_feedback": response.feedback
+    }
+
+def _store_pending_response(db: Session, current_user: Principal, question: Question, user_answer: str,
+                            is_answer_correct: bool) -> int:
+    """Persist a response whose feedback is still being generated and return its id"""
+    return _store_response(db, current_user, question, user_answer, is_answer_correct, None, FEEDBACK_PENDING)
+
+def _save_response_feedback(db: Session, response_id: int, feedback: str, feedback_status: str = FEEDBACK_READY):
+    db.query(Response).filter(Response.id == response_id).update({
+        "feedback": feedback,
+        "feedback_status": feedback_status
+    })
+    db.commit()
+
+@router.post("/answer/stream")
+async def stream_answer(
+    answer_in: schemas.AnswerCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Server-Sent Events variant of submit_answer.
+
+    Emits a `result` event with correctness, the correct answer and the stored explanation
+    as soon as the response is recorded, `feedback` events with feedback tokens as they
+    arrive, and a final `done` event once the full feedback is saved to Response.feedback.
+    If the stream breaks off (client disconnect, provider error after partial output) the
+    response stays pending and the background worker stores the full feedback instead;
+    `done` then carries status "pending" and GET /answer/{response_id}/feedback has it.
+    """
+    question = await run_in_threadpool(_get_question_or_404, db, answer_in.question_id)
+
+    question_id = question.id
+    question_content = question.content
+    correct_answer = question.correct_answer
+    explanation = question.explanation
+    is_answer_correct = answer_in.user_answer.upper() == correct_answer.upper()
+
+    # The request-scoped session from get_db stays open until the stream finishes
+    async def events():
+        response_id = await run_in_threadpool(
+            _store_pending_response, db, current_user, question, answer_in.user_answer, is_answer_correct
+        )
+        finalized = False
+        try:
+            yield _sse("result", {
+                "status": "Answer submitted",
+                "is_correct": is_answer_correct,
+                "correct_answer": correct_answer,
+                "explanation": explanation,
+                "question_id": question_id,
+                "response_id": response_id
+            })
+
+            feedback = await run_in_threadpool(
+                feedback_service.lookup_cached, db, question_id, question_content,
+                correct_answer, answer_in.user_answer, explanation
+            )
+            feedback_status = FEEDBACK_READY
+            if feedback is None and await run_in_threadpool(_over_budget, db, current_user):
+                feedback = BUDGET_FEEDBACK
+            if feedback is not None:
+                # Cache hit (or over budget): the whole feedback goes out as a single event
+                yield _sse("feedback", {"delta": feedback})
+            else:
+                feedback, usage = "", {}
+                try:
+                    async for delta in openai_service.stream_answer_feedback(
+                        question=question_content,
+                        correct_answer=correct_answer,
+                        user_answer=answer_in.user_answer,
+                        explanation=explanation or "",
+                        usage=usage
+                    ):
+                        feedback += delta
+                        yield _sse("feedback", {"delta": delta})
+                    await run_in_threadpool(
+                        feedback_service.store_cached, db, question_id, question_content,
+                        correct_answer, answer_in.user_answer, explanation, {"feedback": feedback}
+                    )
+                    await run_in_threadpool(llm_usage.record, db, current_user.id, "feedback", _stream_tokens(usage, feedback))
+                except Exception as e:
+                    logger.error(f"Error streaming feedback: {str(e)}")
+                    if feedback:
+                        # The provider still bills the partial output
+                        await run_in_threadpool(llm_usage.record, db, current_user.id, "feedback",
+                                                _stream_tokens(usage, feedback))
+                        # Truncated feedback is never stored; the worker regenerates it (see finally)
+                        yield _sse("done", {"response_id": response_id, "personalized_feedback": None,
+                                            "status": FEEDBACK_PENDING})
+                        return
+                    feedback = FEEDBACK_UNAVAILABLE
+                    record_fallback("feedback", "llm_error")
+                    feedback_status = FEEDBACK_FAILED
+                    yield _sse("feedback", {"delta": feedback})
+
+            await run_in_threadpool(_save_response_feedback, db, response_id, feedback, feedback_status)
+            finalized = True
+            yield _sse("done", {"response_id": response_id, "personalized_feedback": feedback,
+                                "status": feedback_status})
+        finally:
+            if not finalized:
+                # Runs on disconnect too (GeneratorExit / CancelledError), so nothing here awaits:
+                # the row is already committed as pending and the worker opens its own session
+                feedback_service.submit(response_id)
+
+    return _event_stream_response(events())
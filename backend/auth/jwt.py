@@ -20,12 +20,15 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str, credentials_exception: HTTPException) -> str:
+def decode_token(token: str, credentials_exception: HTTPException) -> dict:
+    """Verify the signature and expiry and return the claims"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-        return user_id
     except JWTError:
-        raise credentials_exception
\ No newline at end of file
+        raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    return payload
+
+def verify_token(token: str, credentials_exception: HTTPException) -> str:
+    return decode_token(token, credentials_exception)["sub"]
@@ -1,9 +1,157 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is CPU-bound and holds the GIL, so hashes run in a dedicated process pool sized to
+the machine's cores. At most PASSWORD_HASH_MAX_QUEUE hashes wait behind the running ones;
+beyond that callers get PasswordHashingBusy at once (the API answers 429 with Retry-After)
+instead of piling up request threads that chat traffic needs. A slot stays taken until the
+pool is done with the job, so callers that time out waiting do not free capacity the pool
+is still spending; a crashed pool is replaced and its callers get PasswordHashingUnavailable.
+"""
+import os
+import math
+import time
+import threading
+import multiprocessing
+from concurrent.futures import BrokenExecutor, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.services.metrics import HASH_DURATION, HASH_QUEUE_DEPTH, HASH_REJECTED
+
+# Changing the rounds marks existing hashes as outdated; they are rehashed on the next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__rounds=int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12")))
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class PasswordHashingError(Exception):
+    """Hashing could not run now; retry after `retry_after` seconds"""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(f"{message}, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class PasswordHashingBusy(PasswordHashingError):
+    """The hashing queue is full, or the job waited longer than the timeout"""
+    status_code = 429
+
+    def __init__(self, retry_after: int, message: str = "Password hashing queue full"):
+        super().__init__(message, retry_after)
+
+class PasswordHashingUnavailable(PasswordHashingError):
+    """The hashing pool crashed; it is recreated on the next call"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__("Password hashing pool unavailable", retry_after)
+
+class PasswordHasher:
+    def __init__(self):
+        # "process" (default) or "thread"; the thread mode keeps the admission control but not the GIL isolation
+        self.mode = os.getenv("PASSWORD_HASH_EXECUTOR", "process").lower()
+        self.workers = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or os.cpu_count() or 1
+        self.max_queue = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", str(self.workers * 4)))
+        self.timeout = float(os.getenv("PASSWORD_HASH_TIMEOUT_SECONDS", "30"))
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_seconds = 0.25  # Moving average of one hash, seeds the Retry-After estimate
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    # Never fork the multi-threaded server process
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _discard_executor(self, executor: Optional[Executor]):
+        """Drop a broken pool so the next call starts a fresh one"""
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _retry_after(self) -> int:
+        # Caller holds self._lock; time for the backlog ahead of this caller to drain
+        return max(1, math.ceil(self._in_flight / self.workers * self._avg_seconds))
+
+    def _admit(self):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                HASH_REJECTED.inc()
+                raise PasswordHashingBusy(self._retry_after())
+            self._in_flight += 1
+            HASH_QUEUE_DEPTH.set(max(0, self._in_flight - self.workers))
+
+    def _release(self, started: float, future: Optional[Future] = None):
+        with self._lock:
+            self._in_flight -= 1
+            if future is not None and not future.cancelled():
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - started)
+            HASH_QUEUE_DEPTH.set(max(0, self._in_flight - self.workers))
+
+    def run(self, operation: str, fn: Callable[..., Any], *args) -> Any:
+        """Run one hashing call in the pool, blocking the calling thread without holding the GIL"""
+        self._admit()
+        started = time.perf_counter()
+        outcome = "error"
+        executor: Optional[Executor] = None
+        try:
+            try:
+                executor = self._get_executor()
+                future = executor.submit(fn, *args)
+            except BaseException:
+                self._release(started)
+                raise
+            # The slot is freed when the pool is done with the job, not when this caller stops waiting
+            future.add_done_callback(lambda done: self._release(started, done))
+            result = future.result(timeout=self.timeout)
+            outcome = "ok"
+            return result
+        except TimeoutError:
+            outcome = "timeout"
+            future.cancel()  # Only succeeds while still queued; a running hash keeps its slot
+            with self._lock:
+                retry_after = self._retry_after()
+            raise PasswordHashingBusy(retry_after, "Password hashing timed out")
+        except BrokenExecutor:
+            outcome = "broken"
+            self._discard_executor(executor)
+            raise PasswordHashingUnavailable()
+        finally:
+            HASH_DURATION.labels(operation=operation, outcome=outcome).observe(time.perf_counter() - started)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "workers": self.workers, "max_queue": self.max_queue,
+                    "in_flight": self._in_flight, "avg_seconds": round(self._avg_seconds, 4)}
+
+password_hasher = PasswordHasher()
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash uses outdated parameters"""
+    return password_hasher.run("verify", _verify_and_update, plain_password, hashed_password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return verify_and_update_password(plain_password, hashed_password)[0]
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return password_hasher.run("hash", _hash, password)
@@ -0,0 +1,111 @@
+"""
+Verified-token and principal caches behind the auth dependencies.
+
+Verified tokens are cached by a digest of the full token until the token expires, so a
+repeat request skips signature verification. Principals (the few user fields routes
+need) are cached by user id so get_current_user does not query the users table on
+every request. Both caches are process-local: user changes flushed through a Session
+invalidate this process at once, other workers within AUTH_PRINCIPAL_TTL_SECONDS.
+"""
+import os
+import time
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.models import User
+from backend.auth.jwt import decode_token
+from backend.services.cache import LRUCache
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by routes; detached from any session"""
+    id: int
+    email: Optional[str] = None
+    name: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(id=user.id, email=user.email, name=user.name)
+
+class PrincipalCache:
+    def __init__(self):
+        self.enabled = os.getenv("AUTH_PRINCIPAL_CACHE_ENABLED", "true").lower() == "true"
+        # Trust the token's claims alone and never load the user (deleted users stay valid until expiry)
+        self.from_claims = os.getenv("AUTH_PRINCIPAL_FROM_CLAIMS", "false").lower() == "true"
+        self.tokens = LRUCache(maxsize=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")))
+        self.principals = LRUCache(
+            maxsize=int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("AUTH_PRINCIPAL_TTL_SECONDS", "60"))
+        )
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def claims(self, token: str, credentials_exception: HTTPException) -> Dict:
+        """Verified claims of the token, from cache until the token expires"""
+        if not self.enabled:
+            return decode_token(token, credentials_exception)
+        key = self._digest(token)
+        claims = self.tokens.get(key)
+        if claims is not None and claims.get("exp", float("inf")) > time.time():
+            return claims
+        claims = decode_token(token, credentials_exception)
+        ttl = claims["exp"] - time.time() if "exp" in claims else None
+        if ttl is None or ttl > 0:
+            self.tokens.set(key, claims, ttl_seconds=ttl)
+        return claims
+
+    def principal(self, claims: Dict, load_user: Callable[[int], Optional[User]]) -> Optional[Principal]:
+        """Principal for the claims' subject, loading the user only on a cache miss"""
+        user_id = int(claims["sub"])
+        if self.from_claims:
+            return Principal(id=user_id, email=claims.get("email"), name=claims.get("name"))
+        if self.enabled:
+            principal = self.principals.get(user_id)
+            if principal is not None:
+                return principal
+        user = load_user(user_id)
+        if user is None:
+            return None
+        principal = Principal.from_user(user)
+        if self.enabled:
+            self.principals.set(user_id, principal)
+        return principal
+
+    def invalidate(self, user_id: int):
+        """Drop the cached principal of a changed or deleted user"""
+        self.principals.delete(user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        self.principals.clear()
+
+    def stats(self) -> Dict:
+        return {"tokens": self.tokens.stats(), "principals": self.principals.stats()}
+
+principal_cache = PrincipalCache()
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_changed_users(session, flush_context):
+    """Forget principals of users updated or deleted in this flush, again once it commits"""
+    changed = {obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User) and obj.id is not None}
+    for user_id in changed:
+        principal_cache.invalidate(user_id)
+    if changed:
+        session.info.setdefault("changed_user_ids", set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    # A request racing the flush may have cached the old row before the commit
+    for user_id in session.info.pop("changed_user_ids", ()):
+        principal_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session):
+    session.info.pop("changed_user_ids", None)
@@ -0,0 +1,132 @@
+"""
+Query count and latency of AnalyticsService.get_user_performance_stats on a large history.
+
+Usage:
+    python -m backend.benchmarks.analytics_benchmark [--responses 1000000] [--users 100]
+        [--database-url sqlite:///./analytics_benchmark.db] [--repeat 5]
+
+Seeds --responses answers spread over --users users and the last year (one user gets
+--heavy-share of them), then times the single-scan implementation against the previous
+five-query approach (with its broken integer cast fixed) for the heavy user and a typical
+user, counting the SQL statements each one issues.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+from typing import Callable, Dict
+
+from sqlalchemy import and_, case, create_engine, event, func, insert
+from sqlalchemy.orm import Session
+
+from backend.models import Base, Question, Response, User
+from backend.services.analytics_service import AnalyticsService
+
+SPECIALTIES = ["Cardiology", "Neurology", "Pulmonology", "Gastroenterology", "Nephrology", "Endocrinology",
+               "Hematology", "Oncology", "Rheumatology", "Infectious Disease"]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+
+def seed(engine, responses: int, users: int, questions: int, heavy_share: float, seed: int = 42):
+    rng = random.Random(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    now = datetime.datetime.utcnow()
+    heavy = int(responses * heavy_share)
+
+    with Session(engine) as db:
+        db.execute(insert(User), [{"id": i, "email": f"analytics-{i}@example.com", "name": f"User {i}"} for i in range(1, users + 1)])
+        db.execute(insert(Question), [
+            {"id": i, "content": f"Question {i}", "discipline": rng.choice(SPECIALTIES), "difficulty": rng.choice(DIFFICULTIES),
+             "in_inventory": False}
+            for i in range(1, questions + 1)
+        ])
+        chunk = []
+        for n in range(responses):
+            chunk.append({
+                "user_id": 1 if n < heavy else rng.randint(2, users),
+                "question_id": rng.randint(1, questions),
+                "user_answer": "A",
+                "is_correct": rng.random() < 0.65,
+                "created_at": now - datetime.timedelta(seconds=rng.randint(0, 365 * 86400))
+            })
+            if len(chunk) == 50000:
+                db.execute(insert(Response), chunk)
+                chunk = []
+        if chunk:
+            db.execute(insert(Response), chunk)
+        db.commit()
+
+def legacy_stats(user_id: int, db: Session, days: int = 30) -> Dict:
+    """The previous five-query implementation, with the integer cast fixed, for comparison"""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    window = and_(Response.user_id == user_id, Response.created_at >= cutoff)
+    correct = func.sum(case((Response.is_correct == True, 1), else_=0))
+    total = db.query(Response).filter(window).count()
+    right = db.query(Response).filter(window, Response.is_correct == True).count()
+    by_specialty = db.query(Question.discipline, func.count(Response.id), correct).join(Response).filter(window).group_by(Question.discipline).all()
+    by_difficulty = db.query(Question.difficulty, func.count(Response.id), correct).join(Response).filter(window).group_by(Question.difficulty).all()
+    recent = datetime.datetime.utcnow() - datetime.timedelta(days=7)
+    daily = db.query(func.date(Response.created_at), func.count(Response.id), correct).filter(
+        Response.user_id == user_id, Response.created_at >= recent
+    ).group_by(func.date(Response.created_at)).all()
+    return {"total_questions": total, "correct_answers": right, "specialties": len(by_specialty),
+            "difficulties": len(by_difficulty), "days": len(daily)}
+
+def measure(engine, fn: Callable[[Session], Dict], repeat: int) -> Dict:
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(repeat):
+            statements.clear()
+            with Session(engine) as db:
+                started = time.perf_counter()
+                result = fn(db)
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    timings.sort()
+    return {
+        "queries": len(statements),
+        "median_ms": round(timings[len(timings) // 2], 2),
+        "min_ms": round(timings[0], 2),
+        "total_questions": result.get("total_questions")
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-user performance stats on a large response table")
+    parser.add_argument("--database-url", default="sqlite:///./analytics_benchmark.db")
+    parser.add_argument("--responses", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--heavy-share", type=float, default=0.05, help="Fraction of responses from user 1")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed(engine, args.responses, args.users, args.questions, args.heavy_share)
+        print(f"Seeded {args.responses} responses in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    service = AnalyticsService()
+    report = {"responses": args.responses, "days": args.days, "database": args.database_url.split("://")[0]}
+    for label, user_id in (("heavy_user", 1), ("typical_user", 2)):
+        report[label] = {
+            "single_scan": measure(engine, lambda db: service.get_user_performance_stats(user_id, db, args.days), args.repeat),
+            "five_queries": measure(engine, lambda db: legacy_stats(user_id, db, args.days), args.repeat)
+        }
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
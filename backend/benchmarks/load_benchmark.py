@@ -0,0 +1,316 @@
+"""
+End-to-end load benchmark for the API.
+
+Usage:
+    python -m backend.benchmarks.load_benchmark [--users 200] [--questions 2000] [--concurrency 16]
+        [--requests 300] [--output report.json] [--baseline backend/benchmarks/baselines/load.json]
+
+Seeds a dedicated database (users with passwords, tagged questions and answer history),
+starts uvicorn on it with LLM_PROVIDER=fake so no real model is called, then drives
+login, question, answer and analytics-summary requests at a fixed concurrency. The JSON
+report has p50/p95/p99 latency, throughput and error rate per scenario. With --baseline
+the report is compared against a stored run and the exit code is 1 when any scenario
+regresses by more than --tolerance; --update-baseline saves the run as the new baseline.
+Pass --url to target a server that is already running (it must share the seeded
+database and SECRET_KEY).
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from backend.models import Base, User, Identity, Question, Response
+from backend.services.question_tags import replace_question_tags
+from backend.services.taxonomy import TAXONOMY, LIST_CATEGORIES
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_DATABASE_URL = "sqlite:///./benchmark.db"
+BENCHMARK_PASSWORD = "benchmark-password"
+SPECIALTIES = ["Cardiology", "Neurology", "Pulmonology", "Gastroenterology", "Nephrology", "Endocrinology"]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+SCENARIOS = ["login", "question", "answer", "summary"]
+
+def seed_database(database_url: str, users: int, questions: int, responses_per_user: int, seed: int = 42) -> Dict:
+    """Recreate the schema and fill it with deterministic benchmark data"""
+    from backend.auth.password import get_password_hash
+
+    rng = random.Random(seed)
+    engine = create_engine(database_url, connect_args={"check_same_thread": False} if "sqlite" in database_url else {})
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    # Hashing is the slow part of signup, so every benchmark user shares one hash
+    password_hash = get_password_hash(BENCHMARK_PASSWORD)
+    now = datetime.datetime.utcnow()
+
+    def tags():
+        return {
+            category: json.dumps(rng.sample(values, k=min(2, len(values)))) if category in LIST_CATEGORIES else rng.choice(values)
+            for category, values in TAXONOMY.items()
+        }
+
+    with Session(engine) as db:
+        db.execute(insert(User), [
+            {"id": i, "email": f"bench-user-{i}@example.com", "name": f"Bench User {i}", "created_at": now}
+            for i in range(1, users + 1)
+        ])
+        db.execute(insert(Identity), [
+            {"user_id": i, "provider": "password", "provider_user_id": f"bench-user-{i}@example.com", "password_hash": password_hash}
+            for i in range(1, users + 1)
+        ])
+        for start in range(1, questions + 1, 1000):
+            chunk = [
+                {
+                    "id": i,
+                    "content": f"Benchmark question {i}: which finding best supports the diagnosis?",
+                    "discipline": rng.choice(SPECIALTIES),
+                    "difficulty": rng.choice(DIFFICULTIES),
+                    "options": json.dumps({"A": "One", "B": "Two", "C": "Three", "D": "Four"}),
+                    "correct_answer": rng.choice("ABCD"),
+                    "explanation": "Seeded for the load benchmark.",
+                    "topics": "[]",
+                    "in_inventory": False,
+                    "created_at": now,
+                    **tags()
+                }
+                for i in range(start, min(start + 1000, questions + 1))
+            ]
+            db.execute(insert(Question), chunk)
+            # Core inserts, so mirror the tags into question_tags directly
+            replace_question_tags(db.connection(), chunk)
+        responses = [
+            {
+                "user_id": user_id,
+                "question_id": rng.randint(1, questions),
+                "user_answer": rng.choice("ABCD"),
+                "is_correct": rng.random() < 0.6,
+                "feedback": "Seeded feedback.",
+                "feedback_status": "ready",
+                "created_at": now
+            }
+            for user_id in range(1, users + 1)
+            for _ in range(responses_per_user)
+        ]
+        for start in range(0, len(responses), 5000):
+            db.execute(insert(Response), responses[start:start + 5000])
+        db.commit()
+    engine.dispose()
+    return {"users": users, "questions": questions, "responses": len(responses)}
+
+def start_server(database_url: str, port: int, workers: int, llm_latency: str, extra_env: Optional[Dict] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": llm_latency,
+        "FAKE_LLM_SEED": "42",
+        "WEB_CONCURRENCY": str(workers),
+        "PYTHONPATH": str(REPO_ROOT)
+    })
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env, cwd=str(REPO_ROOT)
+    )
+
+def wait_until_healthy(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become healthy within {timeout:.0f}s")
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), math.ceil(pct / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float], statuses: List[int], elapsed: float) -> Dict:
+    """Scenario report from per-request latencies (seconds) and status codes (0 = transport error)"""
+    ordered = sorted(latency * 1000 for latency in latencies)
+    errors = sum(1 for code in statuses if code == 0 or code >= 400)
+    codes: Dict[str, int] = {}
+    for code in statuses:
+        codes[str(code)] = codes.get(str(code), 0) + 1
+    return {
+        "requests": len(statuses),
+        "errors": errors,
+        "error_rate": round(errors / len(statuses), 4) if statuses else 0.0,
+        "throughput_rps": round(len(statuses) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50), 2),
+            "p95": round(percentile(ordered, 95), 2),
+            "p99": round(percentile(ordered, 99), 2),
+            "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+            "max": round(ordered[-1], 2) if ordered else 0.0
+        },
+        "status_codes": codes
+    }
+
+def _request_factory(scenario: str, users: int, questions: int, tokens: Dict[int, str]):
+    """Returns a function building (method, path, kwargs) for one request of the scenario"""
+    def build(rng: random.Random):
+        user_id = rng.randint(1, users)
+        auth = {"Authorization": f"Bearer {tokens[user_id]}"}
+        if scenario == "login":
+            return "POST", "/api/v1/auth/login", {
+                "data": {"username": f"bench-user-{user_id}@example.com", "password": BENCHMARK_PASSWORD}
+            }
+        if scenario == "question":
+            return "GET", "/api/v1/chat/question", {
+                "params": {"specialty": rng.choice(SPECIALTIES), "difficulty": rng.choice(DIFFICULTIES)}, "headers": auth
+            }
+        if scenario == "answer":
+            return "POST", "/api/v1/chat/answer", {
+                "json": {"question_id": rng.randint(1, questions), "user_answer": rng.choice("ABCD")}, "headers": auth
+            }
+        if scenario == "summary":
+            return "GET", "/api/v1/analytics/summary", {"headers": auth}
+        raise ValueError(f"Unknown scenario: {scenario}")
+    return build
+
+async def run_scenario(base_url: str, build_request, requests: int, concurrency: int, seed: int,
+                       timeout: float = 60.0) -> Dict:
+    """Send `requests` requests from `concurrency` workers, each waiting for its previous response"""
+    latencies: List[float] = []
+    statuses: List[int] = []
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker(index: int):
+            rng = random.Random(seed * 1000 + index)
+            for _ in remaining:
+                method, path, kwargs = build_request(rng)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, **kwargs)
+                    status = response.status_code
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, statuses, elapsed)
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float = 0.2, error_rate_margin: float = 0.01) -> List[str]:
+    """
+    Regressions of `report` against `baseline`: p95 or p99 latency up, or throughput down,
+    by more than `tolerance` (a fraction), or error rate up by more than `error_rate_margin`.
+    """
+    regressions = []
+    for scenario, base in baseline.get("scenarios", {}).items():
+        current = report.get("scenarios", {}).get(scenario)
+        if current is None:
+            continue
+        for key in ("p95", "p99"):
+            before, after = base["latency_ms"][key], current["latency_ms"][key]
+            if before and after > before * (1 + tolerance):
+                regressions.append(f"{scenario}: {key} latency {before:.1f}ms -> {after:.1f}ms")
+        before, after = base["throughput_rps"], current["throughput_rps"]
+        if before and after < before * (1 - tolerance):
+            regressions.append(f"{scenario}: throughput {before:.1f} -> {after:.1f} req/s")
+        before, after = base["error_rate"], current["error_rate"]
+        if after > before + error_rate_margin:
+            regressions.append(f"{scenario}: error rate {before:.2%} -> {after:.2%}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the API against a seeded database and a fake LLM")
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--responses-per-user", type=int, default=50)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the existing benchmark database")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of " + ", ".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=300, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--llm-latency", default="fixed:50", help="FAKE_LLM_LATENCY for the server")
+    parser.add_argument("--url", default=None, help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this stored report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression, e.g. 0.2 = 20%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Save this run as the --baseline")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    seeded = None if args.skip_seed else seed_database(args.database_url, args.users, args.questions,
+                                                       args.responses_per_user, args.seed)
+
+    from backend.auth.jwt import create_access_token
+    tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in range(1, args.users + 1)}
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.database_url, args.port, args.workers, args.llm_latency)
+    try:
+        wait_until_healthy(base_url)
+        results = {}
+        for scenario in scenarios:
+            build_request = _request_factory(scenario, args.users, args.questions, tokens)
+            if args.warmup:
+                asyncio.run(run_scenario(base_url, build_request, args.warmup, args.concurrency, args.seed + 1))
+            results[scenario] = asyncio.run(run_scenario(base_url, build_request, args.requests, args.concurrency, args.seed))
+            print(f"{scenario}: {json.dumps(results[scenario])}", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "generated_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "config": {
+            "users": args.users, "questions": args.questions, "responses_per_user": args.responses_per_user,
+            "requests": args.requests, "concurrency": args.concurrency, "workers": args.workers,
+            "llm_latency": args.llm_latency, "database": args.database_url.split("://")[0], "seeded": seeded
+        },
+        "scenarios": results
+    }
+    rendered = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(rendered + "\n")
+    print(rendered)
+
+    if args.baseline and args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(rendered + "\n")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+    elif args.baseline:
+        regressions = compare_to_baseline(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
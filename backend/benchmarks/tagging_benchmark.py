@@ -0,0 +1,90 @@
+"""
+Accuracy and throughput benchmark for question tagging backends.
+
+Usage:
+    python -m backend.benchmarks.tagging_benchmark [--backend local_llm] [--iterations 200]
+
+Accuracy is measured against fixtures/tagged_questions.json. Only the categories
+labelled for a question are scored: list categories report micro-averaged
+precision/recall/F1 and single-value categories report exact-match accuracy.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+from backend.services.taxonomy import LIST_CATEGORIES, SINGLE_CATEGORIES
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "tagged_questions.json"
+
+def load_fixture(path: Path = FIXTURE_PATH) -> List[Dict]:
+    with open(path) as f:
+        return json.load(f)
+
+def evaluate_accuracy(backend, fixture: List[Dict]) -> Dict:
+    """Score backend.tag_question against the labelled fixture"""
+    list_counts = {category: {"tp": 0, "fp": 0, "fn": 0} for category in LIST_CATEGORIES}
+    single_counts = {category: {"correct": 0, "total": 0} for category in SINGLE_CATEGORIES}
+
+    for item in fixture:
+        predicted = backend.tag_question(item["question"], item.get("options", {}))
+        for category, expected in item["tags"].items():
+            if category in list_counts:
+                got, want = set(predicted.get(category) or []), set(expected)
+                list_counts[category]["tp"] += len(got & want)
+                list_counts[category]["fp"] += len(got - want)
+                list_counts[category]["fn"] += len(want - got)
+            elif category in single_counts:
+                single_counts[category]["total"] += 1
+                single_counts[category]["correct"] += int(predicted.get(category) == expected)
+
+    report = {}
+    for category, counts in list_counts.items():
+        tp, fp, fn = counts["tp"], counts["fp"], counts["fn"]
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / (tp + fn) if tp + fn else 1.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        report[category] = {"precision": round(precision, 3), "recall": round(recall, 3), "f1": round(f1, 3)}
+    for category, counts in single_counts.items():
+        accuracy = counts["correct"] / counts["total"] if counts["total"] else 1.0
+        report[category] = {"accuracy": round(accuracy, 3), "labelled": counts["total"]}
+    return report
+
+def measure_throughput(backend, fixture: List[Dict], iterations: int) -> Dict:
+    """Tag the fixture `iterations` times on the current thread"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for item in fixture:
+            backend.tag_question(item["question"], item.get("options", {}))
+    elapsed = time.perf_counter() - started
+    tagged = iterations * len(fixture)
+    return {
+        "questions": tagged,
+        "elapsed_seconds": round(elapsed, 3),
+        "questions_per_second": round(tagged / elapsed, 1) if elapsed else 0
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark a tagging backend against the labelled fixture")
+    parser.add_argument("--backend", default="local_llm", help="Backend type accepted by QuestionTaggingService")
+    parser.add_argument("--iterations", type=int, default=200, help="Passes over the fixture for the throughput run")
+    parser.add_argument("--fixture", type=Path, default=FIXTURE_PATH)
+    args = parser.parse_args(argv)
+
+    from backend.services.tagging_service import QuestionTaggingService
+    backend = QuestionTaggingService(args.backend).backend
+    fixture = load_fixture(args.fixture)
+
+    report = {
+        "backend": args.backend,
+        "fixture_size": len(fixture),
+        "accuracy": evaluate_accuracy(backend, fixture),
+        "throughput": measure_throughput(backend, fixture, args.iterations)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
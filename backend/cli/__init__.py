@@ -0,0 +1 @@
+# Command-line jobs (run with python -m backend.cli.<name>)
@@ -0,0 +1,188 @@
+"""
+Tag questions that are missing taxonomy tags.
+
+Usage:
+    python -m backend.cli.backfill_tags [--chunk-size 200] [--batch-size 10] [--concurrency 4]
+
+Untagged rows are read in id order with keyset pagination, tagged in batches of
+--batch-size (one LLM request per batch where the backend supports it) with up to
+--concurrency batches in flight, and written back with one bulk UPDATE per chunk.
+The last committed id is saved to --checkpoint, so an interrupted run resumes where
+it stopped; pass --restart to ignore the checkpoint or --all to re-tag every row.
+Rows the tagging backend fails on are left untouched and reported as failed, and the
+checkpoint never moves past the first of them, so the next run retries them.
+Users who answered a re-tagged question get their cached analytics invalidated, which
+only reaches the server when it shares ANALYTICS_CACHE_REDIS_URL with this command.
+"""
+import sys
+import json
+import time
+import argparse
+import logging
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select, func
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.models import Question
+from backend.services.question_tags import retag_questions
+from backend.services.analytics_cache import analytics_cache, MemoryAnalyticsBackend
+from backend.services.tagging_service import get_tagging_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = Path(".backfill_tags.checkpoint")
+
+def _empty(column):
+    return or_(column.is_(None), column.in_(["", "[]"]))
+
+def untagged_filter():
+    """Rows with no taxonomy tags at all (created before the taxonomy columns existed)"""
+    return and_(
+        _empty(Question.disciplines),
+        _empty(Question.body_systems),
+        _empty(Question.specialties),
+        Question.question_type.is_(None)
+    )
+
+def read_checkpoint(path: Path) -> int:
+    try:
+        return int(json.loads(path.read_text())["last_id"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return 0
+
+def write_checkpoint(path: Path, last_id: int):
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"last_id": last_id}))
+    tmp_path.replace(path)
+
+def _parse_options(raw: Optional[str]) -> Dict:
+    try:
+        options = json.loads(raw) if raw else {}
+    except ValueError:
+        return {}
+    return options if isinstance(options, dict) else {}
+
+def _tag_rows(rows: List, batch_size: int, executor: ThreadPoolExecutor) -> Tuple[List[Dict], List[int]]:
+    """Tag one chunk of (id, content, options) rows, returning bulk-update parameter dicts and the failed ids"""
+    tagging_service = get_tagging_service()
+    batches = [rows[start:start + batch_size] for start in range(0, len(rows), batch_size)]
+    futures = [
+        executor.submit(tagging_service.tag_questions,
+                        [(row.content, _parse_options(row.options)) for row in batch], fallback=False)
+        for batch in batches
+    ]
+
+    updates, failed = [], []
+    for batch, future in zip(batches, futures):
+        for row, tags in zip(batch, future.result()):
+            if tags is None:
+                # Placeholder tags would make the row look tagged and never be retried
+                failed.append(row.id)
+                continue
+            updates.append({
+                "id": row.id,
+                "disciplines": json.dumps(tags.get("disciplines") or []),
+                "body_systems": json.dumps(tags.get("body_systems") or []),
+                "specialties": json.dumps(tags.get("specialties") or []),
+                "question_type": tags.get("question_type"),
+                "age_group": tags.get("age_group"),
+                "acuity": tags.get("acuity"),
+                "pathophysiology": json.dumps(tags.get("pathophysiology") or [])
+            })
+    return updates, failed
+
+def backfill(db: Session, chunk_size: int = 200, batch_size: int = 10, concurrency: int = 4,
+             checkpoint: Optional[Path] = DEFAULT_CHECKPOINT, retag_all: bool = False,
+             limit: Optional[int] = None) -> Dict:
+    """Tag untagged questions chunk by chunk; returns counts and throughput"""
+    criteria = [] if retag_all else [untagged_filter()]
+    last_id = read_checkpoint(checkpoint) if checkpoint else 0
+    total = db.scalar(select(func.count(Question.id)).where(Question.id > last_id, *criteria))
+    if limit is not None:
+        total = min(total, limit)
+    logger.info(f"Backfilling tags for {total} questions starting after id {last_id}")
+
+    tagged, failed = 0, 0
+    cursor, first_failed = last_id, None
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="backfill-tags") as executor:
+        while limit is None or tagged + failed < limit:
+            size = chunk_size if limit is None else min(chunk_size, limit - tagged - failed)
+            rows = db.execute(
+                select(Question.id, Question.content, Question.options)
+                .where(Question.id > cursor, *criteria)
+                .order_by(Question.id)
+                .limit(size)
+            ).all()
+            if not rows:
+                break
+
+            updates, failed_ids = _tag_rows(rows, batch_size, executor)
+            # One bulk UPDATE, plus question_tags and the category rollups of users who answered them
+            user_ids = retag_questions(db, updates)
+            db.commit()
+            for user_id in user_ids:
+                analytics_cache.bump(user_id)
+
+            # This run moves on past failed rows; the checkpoint stays before the first one
+            cursor = rows[-1].id
+            if failed_ids and first_failed is None:
+                first_failed = min(failed_ids)
+            last_id = cursor if first_failed is None else first_failed - 1
+            if checkpoint:
+                write_checkpoint(checkpoint, last_id)
+
+            tagged += len(updates)
+            failed += len(failed_ids)
+            elapsed = time.monotonic() - started
+            rate = (tagged + failed) / elapsed if elapsed else 0
+            remaining = max(total - tagged - failed, 0)
+            eta = f"{remaining / rate:.0f}s" if rate else "?"
+            logger.info(f"Tagged {tagged}/{total} questions, {failed} failed ({rate:.1f}/s, ETA {eta}), last id {cursor}")
+
+    elapsed = time.monotonic() - started
+    return {
+        "tagged": tagged,
+        "failed": failed,
+        "last_id": last_id,
+        "elapsed_seconds": round(elapsed, 2),
+        "questions_per_second": round(tagged / elapsed, 2) if elapsed else 0
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill taxonomy tags for untagged questions")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Rows read and written per transaction")
+    parser.add_argument("--batch-size", type=int, default=10, help="Questions per tagging request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Tagging requests in flight")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    parser.add_argument("--all", dest="retag_all", action="store_true", help="Re-tag every question, not only untagged ones")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many questions")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if isinstance(analytics_cache.backend, MemoryAnalyticsBackend):
+        logger.warning("ANALYTICS_CACHE_REDIS_URL is not set: running servers keep serving cached "
+                       "analytics from before the re-tag until their entries expire")
+    if args.restart and args.checkpoint.exists():
+        args.checkpoint.unlink()
+
+    db = SessionLocal()
+    try:
+        report = backfill(db, chunk_size=args.chunk_size, batch_size=args.batch_size,
+                          concurrency=args.concurrency, checkpoint=args.checkpoint,
+                          retag_all=args.retag_all, limit=args.limit)
+    finally:
+        db.close()
+
+    print(f"Tagged {report['tagged']} questions in {report['elapsed_seconds']}s "
+          f"({report['questions_per_second']} questions/second), {report['failed']} failed, "
+          f"checkpoint at id {report['last_id']}")
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
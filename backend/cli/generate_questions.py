@@ -0,0 +1,81 @@
+"""
+Fill the question bank with batch-generated questions.
+
+Usage:
+    python -m backend.cli.generate_questions --specialty Cardiology --difficulty Intermediate --total 200
+
+Each LLM call asks for --batch-size questions; valid items from a batch are bulk-inserted
+in one transaction and malformed items are dropped. Throughput (questions/minute) and
+tokens per question are reported at the end.
+"""
+import sys
+import time
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from backend.database import SessionLocal
+from backend.services.question_service import generate_question_batch, bulk_insert_questions
+
+logger = logging.getLogger(__name__)
+
+def run_batch(specialty: str, difficulty: str, batch_size: int, in_inventory: bool) -> dict:
+    """Generate one batch and insert its valid questions; returns the batch counts"""
+    batch = generate_question_batch(specialty, difficulty, batch_size, in_inventory=in_inventory)
+    db = SessionLocal()
+    try:
+        inserted = bulk_insert_questions(db, batch["questions"])
+    finally:
+        db.close()
+    return {"inserted": inserted, "rejected": batch["rejected"], "tokens_used": batch["tokens_used"]}
+
+def generate(specialty: str, difficulty: str, total: int, batch_size: int,
+             concurrency: int = 1, in_inventory: bool = False) -> dict:
+    """Generate roughly `total` questions in batches and return a throughput report"""
+    batches = [min(batch_size, total - start) for start in range(0, total, batch_size)]
+    report = {"requested": total, "inserted": 0, "rejected": 0, "failed_batches": 0, "tokens_used": 0}
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = [executor.submit(run_batch, specialty, difficulty, size, in_inventory) for size in batches]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Batch failed: {str(e)}")
+                report["failed_batches"] += 1
+                continue
+            report["inserted"] += result["inserted"]
+            report["rejected"] += result["rejected"]
+            report["tokens_used"] += result["tokens_used"]
+            logger.info(f"Progress: {report['inserted']}/{total} questions inserted")
+
+    elapsed = time.monotonic() - started
+    report["elapsed_seconds"] = round(elapsed, 2)
+    report["questions_per_minute"] = round(report["inserted"] / elapsed * 60, 2) if elapsed else 0
+    report["tokens_per_question"] = round(report["tokens_used"] / report["inserted"], 1) if report["inserted"] else 0
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Batch-generate questions into the question bank")
+    parser.add_argument("--specialty", default="General Medicine")
+    parser.add_argument("--difficulty", default="Intermediate")
+    parser.add_argument("--total", type=int, default=50, help="Number of questions to request")
+    parser.add_argument("--batch-size", type=int, default=10, help="Questions requested per LLM call")
+    parser.add_argument("--concurrency", type=int, default=1, help="Batches generated in parallel")
+    parser.add_argument("--inventory", action="store_true", help="Mark inserted questions as unserved inventory")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    report = generate(args.specialty, args.difficulty, args.total, args.batch_size,
+                      concurrency=args.concurrency, in_inventory=args.inventory)
+
+    print(f"Inserted {report['inserted']}/{report['requested']} questions "
+          f"({report['rejected']} rejected, {report['failed_batches']} failed batches) "
+          f"in {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['questions_per_minute']} questions/minute, "
+          f"{report['tokens_per_question']} tokens/question")
+    return 0 if report["inserted"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Recompute the user_category_stats rollup from raw responses.
+
+Usage:
+    python -m backend.cli.rebuild_category_stats [--user-id 42]
+
+The rollup is maintained on every answer and dropped for the affected users when
+questions are re-tagged through the ORM or the tag backfill, so this is only needed
+after bulk imports, manual SQL edits to responses or question tags, or to backfill
+every user at once instead of lazily on their next dashboard load.
+"""
+import sys
+import time
+import argparse
+import logging
+
+from backend.database import SessionLocal
+from backend.services.category_stats import rebuild
+
+logger = logging.getLogger(__name__)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild per-user category performance counters")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        rebuild(db, args.user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    scope = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"Rebuilt category stats for {scope} in {time.monotonic() - started:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
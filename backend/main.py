@@ -7,8 +7,15 @@ from dotenv import load_dotenv
 from backend.api.v1 import auth as auth_router
 from backend.api.v1 import chat as chat_router
 from backend.api.v1 import analytics as analytics_router
-from backend.database import engine
+from backend.database import engine, SessionLocal
 from backend import models
+from backend.services.question_inventory import question_inventory
+from backend.services.feedback_service import feedback_service
+from backend.services.question_coalescer import question_coalescer
+from backend.services.usage_rollup import usage_rollup
+from backend.auth.password import password_hasher
+from backend.services.metrics import metrics_middleware, instrument_sessions, metrics_response
+from backend.services.rate_limit import rate_limit_middleware
 
 # Load environment variables
 load_dotenv()
@@ -31,6 +38,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-user token buckets on the routes that can trigger LLM calls
+app.middleware("http")(rate_limit_middleware)
+
+# Request latency histograms per route template, exported at /metrics (added last so it also times 429s)
+app.middleware("http")(metrics_middleware)
+instrument_sessions(SessionLocal)
+
 # Create database tables and handle migrations
 @app.on_event("startup")
 async def startup_event():
@@ -40,7 +54,7 @@ async def startup_event():
     # Create all tables (safe - won't overwrite existing)
     models.Base.metadata.create_all(bind=engine)
     
-    # Add missing columns if they don't exist (safe migration)
+    # Add missing columns if they don't exist (safe migration); indexes are left to Alembic
     db = SessionLocal()
     try:
         # Check and add missing columns to questions table
@@ -57,19 +71,35 @@ async def startup_event():
             "ALTER TABLE questions ADD COLUMN IF NOT EXISTS age_group VARCHAR",
             "ALTER TABLE questions ADD COLUMN IF NOT EXISTS acuity VARCHAR", 
             "ALTER TABLE questions ADD COLUMN IF NOT EXISTS pathophysiology TEXT",
-            "ALTER TABLE responses ADD COLUMN IF NOT EXISTS feedback TEXT"
+            "ALTER TABLE questions ADD COLUMN IF NOT EXISTS in_inventory BOOLEAN NOT NULL DEFAULT FALSE",
+            "ALTER TABLE responses ADD COLUMN IF NOT EXISTS feedback TEXT",
+            "ALTER TABLE responses ADD COLUMN IF NOT EXISTS feedback_status VARCHAR"
         ]
         
+        # One transaction per statement, so a dialect that rejects one doesn't skip the rest
         for sql in missing_columns:
-            db.execute(text(sql))
-        db.commit()
-        
-    except Exception as e:
-        print(f"Migration warning (likely safe): {e}")
-        db.rollback()
+            try:
+                db.execute(text(sql))
+                db.commit()
+            except Exception as e:
+                print(f"Migration warning (likely safe): {e}")
+                db.rollback()
     finally:
         db.close()
 
+    # Keep pre-generated questions stocked in the background
+    question_inventory.start()
+    # Keep the daily usage rollup behind /analytics/system-stats current
+    usage_rollup.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    question_inventory.stop()
+    usage_rollup.stop()
+    feedback_service.shutdown()
+    question_coalescer.shutdown()
+    password_hasher.shutdown()
+
 # --- API Routers ---
 app.include_router(auth_router.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(chat_router.router, prefix="/api/v1/chat", tags=["Chat"])
@@ -82,3 +112,7 @@ def read_root():
 @app.get("/healthz")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
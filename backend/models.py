@@ -2,11 +2,18 @@ import datetime
 from sqlalchemy import (
     Column,
     Integer,
+    Float,
     String,
+    Date,
     DateTime,
     ForeignKey,
     Text,
-    Boolean
+    Boolean,
+    Index,
+    LargeBinary,
+    UniqueConstraint,
+    func,
+    text
 )
 from sqlalchemy.orm import declarative_base, relationship
 
@@ -27,6 +34,11 @@ class User(Base):
     responses = relationship("Response", back_populates="user", cascade="all, delete-orphan")
     memory = relationship("UserMemory", uselist=False, back_populates="user")
 
+    __table_args__ = (
+        # Emails are stored as typed at signup; roster provisioning matches them case-insensitively
+        Index("ix_users_email_lower", func.lower(email)),
+    )
+
 class Identity(Base):
     """
     Represents a method a user can use to authenticate.
@@ -69,8 +81,42 @@ class Question(Base):
     downvotes = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
+    # Pre-generated questions waiting to be claimed by a user (see QuestionInventory)
+    in_inventory = Column(Boolean, nullable=False, default=False, server_default=text("false"))
+
     responses = relationship("Response", back_populates="question")
 
+    __table_args__ = (
+        # Partial index so claiming an inventory question is a single index probe
+        Index(
+            "ix_questions_inventory",
+            "discipline", "difficulty", "id",
+            postgresql_where=text("in_inventory"),
+            sqlite_where=text("in_inventory = 1"),
+        ),
+        # Adaptive selection scans unseen questions for a pair, optionally per question type
+        Index("ix_questions_selection", "discipline", "difficulty", "question_type", "id"),
+    )
+
+# Multi-valued taxonomy columns on Question, mirrored row-per-value into question_tags
+TAG_DIMENSIONS = ("disciplines", "body_systems", "specialties", "pathophysiology")
+
+class QuestionTag(Base):
+    """
+    One taxonomy value of a question, normalized out of the JSON tag columns so analytics
+    can join and GROUP BY tags in SQL. Written by backend.services.question_tags wherever
+    questions are stored or re-tagged.
+    """
+    __tablename__ = "question_tags"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    dimension = Column(String, primary_key=True)  # One of TAG_DIMENSIONS
+    value = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_question_tags_dimension_value", "dimension", "value", "question_id"),
+    )
+
 class Response(Base):
     """
     Represents a user's answer to a specific question.
@@ -83,11 +129,106 @@ class Response(Base):
     user_answer = Column(Text, nullable=False)
     is_correct = Column(Boolean, nullable=True)
     feedback = Column(Text, nullable=True)  # AI-generated feedback
+    feedback_status = Column(String, nullable=True)  # "pending", "ready" or "failed"; NULL for legacy rows
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
     user = relationship("User", back_populates="responses")
     question = relationship("Question", back_populates="responses")
 
+    __table_args__ = (
+        # Backs the "already answered" anti-join in adaptive selection
+        Index("ix_responses_user_question", "user_id", "question_id"),
+        # Range scan of one user's answers in a time window (performance stats)
+        Index("ix_responses_user_created", "user_id", "created_at"),
+        # Range scan of one day's answers for the daily usage rollup
+        Index("ix_responses_created_at", "created_at"),
+    )
+
+class FeedbackCacheEntry(Base):
+    """
+    Persistent tier of the feedback cache: AI feedback reused for every student who picks
+    the same choice on the same question.
+    """
+    __tablename__ = "feedback_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    answer_key = Column(String, nullable=False)  # Normalized user answer, e.g. "B"
+    question_hash = Column(String, nullable=False)  # Hash of question text, correct answer and explanation; stale on change
+    feedback = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("question_id", "answer_key", name="uq_feedback_cache_question_answer"),
+    )
+
+class ReviewCard(Base):
+    """
+    Spaced-repetition state for one (user, question) pair, updated on every answer.
+    The (user_id, due_at) index lets the review queue pop due cards with one range scan.
+    """
+    __tablename__ = "review_cards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), nullable=False)
+    repetitions = Column(Integer, nullable=False, default=0)  # Consecutive correct reviews
+    interval_days = Column(Float, nullable=False, default=0.0)
+    ease_factor = Column(Float, nullable=False, default=2.5)
+    lapses = Column(Integer, nullable=False, default=0)
+    due_at = Column(DateTime, nullable=False)
+    last_reviewed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "question_id", name="uq_review_cards_user_question"),
+        Index("ix_review_cards_user_due", "user_id", "due_at"),
+    )
+
+class UserCategoryStat(Base):
+    """
+    Per-user answer counters for every taxonomy category, maintained at write time so
+    analytics reads cost O(categories) instead of a scan of the user's history.
+    """
+    __tablename__ = "user_category_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    dimension = Column(String, primary_key=True)  # "disciplines", "question_type", ...
+    category = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+    last_answered_at = Column(DateTime, nullable=True)
+
+class DailyUsageRollup(Base):
+    """
+    System-wide usage for one UTC day, so usage stats for any window sum one row per day.
+    Distinct users cannot be summed across days, so each row also keeps a HyperLogLog
+    sketch of its users that merges into the window's distinct count.
+    """
+    __tablename__ = "daily_usage_rollup"
+
+    day = Column(Date, primary_key=True)
+    active_users = Column(Integer, nullable=False, default=0)  # Exact for the day
+    answers = Column(Integer, nullable=False, default=0)
+    discipline_counts = Column(Text, nullable=False, default="{}")  # JSON object of discipline -> answers
+    user_sketch = Column(LargeBinary, nullable=False)  # HyperLogLog registers
+    refreshed_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class LLMUsage(Base):
+    """
+    Per-user LLM token ledger: one row per (user, UTC day, operation), incremented with
+    usage.total_tokens after every call made on the user's behalf. Backs daily budgets.
+    """
+    __tablename__ = "llm_usage_ledger"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    operation = Column(String, primary_key=True)  # "question" or "feedback"
+    calls = Column(Integer, nullable=False, default=0)
+    tokens = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 class SSOConfiguration(Base):
     """
     Stores SAML/OIDC configuration details for partner institutions.
@@ -32,6 +32,12 @@ class Question(BaseModel):
 class AnswerCreate(BaseModel):
     question_id: int
     user_answer: str
+    defer_feedback: bool | None = None  # None uses the server's FEEDBACK_MODE
+
+class AnswerFeedback(BaseModel):
+    response_id: int
+    status: str  # "pending", "ready" or "failed"
+    personalized_feedback: str | None = None
 
 # --- Analytics Schemas ---
 class DisciplinePerformance(BaseModel):
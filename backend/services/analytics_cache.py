@@ -0,0 +1,182 @@
+"""
+Versioned cache for per-user analytics responses.
+
+Entries are keyed by (user_id, endpoint, params, data version). The version is bumped
+whenever the user submits an answer or a question they answered is re-tagged, so stale entries are never read again and simply
+age out. The ETag of a response is derived from the same key, which lets the API answer
+If-None-Match with 304 from the version alone, without touching the database.
+
+The in-process backend is right for a single worker. Multi-worker deployments must set
+ANALYTICS_CACHE_REDIS_URL (requires the optional `redis` package) so every worker sees
+the same versions; otherwise a worker that never saw the bump would keep serving (and
+revalidating) the body from before the user's latest answer. Without Redis the cache is
+therefore turned off when WEB_CONCURRENCY or uvicorn's --workers asks for several workers.
+"""
+import os
+import sys
+import json
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from backend.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+class MemoryAnalyticsBackend:
+    """Process-local versions and LRU entries"""
+
+    def __init__(self, maxsize: int, ttl_seconds: Optional[float]):
+        self.entries = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        # A fresh epoch per process, so ETags issued before a restart never match
+        self._epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def version(self, user_id: int) -> str:
+        with self._lock:
+            return f"{self._epoch}.{self._versions.get(user_id, 0)}"
+
+    def bump(self, user_id: int):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def get(self, key: str) -> Any:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: Any):
+        self.entries.set(key, value)
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._versions.clear()
+            self._epoch = uuid.uuid4().hex[:8]
+
+class RedisAnalyticsBackend:
+    """Versions and entries shared by every worker through Redis"""
+
+    def __init__(self, url: str, ttl_seconds: Optional[float]):
+        import redis  # Optional dependency, only needed for the shared backend
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds) if ttl_seconds else None
+
+    def _version_key(self, user_id: int) -> str:
+        return f"analytics:version:{user_id}"
+
+    def version(self, user_id: int) -> str:
+        key = self._version_key(user_id)
+        value = self.client.get(key)
+        if value is None:
+            # Start from a random value so a lost key never revives an old version
+            self.client.set(key, uuid.uuid4().int % 10 ** 12, nx=True)
+            value = self.client.get(key)
+        return value.decode() if isinstance(value, bytes) else str(value)
+
+    def bump(self, user_id: int):
+        self.client.incr(self._version_key(user_id))
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(f"analytics:entry:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        self.client.set(f"analytics:entry:{key}", json.dumps(value), ex=self.ttl_seconds)
+
+    def clear(self):
+        for key in self.client.scan_iter("analytics:*"):
+            self.client.delete(key)
+
+def configured_workers(argv=None) -> int:
+    """Server worker processes: uvicorn's --workers (children inherit the argv), else WEB_CONCURRENCY"""
+    argv = sys.argv if argv is None else argv
+    for index, arg in enumerate(argv):
+        value = None
+        if arg == "--workers" and index + 1 < len(argv):
+            value = argv[index + 1]
+        elif arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        if value is not None:
+            try:
+                return int(value)
+            except ValueError:
+                break
+    try:
+        return int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+class AnalyticsCache:
+    def __init__(self, backend=None):
+        self.enabled = os.getenv("ANALYTICS_CACHE_ENABLED", "true").lower() == "true"
+        ttl = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600")) or None
+        redis_url = os.getenv("ANALYTICS_CACHE_REDIS_URL")
+        if backend is None:
+            if redis_url:
+                backend = RedisAnalyticsBackend(redis_url, ttl)
+            else:
+                backend = MemoryAnalyticsBackend(int(os.getenv("ANALYTICS_CACHE_SIZE", "2048")), ttl)
+                workers = configured_workers()
+                if self.enabled and workers > 1:
+                    logger.error(f"Analytics cache disabled: {workers} workers without ANALYTICS_CACHE_REDIS_URL "
+                                 "would serve stale analytics from workers that missed an answer")
+                    self.enabled = False
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counters = {"not_modified": 0, "hits": 0, "misses": 0, "errors": 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    @staticmethod
+    def key(user_id: int, endpoint: str, params: Dict, version: str) -> str:
+        raw = json.dumps([user_id, endpoint, params, version], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def lookup(self, user_id: int, endpoint: str, params: Dict,
+               if_none_match: Optional[str] = None) -> Tuple[Optional[str], bool, Any]:
+        """
+        Returns (etag, not_modified, cached_value). The etag is None when the backend is
+        unreachable, in which case the caller should compute without caching.
+        """
+        try:
+            key = self.key(user_id, endpoint, params, self.backend.version(user_id))
+            etag = f'"{key}"'
+            if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+                self._count("not_modified")
+                return etag, True, None
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Analytics cache lookup failed for user {user_id}: {str(e)}")
+            self._count("errors")
+            return None, False, None
+        self._count("hits" if value is not None else "misses")
+        return etag, False, value
+
+    def store(self, etag: str, value: Any):
+        try:
+            self.backend.set(etag.strip('"'), value)
+        except Exception as e:
+            logger.error(f"Analytics cache store failed: {str(e)}")
+            self._count("errors")
+
+    def bump(self, user_id: int):
+        """Invalidate every cached analytics response of the user"""
+        try:
+            self.backend.bump(user_id)
+        except Exception as e:
+            logger.error(f"Analytics cache version bump failed for user {user_id}: {str(e)}")
+            self._count("errors")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"enabled": self.enabled, "backend": type(self.backend).__name__, **self._counters}
+
+analytics_cache = AnalyticsCache()
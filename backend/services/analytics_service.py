@@ -1,11 +1,13 @@
 import logging
+from collections import defaultdict
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, select
 
 from backend.models import User, Question, Response
 from backend.database import get_db
+from backend.services.usage_rollup import usage_rollup
 
 logger = logging.getLogger(__name__)
 
@@ -25,87 +27,98 @@ class AnalyticsService:
         """Log user session summary for analytics"""
         logger.info(f"ANALYTICS: Session ended - User: {user_id}, Duration: {session_duration_minutes}min, Questions: {questions_answered}")
     
-    def get_user_performance_stats(self, user_id: int, db: Session, days: int = 30) -> Dict:
-        """Get comprehensive user performance statistics"""
+    @staticmethod
+    def _breakdown(counts: Dict, key_name: str) -> List[Dict]:
+        return [
+            {
+                key_name: key,
+                "total": total,
+                "correct": correct,
+                "accuracy": round(correct / total * 100, 1) if total > 0 else 0
+            }
+            for key, (total, correct) in counts.items()
+        ]
+
+    def get_user_performance_stats(self, user_id: int, db: Session, days: int = 30,
+                                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                   activity_days: int = 7) -> Dict:
+        """
+        Get comprehensive user performance statistics for the window [start, end)
+        (default: the last `days` days), with daily activity for the last `activity_days`.
+
+        Everything comes from one indexed scan of the user's responses grouped by
+        (discipline, difficulty, day); window and activity membership are conditional
+        aggregates, and the totals and breakdowns are rolled up from those rows.
+        """
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Total questions answered
-            total_responses = db.query(Response).filter(
-                and_(Response.user_id == user_id, Response.created_at >= cutoff_date)
-            ).count()
-            
-            # Correct answers
-            correct_responses = db.query(Response).filter(
-                and_(
+            end = end or datetime.utcnow()
+            window_start = start or end - timedelta(days=days)
+            activity_start = end - timedelta(days=activity_days)
+
+            in_window = Response.created_at >= window_start
+            in_activity = Response.created_at >= activity_start
+            is_correct = Response.is_correct == True
+            day = func.date(Response.created_at)
+
+            def tally(*conditions):
+                return func.sum(case((and_(*conditions), 1), else_=0))
+
+            rows = db.execute(
+                select(
+                    Question.discipline,
+                    Question.difficulty,
+                    day.label("day"),
+                    tally(in_window).label("total"),
+                    tally(in_window, is_correct).label("correct"),
+                    tally(in_activity).label("activity_total"),
+                    tally(in_activity, is_correct).label("activity_correct")
+                )
+                .select_from(Response)
+                .join(Question, Response.question_id == Question.id)
+                .where(
                     Response.user_id == user_id,
-                    Response.is_correct == True,
-                    Response.created_at >= cutoff_date
+                    Response.created_at >= min(window_start, activity_start),
+                    Response.created_at < end
                 )
-            ).count()
-            
-            # Performance by specialty
-            specialty_stats = db.query(
-                Question.discipline,
-                func.count(Response.id).label('total'),
-                func.sum(func.cast(Response.is_correct, db.Integer)).label('correct')
-            ).join(Response).filter(
-                and_(Response.user_id == user_id, Response.created_at >= cutoff_date)
-            ).group_by(Question.discipline).all()
-            
-            # Performance by difficulty
-            difficulty_stats = db.query(
-                Question.difficulty,
-                func.count(Response.id).label('total'),
-                func.sum(func.cast(Response.is_correct, db.Integer)).label('correct')
-            ).join(Response).filter(
-                and_(Response.user_id == user_id, Response.created_at >= cutoff_date)
-            ).group_by(Question.difficulty).all()
-            
-            # Recent activity (last 7 days)
-            recent_cutoff = datetime.utcnow() - timedelta(days=7)
-            daily_activity = db.query(
-                func.date(Response.created_at).label('date'),
-                func.count(Response.id).label('questions_answered'),
-                func.sum(func.cast(Response.is_correct, db.Integer)).label('correct_answers')
-            ).filter(
-                and_(Response.user_id == user_id, Response.created_at >= recent_cutoff)
-            ).group_by(func.date(Response.created_at)).all()
-            
+                .group_by(Question.discipline, Question.difficulty, day)
+            ).all()
+
+            total_responses = correct_responses = 0
+            by_specialty: Dict = defaultdict(lambda: [0, 0])
+            by_difficulty: Dict = defaultdict(lambda: [0, 0])
+            by_day: Dict = defaultdict(lambda: [0, 0])
+            for row in rows:
+                total, correct = row.total or 0, row.correct or 0
+                if total:
+                    total_responses += total
+                    correct_responses += correct
+                    for bucket in (by_specialty[row.discipline], by_difficulty[row.difficulty]):
+                        bucket[0] += total
+                        bucket[1] += correct
+                if row.activity_total:
+                    # SQLite returns DATE() as text, PostgreSQL as a date
+                    date = row.day if isinstance(row.day, str) else row.day.isoformat()
+                    by_day[date][0] += row.activity_total
+                    by_day[date][1] += row.activity_correct or 0
+
             overall_accuracy = (correct_responses / total_responses * 100) if total_responses > 0 else 0
             
             stats = {
                 "user_id": user_id,
-                "period_days": days,
+                "period_days": days if start is None else (end - window_start).days,
                 "total_questions": total_responses,
                 "correct_answers": correct_responses,
                 "overall_accuracy": round(overall_accuracy, 1),
-                "specialty_performance": [
-                    {
-                        "specialty": stat.discipline,
-                        "total": stat.total,
-                        "correct": stat.correct or 0,
-                        "accuracy": round((stat.correct or 0) / stat.total * 100, 1) if stat.total > 0 else 0
-                    }
-                    for stat in specialty_stats
-                ],
-                "difficulty_performance": [
-                    {
-                        "difficulty": stat.difficulty,
-                        "total": stat.total,
-                        "correct": stat.correct or 0,
-                        "accuracy": round((stat.correct or 0) / stat.total * 100, 1) if stat.total > 0 else 0
-                    }
-                    for stat in difficulty_stats
-                ],
+                "specialty_performance": self._breakdown(by_specialty, "specialty"),
+                "difficulty_performance": self._breakdown(by_difficulty, "difficulty"),
                 "daily_activity": [
                     {
-                        "date": activity.date.isoformat(),
-                        "questions_answered": activity.questions_answered,
-                        "correct_answers": activity.correct_answers or 0,
-                        "accuracy": round((activity.correct_answers or 0) / activity.questions_answered * 100, 1) if activity.questions_answered > 0 else 0
+                        "date": date,
+                        "questions_answered": answered,
+                        "correct_answers": correct,
+                        "accuracy": round(correct / answered * 100, 1) if answered > 0 else 0
                     }
-                    for activity in daily_activity
+                    for date, (answered, correct) in sorted(by_day.items())
                 ]
             }
             
@@ -122,46 +135,15 @@ class AnalyticsService:
             }
     
     def get_system_usage_stats(self, db: Session, days: int = 30) -> Dict:
-        """Get system-wide usage statistics"""
+        """Get system-wide usage statistics from the daily usage rollup"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Total users active in period
-            active_users = db.query(func.count(func.distinct(Response.user_id))).filter(
-                Response.created_at >= cutoff_date
-            ).scalar()
-            
-            # Total questions generated/answered
-            total_questions = db.query(func.count(Response.id)).filter(
-                Response.created_at >= cutoff_date
-            ).scalar()
-            
-            # Most popular specialties
-            popular_specialties = db.query(
-                Question.discipline,
-                func.count(Response.id).label('usage_count')
-            ).join(Response).filter(
-                Response.created_at >= cutoff_date
-            ).group_by(Question.discipline).order_by(
-                func.count(Response.id).desc()
-            ).limit(10).all()
-            
-            stats = {
-                "period_days": days,
-                "active_users": active_users,
-                "total_questions_answered": total_questions,
-                "avg_questions_per_user": round(total_questions / active_users, 1) if active_users > 0 else 0,
-                "popular_specialties": [
-                    {"specialty": spec.discipline, "usage_count": spec.usage_count}
-                    for spec in popular_specialties
-                ]
-            }
-            
-            logger.info(f"Generated system usage stats: {active_users} active users, {total_questions} questions answered")
+            stats = usage_rollup.system_stats(db, days)
+            logger.info(f"Generated system usage stats: {stats['active_users']} active users, {stats['total_questions_answered']} questions answered")
             return stats
             
         except Exception as e:
             logger.error(f"Error generating system usage stats: {str(e)}")
+            db.rollback()
             return {"error": "Unable to generate system statistics"}
 
 analytics_service = AnalyticsService()
\ No newline at end of file
@@ -0,0 +1,129 @@
+import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, delete, exists, func, literal, select
+from sqlalchemy.orm import Session
+
+from backend.database import dialect_insert
+from backend.models import Question, QuestionTag, Response, UserCategoryStat, TAG_DIMENSIONS
+from backend.services.question_tags import question_tag_rows
+
+SINGLE_VALUE_DIMENSIONS = ("question_type", "age_group", "acuity")
+DIMENSIONS = TAG_DIMENSIONS + SINGLE_VALUE_DIMENSIONS
+
+def normalize_dimension(group_by: str) -> str:
+    """Unknown grouping dimensions default to disciplines"""
+    return group_by if group_by in DIMENSIONS else "disciplines"
+
+def category_expression(dimension: str):
+    """
+    Category column for a dimension plus the question_tags join it needs (None for the
+    single-valued columns). Untagged questions fall back to the legacy discipline or
+    "General Medicine", "General" and "Unknown".
+    """
+    if dimension in SINGLE_VALUE_DIMENSIONS:
+        return func.coalesce(getattr(Question, dimension), "Unknown"), None
+
+    fallback = {
+        "disciplines": func.coalesce(Question.discipline, "General Medicine"),
+        "body_systems": literal("General"),
+        "specialties": literal("General Medicine"),
+        "pathophysiology": literal("Unknown"),
+    }[dimension]
+    join_on = and_(QuestionTag.question_id == Question.id, QuestionTag.dimension == dimension)
+    return func.coalesce(QuestionTag.value, fallback), join_on
+
+def question_categories(question: Question) -> Dict[str, List[str]]:
+    """Categories a question counts towards in every dimension, matching category_expression"""
+    tags: Dict[str, List[str]] = {dimension: [] for dimension in TAG_DIMENSIONS}
+    for row in question_tag_rows(question.id, {d: getattr(question, d) for d in TAG_DIMENSIONS}):
+        tags[row["dimension"]].append(row["value"])
+    fallbacks = {
+        "disciplines": question.discipline or "General Medicine",
+        "body_systems": "General",
+        "specialties": "General Medicine",
+        "pathophysiology": "Unknown",
+    }
+    categories = {dimension: values or [fallbacks[dimension]] for dimension, values in tags.items()}
+    for dimension in SINGLE_VALUE_DIMENSIONS:
+        categories[dimension] = [getattr(question, dimension) or "Unknown"]
+    return categories
+
+def _aggregate(dimension: str, user_id: Optional[int] = None):
+    """(user_id, dimension, category, total, correct, last_answered_at) grouped from raw responses"""
+    category, join_on = category_expression(dimension)
+    stmt = (
+        select(
+            Response.user_id,
+            literal(dimension),
+            category,
+            func.count(),
+            func.sum(case((Response.is_correct == True, 1), else_=0)),
+            func.max(Response.created_at)
+        )
+        .select_from(Response)
+        .join(Question, Response.question_id == Question.id)
+    )
+    if join_on is not None:
+        stmt = stmt.outerjoin(QuestionTag, join_on)
+    if user_id is not None:
+        stmt = stmt.where(Response.user_id == user_id)
+    else:
+        # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT
+        stmt = stmt.where(Response.user_id.is_not(None))
+    return stmt.group_by(Response.user_id, category)
+
+def rebuild(db: Session, user_id: Optional[int] = None):
+    """Recompute user_category_stats from responses for one user or everyone; the caller commits"""
+    target = delete(UserCategoryStat)
+    if user_id is not None:
+        target = target.where(UserCategoryStat.user_id == user_id)
+    db.execute(target)
+
+    columns = ["user_id", "dimension", "category", "total", "correct", "last_answered_at"]
+    for dimension in DIMENSIONS:
+        stmt = dialect_insert(db, UserCategoryStat.__table__).from_select(columns, _aggregate(dimension, user_id))
+        # A concurrent rebuild of the same user may have won the race; its rows are equivalent
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["user_id", "dimension", "category"]))
+
+def _has_rows(db: Session, user_id: int) -> bool:
+    return db.scalar(select(exists().where(UserCategoryStat.user_id == user_id)))
+
+def record_answer(db: Session, user_id: int, question: Question, is_correct: bool,
+                  answered_at: Optional[datetime.datetime] = None):
+    """
+    Count one answer towards every category of the question with a single multi-row
+    upsert, in the caller's transaction. Call it before the new response is flushed:
+    a user without rollup rows yet is first rebuilt from their existing responses.
+    """
+    if not _has_rows(db, user_id):
+        rebuild(db, user_id)
+
+    answered_at = answered_at or datetime.datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "dimension": dimension, "category": category,
+         "total": 1, "correct": int(bool(is_correct)), "last_answered_at": answered_at}
+        for dimension, categories in question_categories(question).items()
+        for category in categories
+    ]
+    stmt = dialect_insert(db, UserCategoryStat.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "dimension", "category"],
+        set_={
+            "total": UserCategoryStat.__table__.c.total + stmt.excluded.total,
+            "correct": UserCategoryStat.__table__.c.correct + stmt.excluded.correct,
+            "last_answered_at": stmt.excluded.last_answered_at
+        }
+    )
+    db.execute(stmt)
+
+def category_performance(db: Session, user_id: int, group_by: str) -> list:
+    """(category, total, correct) rows for one dimension, read from the rollup"""
+    if not _has_rows(db, user_id):
+        rebuild(db, user_id)
+        db.commit()
+    return db.execute(
+        select(UserCategoryStat.category, UserCategoryStat.total, UserCategoryStat.correct)
+        .where(UserCategoryStat.user_id == user_id, UserCategoryStat.dimension == normalize_dimension(group_by))
+        .order_by(UserCategoryStat.category)
+    ).all()
@@ -0,0 +1,196 @@
+"""
+Offline stand-in for the OpenAI chat completions client, selected with LLM_PROVIDER=fake.
+
+FakeLLMClient and AsyncFakeLLMClient expose client.chat.completions.create() with the
+same response shape as the OpenAI SDK (including stream=True), so OpenAIService and
+AzureOpenAITagger run unchanged. Replies are valid question, batch, feedback or tag
+JSON chosen from the prompt, and their behavior is configured with:
+
+    FAKE_LLM_LATENCY         fixed:<ms> | uniform:<min_ms>:<max_ms> | lognormal:<median_ms>:<sigma>
+                             | exponential:<mean_ms>   (default lognormal:800:0.5)
+    FAKE_LLM_STREAM_CHUNK_MS delay between streamed chunks (default 20)
+    FAKE_LLM_ERROR_RATE      fraction of calls failing with a 503 (default 0)
+    FAKE_LLM_MALFORMED_RATE  fraction of replies with truncated JSON (default 0)
+    FAKE_LLM_SEED            seed for reproducible runs
+"""
+import os
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import httpx
+import openai
+
+from backend.services.taxonomy import TAXONOMY, LIST_CATEGORIES
+
+def fake_provider_enabled() -> bool:
+    return os.getenv("LLM_PROVIDER", "").lower() == "fake"
+
+def parse_latency(spec: str):
+    """Build a sampler returning seconds from a FAKE_LLM_LATENCY spec"""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(":") if value]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / values[0]) / 1000 if values[0] else 0.0
+    raise ValueError(f"Unknown FAKE_LLM_LATENCY distribution: {spec}")
+
+class FakeLLMProfile:
+    """Latency, failure and content generation shared by the sync and async fake clients"""
+
+    def __init__(self):
+        self.sample_latency = parse_latency(os.getenv("FAKE_LLM_LATENCY", "lognormal:800:0.5"))
+        self.chunk_delay = float(os.getenv("FAKE_LLM_STREAM_CHUNK_MS", "20")) / 1000
+        self.error_rate = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+        self.malformed_rate = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+        seed = os.getenv("FAKE_LLM_SEED")
+        self._rng = random.Random(int(seed) if seed else None)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def plan(self, timeout: Optional[float]) -> Dict:
+        """Decide latency and failure mode for one call"""
+        with self._lock:
+            latency = max(0.0, self.sample_latency(self._rng))
+            self._counter += 1
+            number = self._counter
+        failure = None
+        if timeout is not None and latency > timeout:
+            latency, failure = timeout, "timeout"
+        elif self._random() < self.error_rate:
+            failure = "error"
+        return {"latency": latency, "failure": failure, "number": number}
+
+    def failure_exception(self, failure: str) -> Exception:
+        request = httpx.Request("POST", "http://fake-llm.local/v1/chat/completions")
+        if failure == "timeout":
+            return openai.APITimeoutError(request=request)
+        response = httpx.Response(503, request=request)
+        return openai.InternalServerError("Fake LLM injected failure", response=response, body=None)
+
+    def reply(self, messages: List[Dict], number: int) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        if "numbered medical questions" in system:
+            content = json.dumps({"results": [self._tags(number * 100 + i) for i in range(max(1, len(re.findall(r"(?m)^Question \d+:", user))))]})
+        elif "structured taxonomy" in system:
+            content = json.dumps(self._tags(number))
+        elif '"questions" array' in system:
+            match = re.search(r"Create (\d+) distinct", system)
+            count = int(match.group(1)) if match else 1
+            content = json.dumps({"questions": [self._question(system, number * 100 + i) for i in range(count)]})
+        elif "Format your response as JSON" in system:
+            content = json.dumps(self._question(system, number))
+        else:
+            content = (f"Fake feedback #{number}: review the key findings in the stem and compare "
+                       f"them with the correct answer before moving on.")
+
+        if content.startswith("{") and self._random() < self.malformed_rate:
+            content = content[:max(1, len(content) // 2)]
+        return content
+
+    def _question(self, system: str, number: int) -> Dict:
+        match = re.search(r"creating (\S+) level (.+?) questions", system)
+        difficulty, specialty = (match.group(1).title(), match.group(2)) if match else ("Intermediate", "General Medicine")
+        return {
+            "question": f"Fake {specialty} question #{number}: A {30 + number % 50}-year-old patient presents with "
+                        f"a typical {specialty.lower()} complaint. What is the most likely diagnosis?",
+            "options": {"A": "Condition A", "B": "Condition B", "C": "Condition C", "D": "Condition D"},
+            "correct_answer": "ABCD"[number % 4],
+            "explanation": f"Condition {'ABCD'[number % 4]} best explains the presentation in fake question #{number}.",
+            "difficulty": difficulty,
+            "specialty": specialty,
+            "topics": [specialty.lower(), "fake"]
+        }
+
+    def _tags(self, number: int) -> Dict:
+        return {
+            category: [values[number % len(values)]] if category in LIST_CATEGORIES else values[number % len(values)]
+            for category, values in TAXONOMY.items()
+        }
+
+def _usage(messages: List[Dict], content: str) -> SimpleNamespace:
+    prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 4
+    completion_tokens = len(content) // 4
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt_tokens + completion_tokens)
+
+def _completion(messages: List[Dict], content: str) -> SimpleNamespace:
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+                           usage=_usage(messages, content), model="fake-llm")
+
+def _chunks(messages: List[Dict], content: str, stream_options: Optional[Dict] = None,
+            size: int = 16) -> List[SimpleNamespace]:
+    chunks = [
+        SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=content[i:i + size]))], usage=None)
+        for i in range(0, len(content), size)
+    ]
+    if (stream_options or {}).get("include_usage"):
+        # Like the real API: one last chunk with no choices that carries the usage
+        chunks.append(SimpleNamespace(choices=[], usage=_usage(messages, content)))
+    return chunks
+
+class _Completions:
+    def __init__(self, profile: FakeLLMProfile):
+        self._profile = profile
+
+    def create(self, messages: List[Dict], stream: bool = False, timeout: Optional[float] = None,
+               stream_options: Optional[Dict] = None, **kwargs):
+        plan = self._profile.plan(timeout)
+        time.sleep(plan["latency"])
+        if plan["failure"]:
+            raise self._profile.failure_exception(plan["failure"])
+        content = self._profile.reply(messages, plan["number"])
+        if not stream:
+            return _completion(messages, content)
+
+        def chunk_stream():
+            for chunk in _chunks(messages, content, stream_options):
+                time.sleep(self._profile.chunk_delay)
+                yield chunk
+        return chunk_stream()
+
+class _AsyncCompletions:
+    def __init__(self, profile: FakeLLMProfile):
+        self._profile = profile
+
+    async def create(self, messages: List[Dict], stream: bool = False, timeout: Optional[float] = None,
+                     stream_options: Optional[Dict] = None, **kwargs):
+        plan = self._profile.plan(timeout)
+        await asyncio.sleep(plan["latency"])
+        if plan["failure"]:
+            raise self._profile.failure_exception(plan["failure"])
+        content = self._profile.reply(messages, plan["number"])
+        if not stream:
+            return _completion(messages, content)
+
+        async def chunk_stream():
+            for chunk in _chunks(messages, content, stream_options):
+                await asyncio.sleep(self._profile.chunk_delay)
+                yield chunk
+        return chunk_stream()
+
+class FakeLLMClient:
+    def __init__(self, profile: Optional[FakeLLMProfile] = None):
+        self.chat = SimpleNamespace(completions=_Completions(profile or FakeLLMProfile()))
+
+class AsyncFakeLLMClient:
+    def __init__(self, profile: Optional[FakeLLMProfile] = None):
+        self.chat = SimpleNamespace(completions=_AsyncCompletions(profile or FakeLLMProfile()))
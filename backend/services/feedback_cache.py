@@ -0,0 +1,232 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from backend.database import dialect_insert
+from backend.models import FeedbackCacheEntry
+from backend.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_OPTION_LETTER = re.compile(r"^\(?([A-Z])\)?[.):]?(\s|$)")
+
+def normalize_answer(user_answer: str) -> str:
+    """Normalize a submitted choice so "b", " B " and "B) Aspirin" share a cache entry"""
+    normalized = " ".join((user_answer or "").split()).upper()
+    match = _OPTION_LETTER.match(normalized)
+    return match.group(1) if match else normalized
+
+def question_hash(question: str, correct_answer: str, explanation: Optional[str]) -> str:
+    """Hash of every question field that feeds the feedback prompt"""
+    digest = hashlib.sha256()
+    for part in (question or "", correct_answer or "", explanation or ""):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class FeedbackCache:
+    """
+    Two-tier cache for AI answer feedback keyed by (question_id, normalized answer).
+
+    The in-process LRU serves repeat answers without touching the database; the
+    feedback_cache table shares entries across workers and restarts. Entries carry a
+    hash of the question text, correct answer and explanation, so editing any of them
+    invalidates the cached feedback automatically.
+
+    Neither reads nor writes touch the caller's transaction: hits are counted in memory and
+    flushed to hit_count/last_used_at in one batched UPDATE every FEEDBACK_CACHE_HIT_FLUSH_SECONDS
+    and before every prune, stores commit on a session of their own, and every
+    FEEDBACK_CACHE_PRUNE_EVERY stores a background thread prunes the table.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("FEEDBACK_CACHE_ENABLED", "true").lower() == "true"
+        self.memory = LRUCache(
+            maxsize=int(os.getenv("FEEDBACK_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("FEEDBACK_CACHE_TTL_SECONDS", "86400"))
+        )
+        self.db_ttl = timedelta(days=int(os.getenv("FEEDBACK_CACHE_DB_TTL_DAYS", "30")))
+        self.db_max_rows = int(os.getenv("FEEDBACK_CACHE_DB_MAX_ROWS", "100000"))
+        self.prune_every = int(os.getenv("FEEDBACK_CACHE_PRUNE_EVERY", "500"))
+        self.hit_flush_interval = float(os.getenv("FEEDBACK_CACHE_HIT_FLUSH_SECONDS", "60"))
+        self._lock = threading.Lock()
+        self._hits: Dict[Tuple[int, str], Tuple[int, datetime]] = {}
+        self._last_hit_flush = time.monotonic()
+        self._pruning = False
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "pruned": 0}
+
+    def get(self, db: Session, question_id: int, user_answer: str, q_hash: str) -> Optional[str]:
+        """Return cached feedback for the answer, or None on a miss"""
+        answer_key = normalize_answer(user_answer)
+        memory_key = (question_id, answer_key, q_hash)
+
+        feedback = self.memory.get(memory_key)
+        if feedback is not None:
+            self._count("memory_hits")
+            self._record_hit(db, question_id, answer_key)
+            return feedback
+
+        try:
+            entry = db.query(FeedbackCacheEntry).filter(
+                FeedbackCacheEntry.question_id == question_id,
+                FeedbackCacheEntry.answer_key == answer_key
+            ).first()
+            now = datetime.utcnow()
+            if entry is None or entry.question_hash != q_hash or entry.last_used_at < now - self.db_ttl:
+                self._count("misses")
+                return None
+
+            feedback = entry.feedback
+        except Exception as e:
+            logger.error(f"Feedback cache lookup failed for question {question_id}: {str(e)}")
+            self._count("misses")
+            return None
+
+        self.memory.set(memory_key, feedback)
+        self._count("db_hits")
+        self._record_hit(db, question_id, answer_key)
+        return feedback
+
+    def _record_hit(self, db: Session, question_id: int, answer_key: str):
+        with self._lock:
+            count, _ = self._hits.get((question_id, answer_key), (0, None))
+            self._hits[(question_id, answer_key)] = (count + 1, datetime.utcnow())
+            due = time.monotonic() - self._last_hit_flush >= self.hit_flush_interval
+            if due:
+                self._last_hit_flush = time.monotonic()
+        if due:
+            # Own session on the same engine, so the caller's transaction is left alone
+            with Session(bind=db.get_bind()) as flush_db:
+                self.flush_hits(flush_db)
+
+    def flush_hits(self, db: Session) -> int:
+        """Write the hits counted since the last flush in one batch and commit; returns rows touched"""
+        with self._lock:
+            hits, self._hits = self._hits, {}
+        if not hits:
+            return 0
+
+        table = FeedbackCacheEntry.__table__
+        stmt = (
+            update(table)
+            .where(table.c.question_id == bindparam("entry_question_id"), table.c.answer_key == bindparam("entry_answer_key"))
+            .values(hit_count=func.coalesce(table.c.hit_count, 0) + bindparam("hits"), last_used_at=bindparam("used_at"))
+        )
+        try:
+            db.execute(stmt, [
+                {"entry_question_id": question_id, "entry_answer_key": answer_key, "hits": count, "used_at": used_at}
+                for (question_id, answer_key), (count, used_at) in hits.items()
+            ])
+            db.commit()
+        except Exception as e:
+            # Hit counts only steer pruning, so a failed flush is dropped rather than retried
+            logger.error(f"Feedback cache hit flush failed: {str(e)}")
+            db.rollback()
+            return 0
+        return len(hits)
+
+    def put(self, db: Session, question_id: int, user_answer: str, q_hash: str, feedback: str):
+        """Store feedback in both tiers, replacing any stale entry for the same answer"""
+        answer_key = normalize_answer(user_answer)
+        self.memory.set((question_id, answer_key, q_hash), feedback)
+
+        now = datetime.utcnow()
+        stmt = dialect_insert(db, FeedbackCacheEntry.__table__).values(
+            question_id=question_id,
+            answer_key=answer_key,
+            question_hash=q_hash,
+            feedback=feedback,
+            hit_count=0,
+            created_at=now,
+            last_used_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["question_id", "answer_key"],
+            set_={
+                "question_hash": stmt.excluded.question_hash,
+                "feedback": stmt.excluded.feedback,
+                "hit_count": 0,
+                "created_at": now,
+                "last_used_at": now
+            }
+        )
+        # Own session on the same engine, so the caller's transaction is left alone
+        with Session(bind=db.get_bind()) as store_db:
+            try:
+                store_db.execute(stmt)
+                store_db.commit()
+            except Exception as e:
+                logger.error(f"Feedback cache store failed for question {question_id}: {str(e)}")
+                store_db.rollback()
+                return
+
+        if self._count("stores") % self.prune_every == 0:
+            self._prune_in_background(db.get_bind())
+
+    def _prune_in_background(self, bind):
+        """Prune on a thread of its own, so no request waits on the DELETEs; one prune at a time"""
+        with self._lock:
+            if self._pruning:
+                return
+            self._pruning = True
+
+        def run():
+            try:
+                with Session(bind=bind) as prune_db:
+                    self.prune(prune_db)
+            finally:
+                with self._lock:
+                    self._pruning = False
+
+        threading.Thread(target=run, name="feedback-cache-prune", daemon=True).start()
+
+    def prune(self, db: Session) -> int:
+        """Delete expired rows and the least recently used rows beyond db_max_rows"""
+        self.flush_hits(db)
+        try:
+            removed = db.query(FeedbackCacheEntry).filter(
+                FeedbackCacheEntry.last_used_at < datetime.utcnow() - self.db_ttl
+            ).delete(synchronize_session=False)
+
+            excess = db.query(FeedbackCacheEntry).count() - self.db_max_rows
+            if excess > 0:
+                oldest = select(FeedbackCacheEntry.id).order_by(FeedbackCacheEntry.last_used_at).limit(excess)
+                removed += db.query(FeedbackCacheEntry).filter(
+                    FeedbackCacheEntry.id.in_(oldest)
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Feedback cache prune failed: {str(e)}")
+            db.rollback()
+            return 0
+
+        if removed:
+            logger.info(f"Pruned {removed} feedback cache entries")
+        with self._lock:
+            self._counters["pruned"] += removed
+        return removed
+
+    def _count(self, name: str) -> int:
+        with self._lock:
+            self._counters[name] += 1
+            return self._counters[name]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            "enabled": self.enabled,
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0,
+            "memory": self.memory.stats()
+        }
@@ -0,0 +1,162 @@
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.models import Question, Response
+from backend.services.openai_service import get_openai_service
+from backend.services.feedback_cache import FeedbackCache, question_hash
+from backend.services.llm_usage import llm_usage
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_PENDING = "pending"
+FEEDBACK_READY = "ready"
+FEEDBACK_FAILED = "failed"
+
+# Served instead of new LLM feedback once a user is over their daily token budget
+BUDGET_FEEDBACK = ("You've reached today's limit for personalized AI feedback. Review the explanation above; "
+                   "personalized feedback resumes tomorrow.")
+
+def feedback_status_for(feedback_data: Dict) -> str:
+    """Map an evaluate_answer result onto a feedback_status value"""
+    return FEEDBACK_FAILED if feedback_data.get("error") else FEEDBACK_READY
+
+class FeedbackService:
+    """
+    Produces personalized answer feedback, either inline or on a background worker pool.
+
+    Deferred mode lets submit_answer commit the Response and return immediately; the worker
+    fills in Response.feedback and flips feedback_status from "pending" to "ready".
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        # FEEDBACK_MODE=deferred makes deferred feedback the default for POST /answer
+        self.deferred_by_default = os.getenv("FEEDBACK_MODE", "inline").lower() == "deferred"
+        self.max_workers = int(os.getenv("FEEDBACK_WORKERS", "4"))
+        self._session_factory = session_factory
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.cache = FeedbackCache()
+
+    def lookup_cached(self, db: Optional[Session], question_id: Optional[int], question: str,
+                      correct_answer: str, user_answer: str, explanation: Optional[str]) -> Optional[str]:
+        """Return cached feedback for this question/choice pair, or None"""
+        if not self.cache.enabled or db is None or question_id is None:
+            return None
+        return self.cache.get(db, question_id, user_answer, question_hash(question, correct_answer, explanation))
+
+    def store_cached(self, db: Optional[Session], question_id: Optional[int], question: str,
+                     correct_answer: str, user_answer: str, explanation: Optional[str], feedback_data: Dict):
+        """Cache successfully generated feedback for reuse by later answers"""
+        if not self.cache.enabled or db is None or question_id is None or feedback_data.get("error"):
+            return
+        self.cache.put(db, question_id, user_answer, question_hash(question, correct_answer, explanation),
+                       feedback_data.get("feedback", ""))
+
+    def generate_feedback(self, question: str, correct_answer: str, user_answer: str, explanation: str,
+                          question_id: Optional[int] = None, db: Optional[Session] = None,
+                          allow_llm: bool = True) -> Dict:
+        """
+        Generate feedback for an answer; result has the same shape as OpenAIService.evaluate_answer.
+        Passing `question_id` and `db` serves and populates the feedback cache. With
+        `allow_llm=False` (user over budget) only cached feedback is served.
+        """
+        cached = self.lookup_cached(db, question_id, question, correct_answer, user_answer, explanation)
+        if cached is not None:
+            return {"feedback": cached, "tokens_used": 0, "cached": True}
+        if not allow_llm:
+            return {"feedback": BUDGET_FEEDBACK, "tokens_used": 0, "budget_exceeded": True}
+
+        feedback_data = get_openai_service().evaluate_answer(
+            question=question,
+            correct_answer=correct_answer,
+            user_answer=user_answer,
+            explanation=explanation or ""
+        )
+        self.store_cached(db, question_id, question, correct_answer, user_answer, explanation, feedback_data)
+        return feedback_data
+
+    async def generate_feedback_async(self, question: str, correct_answer: str, user_answer: str, explanation: str,
+                                      question_id: Optional[int] = None, db: Optional[Session] = None,
+                                      allow_llm: bool = True) -> Dict:
+        """Async variant of generate_feedback; cache reads and writes run in a worker thread"""
+        cached = await asyncio.to_thread(
+            self.lookup_cached, db, question_id, question, correct_answer, user_answer, explanation
+        )
+        if cached is not None:
+            return {"feedback": cached, "tokens_used": 0, "cached": True}
+        if not allow_llm:
+            return {"feedback": BUDGET_FEEDBACK, "tokens_used": 0, "budget_exceeded": True}
+
+        feedback_data = await get_openai_service().evaluate_answer_async(
+            question=question,
+            correct_answer=correct_answer,
+            user_answer=user_answer,
+            explanation=explanation or ""
+        )
+        await asyncio.to_thread(
+            self.store_cached, db, question_id, question, correct_answer, user_answer, explanation, feedback_data
+        )
+        return feedback_data
+
+    def submit(self, response_id: int) -> Future:
+        """Queue feedback generation for a pending response"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feedback")
+            return self._executor.submit(self.process, response_id)
+
+    def process(self, response_id: int) -> Optional[str]:
+        """Generate and store feedback for one response; returns the resulting feedback_status"""
+        db = self._session_factory()
+        try:
+            row = db.query(Response, Question).join(
+                Question, Response.question_id == Question.id
+            ).filter(Response.id == response_id).first()
+            if row is None:
+                logger.warning(f"Deferred feedback requested for missing response {response_id}")
+                return None
+            response, question = row
+
+            feedback_data = self.generate_feedback(
+                question=question.content,
+                correct_answer=question.correct_answer,
+                user_answer=response.user_answer,
+                explanation=question.explanation,
+                question_id=question.id,
+                db=db,
+                allow_llm=not llm_usage.over_budget(db, response.user_id)
+            )
+            if feedback_data.get("tokens_used"):
+                llm_usage.record(db, response.user_id, "feedback", feedback_data["tokens_used"])
+            feedback_status = feedback_status_for(feedback_data)
+            response.feedback = feedback_data.get("feedback", "")
+            response.feedback_status = feedback_status
+            db.commit()
+
+            logger.info(f"Deferred feedback for response {response_id} is {feedback_status}")
+            return feedback_status
+
+        except Exception as e:
+            logger.error(f"Error generating deferred feedback for response {response_id}: {str(e)}")
+            db.rollback()
+            db.query(Response).filter(Response.id == response_id).update({"feedback_status": FEEDBACK_FAILED})
+            db.commit()
+            return FEEDBACK_FAILED
+        finally:
+            db.close()
+
+    def shutdown(self):
+        """Wait for queued feedback jobs to finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+feedback_service = FeedbackService()
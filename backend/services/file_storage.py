@@ -1,10 +1,59 @@
 import json
 import os
+import time
+import sqlite3
+import logging
+import tempfile
+from contextlib import closing
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import uuid
 
+logger = logging.getLogger(__name__)
+
+# Standalone JSON-file store; the API itself keeps everything in the SQL database.
+# Secondary indexes kept in a SQLite file next to the JSON records:
+# email -> user, user -> questions, user -> responses, question -> responses.
+# A row's `pending` column is 0 once its file is known to match, otherwise the
+# time_ns at which a save marked it before touching the file.
+INDEX_VERSION = 2
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, email TEXT, pending INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS ix_users_email ON users (email);
+CREATE INDEX IF NOT EXISTS ix_users_pending ON users (pending) WHERE pending != 0;
+CREATE TABLE IF NOT EXISTS questions (id TEXT PRIMARY KEY, user_id TEXT, created_at TEXT, pending INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS ix_questions_user ON questions (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_questions_pending ON questions (pending) WHERE pending != 0;
+CREATE TABLE IF NOT EXISTS responses (id TEXT PRIMARY KEY, user_id TEXT, question_id TEXT, created_at TEXT,
+                                      pending INTEGER NOT NULL DEFAULT 0);
+CREATE INDEX IF NOT EXISTS ix_responses_user ON responses (user_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_responses_question ON responses (question_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_responses_pending ON responses (pending) WHERE pending != 0;
+"""
+
+# Index files from before the pending markers (they kept a global mtime watermark in meta)
+DROP_INDEX_TABLES = """
+DROP TABLE IF EXISTS users;
+DROP TABLE IF EXISTS questions;
+DROP TABLE IF EXISTS responses;
+DROP TABLE IF EXISTS meta;
+"""
+
+INDEX_UPSERTS = {
+    "users": "INSERT OR REPLACE INTO users VALUES (?, ?, ?)",
+    "questions": "INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?)",
+    "responses": "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+}
+
+def _index_row(kind: str, record: Dict[str, Any]) -> tuple:
+    if kind == "users":
+        return (record['id'], record.get('email'))
+    if kind == "questions":
+        return (record['id'], record.get('user_id'), record.get('created_at', ''))
+    return (record['id'], record.get('user_id'), record.get('question_id'), record.get('created_at', ''))
+
 class FileStorage:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
@@ -17,11 +66,111 @@ class FileStorage:
         
         for dir_path in [self.users_dir, self.questions_dir, self.responses_dir]:
             dir_path.mkdir(exist_ok=True)
+
+        self.directories = {"users": self.users_dir, "questions": self.questions_dir, "responses": self.responses_dir}
+        self.index_path = self.data_dir / "index.sqlite3"
+        self.index_timeout = 30.0  # Seconds to wait for another writer's index lock
+        # Markers younger than this may belong to a save still running in another process
+        self.pending_grace = 60.0
+        self._index_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._index_ready:
+            # Checked on first use: a missing or outdated index is rebuilt from the files, an
+            # existing one settles the rows that saves which died mid-way left pending
+            with closing(sqlite3.connect(self.index_path, timeout=self.index_timeout)) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                building = conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION
+                if building:
+                    conn.executescript(DROP_INDEX_TABLES)
+                conn.executescript(INDEX_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            self._index_ready = True
+            if building:
+                self.rebuild_indexes()
+            else:
+                self.reindex_pending()
+        return sqlite3.connect(self.index_path, timeout=self.index_timeout)
+
+    def _save_indexed(self, kind: str, record: Dict[str, Any]):
+        """
+        Write one record file and its index row. The row is committed first with a pending
+        marker, then the file is replaced, then the marker is cleared, so a locked index fails
+        the save with nothing changed and a file is never replaced behind a clean row. A save
+        that fails after marking settles the row from the file on disk; if its process dies
+        instead, the marker stays until reindex_pending settles it.
+        """
+        row = _index_row(kind, record)
+        file_path = self.directories[kind] / f"{record['id']}.json"
+        with closing(self._connect()) as conn:
+            with conn:
+                conn.execute(INDEX_UPSERTS[kind], row + (time.time_ns(),))
+            try:
+                self.save_json(file_path, record)
+                with conn:
+                    conn.execute(INDEX_UPSERTS[kind], row + (0,))
+            except BaseException:
+                try:
+                    with conn:
+                        self._settle(conn, kind, record['id'])
+                except Exception as e:
+                    logger.error(f"Could not settle index row {kind}/{record['id']}: {str(e)}")
+                raise
+
+    def _settle(self, conn: sqlite3.Connection, kind: str, record_id: str):
+        """Make the index row of one record match its file, or drop it when there is no file"""
+        data = self.load_json(self.directories[kind] / f"{record_id}.json")
+        if data and data.get('id') == record_id:
+            conn.execute(INDEX_UPSERTS[kind], _index_row(kind, data) + (0,))
+        else:
+            conn.execute(f"DELETE FROM {kind} WHERE id = ?", (record_id,))
+
+    def _lookup(self, sql: str, params: tuple) -> List[str]:
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute(sql, params)]
+
+    def _load_many(self, directory: Path, ids: List[str]) -> List[Dict[str, Any]]:
+        # Files removed behind the index's back are skipped rather than failing the lookup
+        records = (self.load_json(directory / f"{record_id}.json") for record_id in ids)
+        return [record for record in records if record]
+
+    def rebuild_indexes(self) -> int:
+        """Recreate every index from the JSON files in the data directory; returns files indexed"""
+        indexed = 0
+        with closing(self._connect()) as conn, conn:
+            for kind, directory in self.directories.items():
+                conn.execute(f"DELETE FROM {kind}")
+                records = (self.load_json(file_path) for file_path in directory.glob("*.json"))
+                rows = [_index_row(kind, data) + (0,) for data in records if data and data.get('id') is not None]
+                conn.executemany(INDEX_UPSERTS[kind], rows)
+                indexed += len(rows)
+        return indexed
+
+    def reindex_pending(self) -> int:
+        """Settle index rows left pending for longer than `pending_grace`; returns rows settled"""
+        cutoff = time.time_ns() - int(self.pending_grace * 1e9)
+        settled = 0
+        with closing(self._connect()) as conn, conn:
+            for kind in self.directories:
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT id FROM {kind} WHERE pending != 0 AND pending <= ?", (cutoff,)
+                )]
+                for record_id in ids:
+                    self._settle(conn, kind, record_id)
+                settled += len(ids)
+        return settled
     
     def save_json(self, file_path: Path, data: Dict[str, Any]):
-        """Save data to JSON file"""
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        """Save data to JSON file atomically (readers never see a half-written file)"""
+        fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
     
     def load_json(self, file_path: Path) -> Optional[Dict[str, Any]]:
         """Load data from JSON file"""
@@ -40,8 +189,7 @@ class FileStorage:
         user_data['id'] = user_id
         user_data['created_at'] = user_data.get('created_at', datetime.utcnow().isoformat())
         
-        file_path = self.users_dir / f"{user_id}.json"
-        self.save_json(file_path, user_data)
+        self._save_indexed("users", user_data)
         return user_id
     
     def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
@@ -51,8 +199,9 @@ class FileStorage:
     
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email"""
-        for user_file in self.users_dir.glob("*.json"):
-            user_data = self.load_json(user_file)
+        for user_id in self._lookup("SELECT id FROM users WHERE email = ?", (email,)):
+            user_data = self.get_user(user_id)
+            # Guard against a file edited outside save_user since it was indexed
             if user_data and user_data.get('email') == email:
                 return user_data
         return None
@@ -73,8 +222,7 @@ class FileStorage:
         question_data['id'] = question_id
         question_data['created_at'] = question_data.get('created_at', datetime.utcnow().isoformat())
         
-        file_path = self.questions_dir / f"{question_id}.json"
-        self.save_json(file_path, question_data)
+        self._save_indexed("questions", question_data)
         return question_id
     
     def get_question(self, question_id: str) -> Optional[Dict[str, Any]]:
@@ -84,12 +232,8 @@ class FileStorage:
     
     def get_questions_by_user(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all questions for a user"""
-        questions = []
-        for question_file in self.questions_dir.glob("*.json"):
-            question_data = self.load_json(question_file)
-            if question_data and question_data.get('user_id') == user_id:
-                questions.append(question_data)
-        return sorted(questions, key=lambda x: x.get('created_at', ''), reverse=True)
+        ids = self._lookup("SELECT id FROM questions WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
+        return self._load_many(self.questions_dir, ids)
     
     # Response operations
     def save_response(self, response_data: Dict[str, Any]) -> str:
@@ -98,8 +242,7 @@ class FileStorage:
         response_data['id'] = response_id
         response_data['created_at'] = response_data.get('created_at', datetime.utcnow().isoformat())
         
-        file_path = self.responses_dir / f"{response_id}.json"
-        self.save_json(file_path, response_data)
+        self._save_indexed("responses", response_data)
         return response_id
     
     def get_response(self, response_id: str) -> Optional[Dict[str, Any]]:
@@ -109,21 +252,13 @@ class FileStorage:
     
     def get_responses_by_user(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all responses for a user"""
-        responses = []
-        for response_file in self.responses_dir.glob("*.json"):
-            response_data = self.load_json(response_file)
-            if response_data and response_data.get('user_id') == user_id:
-                responses.append(response_data)
-        return sorted(responses, key=lambda x: x.get('created_at', ''), reverse=True)
+        ids = self._lookup("SELECT id FROM responses WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
+        return self._load_many(self.responses_dir, ids)
     
     def get_responses_by_question(self, question_id: str) -> List[Dict[str, Any]]:
         """Get all responses for a question"""
-        responses = []
-        for response_file in self.responses_dir.glob("*.json"):
-            response_data = self.load_json(response_file)
-            if response_data and response_data.get('question_id') == question_id:
-                responses.append(response_data)
-        return sorted(responses, key=lambda x: x.get('created_at', ''), reverse=True)
+        ids = self._lookup("SELECT id FROM responses WHERE question_id = ? ORDER BY created_at DESC", (question_id,))
+        return self._load_many(self.responses_dir, ids)
 
 # Global storage instance
 storage = FileStorage()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import os
+import logging
+import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.database import dialect_insert
+from backend.models import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+class LLMUsageLedger:
+    """
+    Records the tokens each user's LLM calls consume and enforces a daily token budget.
+
+    Over-budget users are not refused: routes check `over_budget` and downgrade to
+    bank-served questions and cached feedback, which cost no tokens.
+    """
+
+    def __init__(self):
+        # 0 disables the budget; usage is still recorded
+        self.daily_token_budget = int(os.getenv("LLM_DAILY_TOKEN_BUDGET", "0"))
+
+    def record(self, db: Session, user_id: int, operation: str, tokens: Optional[int],
+               day: Optional[datetime.date] = None):
+        """
+        Add one call and its tokens to the user's ledger row. Written and committed in its
+        own session on the same engine, so the caller's transaction is left alone.
+        """
+        day = day or datetime.datetime.utcnow().date()
+        stmt = dialect_insert(db, LLMUsage.__table__).values(
+            user_id=user_id, day=day, operation=operation, calls=1, tokens=max(0, int(tokens or 0)),
+            updated_at=datetime.datetime.utcnow()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "day", "operation"],
+            set_={
+                "calls": LLMUsage.__table__.c.calls + 1,
+                "tokens": LLMUsage.__table__.c.tokens + stmt.excluded.tokens,
+                "updated_at": stmt.excluded.updated_at
+            }
+        )
+        with Session(bind=db.get_bind()) as ledger_db:
+            try:
+                ledger_db.execute(stmt)
+                ledger_db.commit()
+            except Exception as e:
+                # Losing one ledger entry must not fail the request that already paid for the call
+                logger.error(f"Error recording LLM usage for user {user_id}: {str(e)}")
+                ledger_db.rollback()
+
+    def tokens_today(self, db: Session, user_id: int, day: Optional[datetime.date] = None) -> int:
+        day = day or datetime.datetime.utcnow().date()
+        return db.scalar(
+            select(func.coalesce(func.sum(LLMUsage.tokens), 0)).where(LLMUsage.user_id == user_id, LLMUsage.day == day)
+        )
+
+    def over_budget(self, db: Session, user_id: int) -> bool:
+        if self.daily_token_budget <= 0:
+            return False
+        over = self.tokens_today(db, user_id) >= self.daily_token_budget
+        if over:
+            logger.info(f"User {user_id} is over the daily LLM token budget, serving without LLM calls")
+        return over
+
+    def usage(self, db: Session, user_id: int, day: Optional[datetime.date] = None) -> Dict:
+        day = day or datetime.datetime.utcnow().date()
+        rows = db.execute(
+            select(LLMUsage.operation, LLMUsage.calls, LLMUsage.tokens).where(LLMUsage.user_id == user_id, LLMUsage.day == day)
+        ).all()
+        used = sum(row.tokens for row in rows)
+        return {
+            "day": day.isoformat(),
+            "tokens": used,
+            "budget": self.daily_token_budget or None,
+            "remaining": max(0, self.daily_token_budget - used) if self.daily_token_budget else None,
+            "operations": {row.operation: {"calls": row.calls, "tokens": row.tokens} for row in rows}
+        }
+
+llm_usage = LLMUsageLedger()
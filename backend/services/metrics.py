@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the API, LLM calls and database sessions, served at /metrics.
+"""
+import time
+from typing import Optional
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds",
+    "LLM call latency per operation and provider, including retries",
+    ["operation", "provider", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported in usage.total_tokens per operation and provider",
+    ["operation", "provider"]
+)
+
+DB_CHECKOUT_DURATION = Histogram(
+    "db_session_checkout_seconds",
+    "Time for a session to obtain a database connection when it begins a transaction",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+)
+
+FALLBACKS = Counter(
+    "fallback_total",
+    "Requests served by a fallback path instead of the primary LLM path",
+    ["path", "reason"]
+)
+
+HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Password hash and verify latency including time queued for a hashing worker",
+    ["operation", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30)
+)
+
+HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password hashing calls waiting for a free worker"
+)
+
+HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password hashing calls rejected with 429 because the queue was full"
+)
+
+def record_fallback(path: str, reason: str):
+    FALLBACKS.labels(path=path, reason=reason).inc()
+
+def record_llm_call(operation: str, provider: str, outcome: str, seconds: float, result=None):
+    """Record one LLM call; token usage is read from `result.usage` when the response has it"""
+    LLM_REQUEST_DURATION.labels(operation=operation, provider=provider, outcome=outcome).observe(seconds)
+    usage = getattr(result, "usage", None)
+    total_tokens = getattr(usage, "total_tokens", None)
+    if isinstance(total_tokens, int) and total_tokens > 0:
+        LLM_TOKENS.labels(operation=operation, provider=provider).inc(total_tokens)
+
+def _route_template(request: Request) -> str:
+    """
+    Path template of the matched route, so /answer/123/feedback and /answer/456/feedback
+    share one series. Included routers report their template without the router prefix,
+    so the prefix is taken from the leading segments of the request path.
+    """
+    template = getattr(request.scope.get("route"), "path", None)
+    if not template:
+        return "unmatched"
+    template_parts = [part for part in template.split("/") if part]
+    path_parts = [part for part in request.scope.get("path", "").split("/") if part]
+    prefix = path_parts[:max(0, len(path_parts) - len(template_parts))]
+    return "/" + "/".join(prefix + template_parts)
+
+async def metrics_middleware(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUEST_DURATION.labels(
+            method=request.method,
+            route=_route_template(request),
+            status=str(status)
+        ).observe(time.perf_counter() - started)
+
+def instrument_sessions(session_factory):
+    """Time how long each session transaction waits for its connection"""
+
+    @event.listens_for(session_factory, "after_transaction_create")
+    def _transaction_created(session, transaction):
+        if transaction.parent is None:
+            session.info["checkout_started"] = time.perf_counter()
+
+    @event.listens_for(session_factory, "after_begin")
+    def _connection_acquired(session, transaction, connection):
+        started: Optional[float] = session.info.pop("checkout_started", None)
+        if started is not None:
+            DB_CHECKOUT_DURATION.observe(time.perf_counter() - started)
+
+def metrics_response() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
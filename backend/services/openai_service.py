@@ -1,28 +1,53 @@
 import os
+import json
 import logging
-from typing import Dict, List, Optional
-from openai import AzureOpenAI, OpenAI
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+from openai import AzureOpenAI, OpenAI, AsyncAzureOpenAI, AsyncOpenAI
 from datetime import datetime
 
+from backend.services.fake_llm import FakeLLMClient, AsyncFakeLLMClient, fake_provider_enabled
+from backend.services.metrics import record_fallback
+from backend.services.resilience import LLMResilience
+
 logger = logging.getLogger(__name__)
 
+FEEDBACK_UNAVAILABLE = "Unable to generate personalized feedback at this time."
+
 class OpenAIService:
     def __init__(self):
         # Check which OpenAI service to use based on available environment variables
-        if os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
+        if fake_provider_enabled():
+            # Offline fake provider for load tests and local development (LLM_PROVIDER=fake)
+            self.client = FakeLLMClient()
+            self.async_client = AsyncFakeLLMClient()
+            self.deployment_name = "fake-llm"
+            self.provider = "fake"
+            logger.info("Using fake LLM provider")
+        elif os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
             # Use Azure OpenAI
-            self.client = AzureOpenAI(
+            azure_settings = dict(
                 api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                # Retries and deadlines are handled by LLMResilience
+                max_retries=0
             )
+            self.client = AzureOpenAI(**azure_settings)
+            # Async client lets async routes await completions without holding a threadpool thread
+            self.async_client = AsyncAzureOpenAI(**azure_settings)
             self.deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4")
             self.provider = "azure"
             logger.info("Using Azure OpenAI service")
         elif os.getenv("OPENAI_API_KEY"):
             # Use standard OpenAI
             self.client = OpenAI(
-                api_key=os.getenv("OPENAI_API_KEY")
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0
+            )
+            self.async_client = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=0
             )
             self.deployment_name = os.getenv("OPENAI_MODEL", "gpt-4")
             self.provider = "openai"
@@ -31,16 +56,15 @@ class OpenAIService:
             raise ValueError(
                 "Missing OpenAI credentials. Please provide either:\n"
                 "- Azure OpenAI: AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT\n"
-                "- Standard OpenAI: OPENAI_API_KEY"
+                "- Standard OpenAI: OPENAI_API_KEY\n"
+                "- Offline fake provider: LLM_PROVIDER=fake"
             )
+
+        # Deadlines, retries and the provider's circuit breaker for every completion call
+        self.resilience = LLMResilience(self.provider)
     
-    def generate_clinical_question(self, 
-                                 specialty: str = "General Medicine",
-                                 difficulty: str = "Intermediate",
-                                 question_type: str = "Multiple Choice") -> Dict:
-        """
-        Generate a clinical board-style question using Azure OpenAI
-        """
+    def _question_messages(self, specialty: str, difficulty: str, question_type: str) -> List[Dict]:
+        """Build the chat messages for clinical question generation"""
         system_prompt = f"""You are a medical education expert creating {difficulty.lower()} level {specialty} questions for medical board exam preparation. 
 
 Create a realistic clinical scenario question with:
@@ -67,36 +91,199 @@ Format your response as JSON:
 }}"""
 
         user_prompt = f"Generate a {difficulty.lower()} {specialty} clinical question for medical board exam preparation."
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _parse_question_response(self, response, specialty: str, difficulty: str) -> Dict:
+        """Parse a question completion into question data"""
+        # Log the API call for analytics
+        logger.info(f"Generated question - Specialty: {specialty}, Difficulty: {difficulty}, Tokens: {response.usage.total_tokens}")
+        
+        question_data = self.parse_question_content(response.choices[0].message.content)
+        question_data["tokens_used"] = response.usage.total_tokens
         
+        return question_data
+
+    def parse_question_content(self, content: str) -> Dict:
+        """Parse the JSON content of a question completion (also used for streamed completions)"""
+        question_data = json.loads(content)
+        question_data["generated_at"] = datetime.utcnow().isoformat()
+        return question_data
+
+    def generate_clinical_question(self, 
+                                 specialty: str = "General Medicine",
+                                 difficulty: str = "Intermediate",
+                                 question_type: str = "Multiple Choice") -> Dict:
+        """
+        Generate a clinical board-style question using Azure OpenAI
+        """
         try:
-            response = self.client.chat.completions.create(
+            response = self.resilience.call("generate_question", self.client.chat.completions.create,
                 model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._question_messages(specialty, difficulty, question_type),
                 temperature=0.7,
                 max_tokens=1500
             )
+            return self._parse_question_response(response, specialty, difficulty)
             
-            # Log the API call for analytics
-            logger.info(f"Generated question - Specialty: {specialty}, Difficulty: {difficulty}, Tokens: {response.usage.total_tokens}")
-            
-            import json
-            question_data = json.loads(response.choices[0].message.content)
-            question_data["generated_at"] = datetime.utcnow().isoformat()
-            question_data["tokens_used"] = response.usage.total_tokens
-            
-            return question_data
+        except Exception as e:
+            logger.error(f"Error generating question: {str(e)}")
+            raise Exception(f"Failed to generate question: {str(e)}")
+
+    async def generate_clinical_question_async(self,
+                                               specialty: str = "General Medicine",
+                                               difficulty: str = "Intermediate",
+                                               question_type: str = "Multiple Choice") -> Dict:
+        """
+        Async variant of generate_clinical_question using the async client
+        """
+        try:
+            response = await self.resilience.call_async("generate_question", self.async_client.chat.completions.create,
+                model=self.deployment_name,
+                messages=self._question_messages(specialty, difficulty, question_type),
+                temperature=0.7,
+                max_tokens=1500
+            )
+            return self._parse_question_response(response, specialty, difficulty)
             
         except Exception as e:
             logger.error(f"Error generating question: {str(e)}")
             raise Exception(f"Failed to generate question: {str(e)}")
     
-    def evaluate_answer(self, question: str, correct_answer: str, user_answer: str, explanation: str) -> Dict:
+    def _question_batch_messages(self, specialty: str, difficulty: str, question_type: str, count: int) -> List[Dict]:
+        """Build the chat messages for generating several questions in one completion"""
+        system_prompt = f"""You are a medical education expert creating {difficulty.lower()} level {specialty} questions for medical board exam preparation. 
+
+Create {count} distinct realistic clinical scenario questions. Each question must have:
+- A clear patient presentation
+- Relevant clinical details
+- {question_type} format with 4-5 options (A, B, C, D, E if needed)
+- One correct answer with explanation
+- Plausible distractors
+
+Cover different conditions and presentations; do not repeat scenarios.
+
+Format your response as a JSON object with a "questions" array:
+{{
+    "questions": [
+        {{
+            "question": "Clinical scenario and question text",
+            "options": {{
+                "A": "Option A text",
+                "B": "Option B text", 
+                "C": "Option C text",
+                "D": "Option D text"
+            }},
+            "correct_answer": "A",
+            "explanation": "Detailed explanation of why the correct answer is right and others are wrong",
+            "difficulty": "{difficulty}",
+            "specialty": "{specialty}",
+            "topics": ["topic1", "topic2"]
+        }}
+    ]
+}}"""
+
+        user_prompt = f"Generate {count} {difficulty.lower()} {specialty} clinical questions for medical board exam preparation."
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def generate_clinical_questions_batch(self,
+                                          specialty: str = "General Medicine",
+                                          difficulty: str = "Intermediate",
+                                          count: int = 5,
+                                          question_type: str = "Multiple Choice") -> Dict:
         """
-        Use AI to provide detailed feedback on user's answer
+        Generate `count` questions in a single completion.
+
+        Each item is validated on its own; malformed items are dropped rather than failing
+        the batch. Returns {"questions": [...], "requested", "rejected", "tokens_used"}.
+        """
+        try:
+            response = self.resilience.call("generate_question_batch", self.client.chat.completions.create,
+                **self._question_batch_request(specialty, difficulty, question_type, count)
+            )
+        except Exception as e:
+            logger.error(f"Error generating question batch: {str(e)}")
+            raise Exception(f"Failed to generate question batch: {str(e)}")
+        return self._parse_question_batch(response, specialty, difficulty, count)
+
+    async def generate_clinical_questions_batch_async(self,
+                                                      specialty: str = "General Medicine",
+                                                      difficulty: str = "Intermediate",
+                                                      count: int = 5,
+                                                      question_type: str = "Multiple Choice") -> Dict:
+        """
+        Async variant of generate_clinical_questions_batch using the async client
+        """
+        try:
+            response = await self.resilience.call_async("generate_question_batch", self.async_client.chat.completions.create,
+                **self._question_batch_request(specialty, difficulty, question_type, count)
+            )
+        except Exception as e:
+            logger.error(f"Error generating question batch: {str(e)}")
+            raise Exception(f"Failed to generate question batch: {str(e)}")
+        return self._parse_question_batch(response, specialty, difficulty, count)
+
+    def _question_batch_request(self, specialty: str, difficulty: str, question_type: str, count: int) -> Dict:
+        tokens_per_question = int(os.getenv("QUESTION_BATCH_TOKENS_PER_QUESTION", "700"))
+        return dict(
+            model=self.deployment_name,
+            messages=self._question_batch_messages(specialty, difficulty, question_type, count),
+            temperature=0.8,
+            max_tokens=min(16000, tokens_per_question * count + 200)
+        )
+
+    def _parse_question_batch(self, response, specialty: str, difficulty: str, count: int) -> Dict:
+        """Validate the items of a batch completion one by one"""
+        items = _extract_batch_items(response.choices[0].message.content)
+        generated_at = datetime.utcnow().isoformat()
+        questions = []
+        for item in items[:count]:
+            question_data = validate_question_item(item, specialty, difficulty)
+            if question_data is not None:
+                question_data["generated_at"] = generated_at
+                questions.append(question_data)
+
+        tokens_used = response.usage.total_tokens
+        rejected = count - len(questions)
+        logger.info(f"Generated question batch - Specialty: {specialty}, Difficulty: {difficulty}, Valid: {len(questions)}/{count}, Tokens: {tokens_used}")
+
+        return {
+            "questions": questions,
+            "requested": count,
+            "rejected": rejected,
+            "tokens_used": tokens_used
+        }
+
+    async def stream_clinical_question(self,
+                                       specialty: str = "General Medicine",
+                                       difficulty: str = "Intermediate",
+                                       question_type: str = "Multiple Choice",
+                                       usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Stream the raw JSON of a generated question as content deltas arrive. When a
+        `usage` dict is given, the provider's token count is stored in its "tokens_used".
         """
+        async with aclosing(self.resilience.stream_async("stream_question", self.async_client.chat.completions.create,
+            model=self.deployment_name,
+            messages=self._question_messages(specialty, difficulty, question_type),
+            temperature=0.7,
+            max_tokens=1500,
+            stream=True,
+            stream_options={"include_usage": True}
+        )) as stream:
+            async for chunk in stream:
+                _note_usage(chunk, usage)
+                delta = _chunk_content(chunk)
+                if delta:
+                    yield delta
+
+    def _feedback_messages(self, question: str, correct_answer: str, user_answer: str, explanation: str) -> List[Dict]:
+        """Build the chat messages for answer feedback"""
         system_prompt = """You are a medical educator providing feedback on student answers. 
         Be encouraging but precise in your feedback."""
         
@@ -113,14 +300,19 @@ Format your response as JSON:
         
         Keep response concise but educational (2-3 sentences).
         """
-        
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def evaluate_answer(self, question: str, correct_answer: str, user_answer: str, explanation: str) -> Dict:
+        """
+        Use AI to provide detailed feedback on user's answer
+        """
         try:
-            response = self.client.chat.completions.create(
+            response = self.resilience.call("evaluate_answer", self.client.chat.completions.create,
                 model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._feedback_messages(question, correct_answer, user_answer, explanation),
                 temperature=0.3,
                 max_tokens=300
             )
@@ -132,4 +324,137 @@ Format your response as JSON:
             
         except Exception as e:
             logger.error(f"Error generating feedback: {str(e)}")
-            return {"feedback": "Unable to generate personalized feedback at this time."}
\ No newline at end of file
+            record_fallback("feedback", "llm_error")
+            return {"feedback": FEEDBACK_UNAVAILABLE, "error": str(e)}
+
+    async def evaluate_answer_async(self, question: str, correct_answer: str, user_answer: str, explanation: str) -> Dict:
+        """
+        Async variant of evaluate_answer using the async client
+        """
+        try:
+            response = await self.resilience.call_async("evaluate_answer", self.async_client.chat.completions.create,
+                model=self.deployment_name,
+                messages=self._feedback_messages(question, correct_answer, user_answer, explanation),
+                temperature=0.3,
+                max_tokens=300
+            )
+            
+            return {
+                "feedback": response.choices[0].message.content,
+                "tokens_used": response.usage.total_tokens
+            }
+            
+        except Exception as e:
+            logger.error(f"Error generating feedback: {str(e)}")
+            record_fallback("feedback", "llm_error")
+            return {"feedback": FEEDBACK_UNAVAILABLE, "error": str(e)}
+
+    async def stream_answer_feedback(self, question: str, correct_answer: str, user_answer: str, explanation: str,
+                                     usage: Optional[Dict] = None) -> AsyncIterator[str]:
+        """
+        Stream personalized feedback on the user's answer as content deltas arrive; `usage`
+        as in stream_clinical_question
+        """
+        async with aclosing(self.resilience.stream_async("stream_feedback", self.async_client.chat.completions.create,
+            model=self.deployment_name,
+            messages=self._feedback_messages(question, correct_answer, user_answer, explanation),
+            temperature=0.3,
+            max_tokens=300,
+            stream=True,
+            stream_options={"include_usage": True}
+        )) as stream:
+            async for chunk in stream:
+                _note_usage(chunk, usage)
+                delta = _chunk_content(chunk)
+                if delta:
+                    yield delta
+
+def validate_question_item(item, specialty: str, difficulty: str) -> Optional[Dict]:
+    """Validate one generated question; returns cleaned question data or None if malformed"""
+    if not isinstance(item, dict):
+        return None
+
+    question = item.get("question")
+    options = item.get("options")
+    correct_answer = item.get("correct_answer")
+    explanation = item.get("explanation")
+
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, dict) or len(options) < 2:
+        return None
+    if not all(isinstance(key, str) and isinstance(value, str) and value.strip() for key, value in options.items()):
+        return None
+    if not isinstance(correct_answer, str) or correct_answer.strip().upper() not in {key.upper() for key in options}:
+        return None
+    if not isinstance(explanation, str) or not explanation.strip():
+        return None
+
+    topics = item.get("topics")
+    return {
+        "question": question.strip(),
+        "options": options,
+        "correct_answer": correct_answer.strip().upper(),
+        "explanation": explanation.strip(),
+        "difficulty": difficulty,
+        "specialty": specialty,
+        "topics": [topic for topic in topics if isinstance(topic, str)] if isinstance(topics, list) else []
+    }
+
+def _extract_batch_items(content: Optional[str]) -> List:
+    """
+    Pull question objects out of a batch completion.
+
+    Accepts {"questions": [...]} or a bare array. If the JSON is cut short (e.g. by
+    max_tokens), every complete object before the cut is still recovered. Empty
+    content (a refusal or filtered completion) yields no items.
+    """
+    if not content:
+        return []
+    try:
+        parsed = json.loads(content)
+        if isinstance(parsed, dict):
+            parsed = parsed.get("questions", [])
+        return parsed if isinstance(parsed, list) else []
+    except json.JSONDecodeError:
+        pass
+
+    items = []
+    decoder = json.JSONDecoder()
+    start = content.find("[")
+    position = start + 1 if start != -1 else 0
+    while True:
+        position = content.find("{", position)
+        if position == -1:
+            break
+        try:
+            item, end = decoder.raw_decode(content, position)
+        except json.JSONDecodeError:
+            break
+        items.append(item)
+        position = end
+    return items
+
+def _chunk_content(chunk) -> Optional[str]:
+    """Extract the content delta from a streamed completion chunk"""
+    # Azure sends chunks with no choices (e.g. content filter results)
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+def _note_usage(chunk, usage: Optional[Dict]):
+    """Copy the token usage the final chunk of a stream carries (stream_options include_usage)"""
+    chunk_usage = getattr(chunk, "usage", None)
+    if usage is not None and chunk_usage is not None:
+        usage["tokens_used"] = chunk_usage.total_tokens
+
+
+# Lazy-loaded singleton instance
+_openai_service = None
+
+def get_openai_service() -> OpenAIService:
+    """Get the singleton OpenAI service instance (lazy-loaded)"""
+    global _openai_service
+    if _openai_service is None:
+        _openai_service = OpenAIService()
+    return _openai_service
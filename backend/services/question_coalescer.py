@@ -0,0 +1,269 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future, InvalidStateError
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from backend.models import Question
+from backend.services.question_service import (
+    generate_question, generate_question_async, generate_question_batch, generate_question_batch_async
+)
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+def generate_questions(specialty: str, difficulty: str, count: int) -> List[Question]:
+    """Default flight generator: one single-question call, or one batch call for several waiters"""
+    if count == 1:
+        return [generate_question(specialty=specialty, difficulty=difficulty)]
+    return generate_question_batch(specialty, difficulty, count)["questions"]
+
+async def generate_questions_async(specialty: str, difficulty: str, count: int) -> List[Question]:
+    """Async variant of generate_questions, used by flights that run on the event loop"""
+    if count == 1:
+        return [await generate_question_async(specialty=specialty, difficulty=difficulty)]
+    return (await generate_question_batch_async(specialty, difficulty, count))["questions"]
+
+class QuestionShortfall(Exception):
+    """A flight could not produce a question for this request"""
+
+class QuestionCoalescer:
+    """
+    Single-flight layer for inline question generation.
+
+    Concurrent requests for the same (specialty, difficulty) queue up behind at most
+    `fan_out` generation calls. Each call waits `window` seconds to collect the queued
+    requests, generates that many questions in one batch (up to `max_batch`) and hands a
+    distinct question to every waiter, so a burst of N students costs about N / max_batch
+    LLM calls and never more than `fan_out` concurrent calls per pair.
+
+    Sync and async callers share the queue. A flight started by an async caller is a task
+    on its event loop awaiting `async_generator`; one started by a sync caller runs
+    `generator` on a thread of its own, so a slow pair never holds up another pair's
+    flights. Callers that give up are detached from the queue; an async flight whose
+    waiters have all left is cancelled, while a thread flight already calling the provider
+    finishes and hands its questions to whoever is queued next.
+    """
+
+    def __init__(self, generator: Optional[Callable[[str, str, int], List[Question]]] = None,
+                 async_generator: Optional[Callable[[str, str, int], Awaitable[List[Question]]]] = None):
+        self.enabled = os.getenv("QUESTION_COALESCE_ENABLED", "true").lower() == "true"
+        self.fan_out = max(1, int(os.getenv("QUESTION_COALESCE_FAN_OUT", "2")))
+        self.max_batch = max(1, int(os.getenv("QUESTION_COALESCE_MAX_BATCH", "10")))
+        self.window = float(os.getenv("QUESTION_COALESCE_WINDOW_MS", "25")) / 1000
+        self.wait_timeout = float(os.getenv("QUESTION_COALESCE_WAIT_SECONDS", "60"))
+
+        self.generator = generator or generate_questions
+        self.async_generator = async_generator or generate_questions_async
+        self._lock = threading.Lock()
+        self._pending: Dict[Pair, Deque[Future]] = defaultdict(deque)
+        self._in_flight: Dict[Pair, int] = defaultdict(int)
+        self._threads: Set[threading.Thread] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._counters = {"requests": 0, "flights": 0, "coalesced": 0, "failures": 0, "abandoned": 0, "largest_flight": 0}
+
+    def submit(self, specialty: str, difficulty: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Future:
+        """
+        Queue a request for one new question; the future resolves to an unsaved Question.
+        With `loop` (the running loop of the caller) a flight it starts runs on that loop.
+        """
+        key = (specialty, difficulty)
+        future: Future = Future()
+        with self._lock:
+            self._counters["requests"] += 1
+            self._pending[key].append(future)
+            if self._in_flight[key] < self.fan_out:
+                self._start_flight(key, loop)
+        return future
+
+    def generate(self, specialty: str, difficulty: str) -> Question:
+        """Blocking variant for sync routes"""
+        if not self.enabled:
+            return self.generator(specialty, difficulty, 1)[0]
+        future = self.submit(specialty, difficulty)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        finally:
+            # Timed out or interrupted: leave the queue so no flight generates for us
+            future.cancel()
+
+    async def generate_async(self, specialty: str, difficulty: str) -> Question:
+        """Awaitable variant for async routes; cancelling or timing out detaches the waiter"""
+        if not self.enabled:
+            return (await self.async_generator(specialty, difficulty, 1))[0]
+        future = asyncio.wrap_future(self.submit(specialty, difficulty, loop=asyncio.get_running_loop()))
+        return await asyncio.wait_for(future, timeout=self.wait_timeout)
+
+    def _start_flight(self, key: Pair, loop: Optional[asyncio.AbstractEventLoop]):
+        # Caller holds self._lock
+        self._in_flight[key] += 1
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(self._create_task, loop, key)
+                return
+            except RuntimeError:
+                pass  # Closed since the check; fly on a thread instead
+        thread = threading.Thread(target=self._fly, args=(key,), name=f"question-coalescer-{key[0]}-{key[1]}", daemon=True)
+        self._threads.add(thread)
+        thread.start()
+
+    def _create_task(self, loop: asyncio.AbstractEventLoop, key: Pair):
+        task = loop.create_task(self._fly_async(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _settle(waiter: Future, result=None, error: Optional[BaseException] = None) -> bool:
+        """Resolve a waiter; False when it was cancelled or timed out in the meantime"""
+        try:
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
+            return True
+        except InvalidStateError:
+            return False
+
+    def _board(self, key: Pair) -> List[Future]:
+        """Take up to max_batch live waiters off the pair's queue"""
+        waiters: List[Future] = []
+        with self._lock:
+            pending = self._pending[key]
+            while pending and len(waiters) < self.max_batch:
+                waiter = pending.popleft()
+                # Callers that timed out or disconnected have cancelled their future
+                if not waiter.done():
+                    waiters.append(waiter)
+            if waiters:
+                self._counters["flights"] += 1
+                self._counters["coalesced"] += len(waiters) - 1
+                self._counters["largest_flight"] = max(self._counters["largest_flight"], len(waiters))
+        return waiters
+
+    def _hand_out(self, key: Pair, waiters: List[Future], questions: List[Question]) -> int:
+        """Give one question to each live waiter, then any spare ones to the queue; returns questions served"""
+        remaining = deque(questions)
+        served = 0
+        for waiter in waiters:
+            if not remaining:
+                break
+            if self._settle(waiter, remaining[0]):
+                remaining.popleft()
+                served += 1
+        while remaining:
+            # Spares left by waiters who gave up go to the next requests in line
+            with self._lock:
+                pending = self._pending[key]
+                waiter = pending.popleft() if pending else None
+            if waiter is None:
+                break
+            if self._settle(waiter, remaining[0]):
+                remaining.popleft()
+                served += 1
+        return served
+
+    def _land(self, key: Pair, waiters: List[Future], served: int, error: Optional[BaseException],
+              loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Release the flight slot, re-queue or fail unserved waiters and start the next flight"""
+        unserved = [waiter for waiter in waiters if not waiter.done()]
+        with self._lock:
+            self._in_flight[key] -= 1
+            self._pending[key] = deque(waiter for waiter in self._pending[key] if not waiter.done())
+            if unserved and served:
+                # Short batch: the leftovers go to the front of the queue for the next flight
+                self._pending[key].extendleft(reversed(unserved))
+                unserved = []
+            elif unserved:
+                self._counters["failures"] += len(unserved)
+            if self._pending[key] and self._in_flight[key] < self.fan_out:
+                self._start_flight(key, loop)
+
+        for waiter in unserved:
+            self._settle(waiter, error=error or QuestionShortfall(f"No question generated for {key[0]}/{key[1]}"))
+
+        if len(waiters) > 1:
+            logger.info(f"Coalesced {len(waiters)} requests into one generation call - Specialty: {key[0]}, Difficulty: {key[1]}, Served: {served}")
+
+    def _fly(self, key: Pair):
+        waiters: List[Future] = []
+        served = 0
+        error: Optional[Exception] = None
+        try:
+            if self.window:
+                time.sleep(self.window)
+            waiters = self._board(key)
+            if waiters:
+                try:
+                    served = self._hand_out(key, waiters, self.generator(key[0], key[1], len(waiters)))
+                except Exception as e:
+                    logger.error(f"Coalesced generation failed for {key[0]}/{key[1]}: {str(e)}")
+                    error = e
+        finally:
+            self._land(key, waiters, served, error)
+            with self._lock:
+                self._threads.discard(threading.current_thread())
+
+    async def _fly_async(self, key: Pair):
+        loop = asyncio.get_running_loop()
+        waiters: List[Future] = []
+        call: Optional[asyncio.Future] = None
+        served = 0
+        error: Optional[Exception] = None
+        try:
+            if self.window:
+                await asyncio.sleep(self.window)
+            waiters = self._board(key)
+            if waiters:
+                call = asyncio.ensure_future(self.async_generator(key[0], key[1], len(waiters)))
+
+                def abandon(_):
+                    # Everyone this flight was for has left: stop spending tokens on it
+                    if all(waiter.cancelled() for waiter in waiters):
+                        call.get_loop().call_soon_threadsafe(call.cancel)
+
+                for waiter in waiters:
+                    waiter.add_done_callback(abandon)
+                await asyncio.wait({call})
+                if call.cancelled():
+                    with self._lock:
+                        self._counters["abandoned"] += 1
+                elif call.exception() is not None:
+                    error = call.exception()
+                    logger.error(f"Coalesced generation failed for {key[0]}/{key[1]}: {str(error)}")
+                else:
+                    served = self._hand_out(key, waiters, call.result())
+        except asyncio.CancelledError:
+            # The loop is shutting down; a later flight for this pair runs on a thread
+            if call is not None:
+                call.cancel()
+            loop = None
+            raise
+        finally:
+            self._land(key, waiters, served, error, loop)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = {f"{s}:{d}": n for (s, d), n in self._in_flight.items() if n}
+            pending = sum(len(queue) for queue in self._pending.values())
+        return {
+            "enabled": self.enabled,
+            "fan_out": self.fan_out,
+            "max_batch": self.max_batch,
+            **counters,
+            "pending": pending,
+            "in_flight": in_flight
+        }
+
+    def shutdown(self):
+        """Wait for thread flights to finish; task flights end with their event loop"""
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+
+question_coalescer = QuestionCoalescer()
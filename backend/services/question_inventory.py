@@ -0,0 +1,315 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal
+from backend.models import Question
+from backend.services.question_tags import record_question_tags
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+# Pairs a claim may register on demand: the specialties offered in the UI and the default one
+DEFAULT_SPECIALTIES = "General Medicine,Cardiology,Neurology,Emergency Medicine,Pediatrics,Surgery,Internal Medicine"
+DEFAULT_DIFFICULTIES = "Beginner,Intermediate,Advanced"
+
+def _parse_list(raw: str) -> Set[str]:
+    return {item.strip() for item in raw.split(",") if item.strip()}
+
+def _parse_pairs(raw: str) -> List[Pair]:
+    """Parse QUESTION_INVENTORY_PAIRS ("Cardiology:Intermediate,Neurology:Advanced")"""
+    pairs = []
+    for item in raw.split(","):
+        if ":" not in item:
+            continue
+        specialty, difficulty = item.split(":", 1)
+        if specialty.strip() and difficulty.strip():
+            pairs.append((specialty.strip(), difficulty.strip()))
+    return pairs
+
+class QuestionInventory:
+    """
+    Keeps a stock of generated and tagged questions ready for each (specialty, difficulty) pair.
+
+    A background producer refills a pair to the high watermark whenever its depth drops below
+    the low watermark, so the chat endpoint can claim a question with a single indexed UPDATE
+    instead of waiting on the LLM.
+
+    Chat serves unseen bank questions first and claims from the inventory only when the bank
+    has none left for the user, so a claim is what marks a pair the bank can't serve. The
+    producer refills only pairs claimed within `pair_idle_seconds`. Pairs come from
+    QUESTION_INVENTORY_PAIRS (tracked for good, stocked once claimed) and from claims whose
+    specialty and difficulty are on the allow-list (dropped once idle), so LLM calls are only
+    spent on pairs students actually fall through to.
+    """
+
+    def __init__(self,
+                 generator: Optional[Callable[[str, str], Question]] = None,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.enabled = os.getenv("QUESTION_INVENTORY_ENABLED", "true").lower() == "true"
+        self.low_watermark = int(os.getenv("QUESTION_INVENTORY_LOW_WATERMARK", "2"))
+        self.high_watermark = max(self.low_watermark, int(os.getenv("QUESTION_INVENTORY_HIGH_WATERMARK", "5")))
+        self.max_concurrency = int(os.getenv("QUESTION_INVENTORY_MAX_CONCURRENCY", "2"))
+        self.refill_interval = float(os.getenv("QUESTION_INVENTORY_REFILL_INTERVAL_SECONDS", "30"))
+        self.max_pairs = int(os.getenv("QUESTION_INVENTORY_MAX_PAIRS", "50"))
+        self.pair_idle_seconds = float(os.getenv("QUESTION_INVENTORY_PAIR_IDLE_SECONDS", "86400"))
+        self.specialties = _parse_list(os.getenv("QUESTION_INVENTORY_SPECIALTIES", DEFAULT_SPECIALTIES))
+        self.difficulties = _parse_list(os.getenv("QUESTION_INVENTORY_DIFFICULTIES", DEFAULT_DIFFICULTIES))
+
+        self._generator = generator
+        self._session_factory = session_factory
+        self._lock = threading.Lock()
+        self._pairs: Dict[Pair, Dict[str, int]] = {}
+        self._pinned: Set[Pair] = set()
+        self._last_claimed: Dict[Pair, float] = {}
+        self._clock = time.monotonic
+        self._refilling = set()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._counters = {"hits": 0, "misses": 0, "generated": 0, "generation_failures": 0}
+
+        for specialty, difficulty in _parse_pairs(os.getenv("QUESTION_INVENTORY_PAIRS", "")):
+            if self.register_pair(specialty, difficulty, claimed=False):
+                self._pinned.add((specialty, difficulty))
+
+    # --- Consumer side ---
+
+    def claim(self, db: Session, specialty: str, difficulty: str) -> Optional[Question]:
+        """Atomically take one stocked question for the pair, or return None on a miss"""
+        if not self.enabled:
+            return None
+
+        self._note_demand(specialty, difficulty)
+        candidate = (
+            select(Question.id)
+            .where(
+                Question.in_inventory == True,
+                Question.discipline == specialty,
+                Question.difficulty == difficulty
+            )
+            .order_by(Question.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(Question)
+            .where(Question.id == candidate, Question.in_inventory == True)
+            .values(in_inventory=False)
+            .returning(Question)
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            question = db.scalars(stmt).first()
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error claiming inventory question for {specialty}/{difficulty}: {str(e)}")
+            db.rollback()
+            question = None
+
+        with self._lock:
+            self._counters["hits" if question is not None else "misses"] += 1
+            stats = self._pairs.get((specialty, difficulty))
+            depth = 0
+            if stats is not None:
+                if question is not None:
+                    stats["hits"] += 1
+                    stats["depth"] = max(0, stats["depth"] - 1)
+                else:
+                    stats["misses"] += 1
+                    stats["depth"] = 0
+                depth = stats["depth"]
+
+        if depth < self.low_watermark:
+            self._wakeup.set()
+        return question
+
+    def register_pair(self, specialty: str, difficulty: str, claimed: bool = True) -> bool:
+        """
+        Start tracking a (specialty, difficulty) pair, stocked right away when `claimed`;
+        returns False once max_pairs is reached
+        """
+        key = (specialty, difficulty)
+        with self._lock:
+            if key not in self._pairs:
+                if len(self._pairs) >= self.max_pairs:
+                    return False
+                self._pairs[key] = {"depth": 0, "hits": 0, "misses": 0}
+            if claimed:
+                self._last_claimed[key] = self._clock()
+            return True
+
+    def _note_demand(self, specialty: str, difficulty: str):
+        """Keep a claimed pair alive; register it only if it is on the allow-list"""
+        key = (specialty, difficulty)
+        with self._lock:
+            if key in self._pairs:
+                self._last_claimed[key] = self._clock()
+                return
+        if specialty in self.specialties and difficulty in self.difficulties:
+            self.register_pair(specialty, difficulty)
+
+    def _evict_idle_pairs(self):
+        # Caller holds self._lock; configured pairs stay tracked but are no longer refilled
+        cutoff = self._clock() - self.pair_idle_seconds
+        for key in [key for key, claimed in self._last_claimed.items() if claimed < cutoff]:
+            if key in self._refilling:
+                continue
+            del self._last_claimed[key]
+            if key not in self._pinned:
+                self._pairs.pop(key, None)
+            logger.info(f"Question inventory stopped stocking idle pair {key[0]}/{key[1]}")
+
+    # --- Producer side ---
+
+    def start(self):
+        """Start the background producer thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="inventory-refill")
+        self._thread = threading.Thread(target=self._run, name="question-inventory", daemon=True)
+        self._thread.start()
+        logger.info(f"Question inventory producer started (low={self.low_watermark}, high={self.high_watermark}, concurrency={self.max_concurrency})")
+
+    def stop(self):
+        """Stop the producer and wait for in-flight refills to finish"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._thread = None
+        self._executor = None
+        with self._lock:
+            self._refilling.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_levels()
+            except Exception as e:
+                logger.error(f"Question inventory check failed: {str(e)}")
+            self._wakeup.wait(self.refill_interval)
+            self._wakeup.clear()
+
+    def check_levels(self):
+        """Refresh depth for every tracked pair and schedule refills for claimed ones below the low watermark"""
+        depths = self._count_depths()
+        with self._lock:
+            self._evict_idle_pairs()
+            for key, stats in self._pairs.items():
+                stats["depth"] = depths.get(key, 0)
+            due = [
+                key for key, stats in self._pairs.items()
+                if stats["depth"] < self.low_watermark and key in self._last_claimed and key not in self._refilling
+            ]
+            self._refilling.update(due)
+
+        for key in due:
+            if self._executor is None:
+                self.refill(*key)
+            else:
+                self._executor.submit(self.refill, *key)
+
+    def _count_depths(self) -> Dict[Pair, int]:
+        db = self._session_factory()
+        try:
+            rows = db.query(
+                Question.discipline,
+                Question.difficulty,
+                func.count(Question.id)
+            ).filter(
+                Question.in_inventory == True
+            ).group_by(Question.discipline, Question.difficulty).all()
+            return {(discipline, difficulty): count for discipline, difficulty, count in rows}
+        finally:
+            db.close()
+
+    def refill(self, specialty: str, difficulty: str) -> int:
+        """Generate questions for a pair until it reaches the high watermark; returns the number added"""
+        key = (specialty, difficulty)
+        added = 0
+        try:
+            with self._lock:
+                deficit = self.high_watermark - self._pairs.get(key, {}).get("depth", 0)
+
+            for _ in range(max(0, deficit)):
+                if self._stop.is_set():
+                    break
+                if not self._produce_one(specialty, difficulty):
+                    # Stop on the first failure and let the next check retry
+                    break
+                added += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(key)
+        if added:
+            logger.info(f"Question inventory refilled {added} question(s) for {specialty}/{difficulty}")
+        return added
+
+    def _produce_one(self, specialty: str, difficulty: str) -> bool:
+        generator = self._generator
+        if generator is None:
+            from backend.services.question_service import generate_question
+            generator = generate_question
+
+        try:
+            question = generator(specialty, difficulty)
+        except Exception as e:
+            logger.error(f"Question inventory generation failed for {specialty}/{difficulty}: {str(e)}")
+            with self._lock:
+                self._counters["generation_failures"] += 1
+            return False
+
+        question.discipline = specialty
+        question.difficulty = difficulty
+        question.in_inventory = True
+
+        db = self._session_factory()
+        try:
+            db.add(question)
+            record_question_tags(db, [question])
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error storing inventory question for {specialty}/{difficulty}: {str(e)}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+        with self._lock:
+            self._counters["generated"] += 1
+            if (specialty, difficulty) in self._pairs:
+                self._pairs[(specialty, difficulty)]["depth"] += 1
+        return True
+
+    # --- Monitoring ---
+
+    def stats(self) -> Dict:
+        """Snapshot of inventory depth and hit/miss counters"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "low_watermark": self.low_watermark,
+                "high_watermark": self.high_watermark,
+                "max_concurrency": self.max_concurrency,
+                **self._counters,
+                "pairs": [
+                    {"specialty": specialty, "difficulty": difficulty, **stats}
+                    for (specialty, difficulty), stats in self._pairs.items()
+                ]
+            }
+
+question_inventory = QuestionInventory()
@@ -0,0 +1,116 @@
+import os
+import random
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, exists, func, select
+from sqlalchemy.orm import Session
+
+from backend.models import Question, Response
+
+logger = logging.getLogger(__name__)
+
+class QuestionSelector:
+    """
+    Adaptive selection from the existing question bank.
+
+    Picks a question the user has never answered (NOT EXISTS anti-join against their
+    responses) for the requested specialty and difficulty, preferring the question types
+    the user has been getting wrong in their most recent answers. Only when no unseen
+    question is left does the caller need to generate one.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.enabled = os.getenv("QUESTION_SELECTOR_ENABLED", "true").lower() == "true"
+        # Recent answers used to find weak question types
+        self.history_window = int(os.getenv("QUESTION_SELECTOR_HISTORY_WINDOW", "200"))
+        # Question types with a smoothed accuracy below this are targeted first
+        self.weak_threshold = float(os.getenv("QUESTION_SELECTOR_WEAK_THRESHOLD", "0.7"))
+        self.max_focus = int(os.getenv("QUESTION_SELECTOR_MAX_FOCUS", "2"))
+        # Newest unseen candidates to choose from at random, so concurrent users get different rows
+        self.candidate_pool = max(1, int(os.getenv("QUESTION_SELECTOR_CANDIDATE_POOL", "20")))
+
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._counters = {"served": 0, "targeted": 0, "exhausted": 0}
+
+    def weak_categories(self, db: Session, user_id: int, specialty: str) -> List[str]:
+        """Question types in the specialty ordered weakest first, from the user's recent answers"""
+        recent = (
+            select(Response.question_id, Response.is_correct)
+            .where(Response.user_id == user_id)
+            .order_by(Response.id.desc())
+            .limit(self.history_window)
+            .subquery()
+        )
+        rows = db.execute(
+            select(
+                Question.question_type,
+                func.count(),
+                func.sum(case((recent.c.is_correct == True, 1), else_=0))
+            )
+            .join(recent, recent.c.question_id == Question.id)
+            .where(Question.discipline == specialty, Question.question_type.is_not(None))
+            .group_by(Question.question_type)
+        ).all()
+
+        # Laplace-smoothed accuracy so a single miss doesn't outrank a long losing streak
+        scored = sorted(
+            ((correct + 1) / (total + 2), question_type)
+            for question_type, total, correct in rows
+        )
+        return [question_type for score, question_type in scored if score < self.weak_threshold][:self.max_focus]
+
+    def _unseen_ids(self, db: Session, user_id: int, specialty: str, difficulty: Optional[str],
+                    question_type: Optional[str] = None) -> List[int]:
+        answered = exists().where(Response.user_id == user_id, Response.question_id == Question.id)
+        stmt = select(Question.id).where(
+            Question.discipline == specialty,
+            Question.in_inventory == False,
+            ~answered
+        )
+        if difficulty is not None:
+            stmt = stmt.where(Question.difficulty == difficulty)
+        if question_type is not None:
+            stmt = stmt.where(Question.question_type == question_type)
+        return list(db.scalars(stmt.order_by(Question.id.desc()).limit(self.candidate_pool)))
+
+    def select(self, db: Session, user_id: int, specialty: str, difficulty: Optional[str]) -> Optional[Question]:
+        """An unseen bank question for the user, or None when the bank has none left for the pair"""
+        if not self.enabled:
+            return None
+
+        try:
+            candidates: List[int] = []
+            targeted = False
+            for question_type in self.weak_categories(db, user_id, specialty):
+                candidates = self._unseen_ids(db, user_id, specialty, difficulty, question_type)
+                if candidates:
+                    targeted = True
+                    break
+            if not candidates:
+                candidates = self._unseen_ids(db, user_id, specialty, difficulty)
+        except Exception as e:
+            logger.error(f"Question selection failed for user {user_id} - Specialty: {specialty}, Difficulty: {difficulty}: {str(e)}")
+            db.rollback()
+            return None
+
+        with self._lock:
+            if candidates:
+                self._counters["served"] += 1
+                self._counters["targeted"] += int(targeted)
+            else:
+                self._counters["exhausted"] += 1
+        if not candidates:
+            return None
+
+        question = db.get(Question, self._rng.choice(candidates))
+        logger.info(f"Selected bank question {question.id} for user {user_id} - Specialty: {specialty}, Difficulty: {difficulty}, Targeted: {targeted}")
+        return question
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"enabled": self.enabled, **self._counters}
+
+question_selector = QuestionSelector()
@@ -0,0 +1,163 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.models import Question
+from backend.services.question_tags import record_question_tags
+from backend.services.openai_service import get_openai_service
+from backend.services.tagging_service import get_tagging_service
+
+logger = logging.getLogger(__name__)
+
+def tag_question_data(question_data: Dict) -> Dict:
+    """Tag generated question data, returning empty tags if tagging fails"""
+    try:
+        tagging_service = get_tagging_service()
+        tags = tagging_service.tag_question(
+            question_content=question_data["question"],
+            question_options=question_data["options"]
+        )
+        logger.info(f"Question tagged successfully: {tags}")
+        return tags
+    except Exception as tag_error:
+        logger.error(f"Error tagging question: {str(tag_error)}")
+        return {}
+
+async def tag_question_data_async(question_data: Dict) -> Dict:
+    """Async variant of tag_question_data"""
+    try:
+        tagging_service = get_tagging_service()
+        tags = await tagging_service.tag_question_async(
+            question_content=question_data["question"],
+            question_options=question_data["options"]
+        )
+        logger.info(f"Question tagged successfully: {tags}")
+        return tags
+    except Exception as tag_error:
+        logger.error(f"Error tagging question: {str(tag_error)}")
+        return {}
+
+def tag_question_data_batch(question_data_list: List[Dict]) -> List[Dict]:
+    """Tag several generated questions together, returning empty tags for all if tagging fails"""
+    try:
+        return get_tagging_service().tag_questions(
+            [(question_data["question"], question_data["options"]) for question_data in question_data_list]
+        )
+    except Exception as tag_error:
+        logger.error(f"Error tagging question batch: {str(tag_error)}")
+        return [{} for _ in question_data_list]
+
+async def tag_question_data_batch_async(question_data_list: List[Dict]) -> List[Dict]:
+    """Async variant of tag_question_data_batch"""
+    try:
+        return await get_tagging_service().tag_questions_async(
+            [(question_data["question"], question_data["options"]) for question_data in question_data_list]
+        )
+    except Exception as tag_error:
+        logger.error(f"Error tagging question batch: {str(tag_error)}")
+        return [{} for _ in question_data_list]
+
+def build_question(question_data: Dict, tags: Dict,
+                   specialty: Optional[str] = None,
+                   difficulty: Optional[str] = None,
+                   in_inventory: bool = False) -> Question:
+    """
+    Build an unsaved Question row from generated question data and its tags.
+
+    `specialty` and `difficulty` override the values echoed back by the model so
+    rows can be matched exactly against the (specialty, difficulty) they were requested for.
+    """
+    question = Question(
+        content=question_data["question"],
+        discipline=specialty or question_data["specialty"],  # Legacy field
+        options=json.dumps(question_data["options"]),
+        correct_answer=question_data["correct_answer"],
+        explanation=question_data["explanation"],
+        difficulty=difficulty or question_data["difficulty"],
+        topics=json.dumps(question_data.get("topics", [])),  # Legacy field
+
+        # New structured taxonomy fields
+        disciplines=json.dumps(tags.get("disciplines", [])),
+        body_systems=json.dumps(tags.get("body_systems", [])),
+        specialties=json.dumps(tags.get("specialties", [])),
+        question_type=tags.get("question_type"),
+        age_group=tags.get("age_group"),
+        acuity=tags.get("acuity"),
+        pathophysiology=json.dumps(tags.get("pathophysiology", [])),
+        in_inventory=in_inventory
+    )
+    # Not persisted; lets the caller charge the completion and its tagging to the user's LLM ledger
+    question.tokens_used = question_data.get("tokens_used", 0)
+    question.tagging_tokens_used = tags.get("tokens_used", 0)
+    return question
+
+def generate_question(specialty: str, difficulty: str, in_inventory: bool = False) -> Question:
+    """Generate and tag a new clinical question, returning an unsaved Question row"""
+    question_data = get_openai_service().generate_clinical_question(
+        specialty=specialty,
+        difficulty=difficulty
+    )
+    logger.info(f"Successfully generated question: {question_data.get('question', 'N/A')[:100]}...")
+    tags = tag_question_data(question_data)
+    return build_question(question_data, tags, specialty=specialty, difficulty=difficulty, in_inventory=in_inventory)
+
+async def generate_question_async(specialty: str, difficulty: str, in_inventory: bool = False) -> Question:
+    """Async variant of generate_question; both LLM calls are awaited on the event loop"""
+    question_data = await get_openai_service().generate_clinical_question_async(
+        specialty=specialty,
+        difficulty=difficulty
+    )
+    logger.info(f"Successfully generated question: {question_data.get('question', 'N/A')[:100]}...")
+    tags = await tag_question_data_async(question_data)
+    return build_question(question_data, tags, specialty=specialty, difficulty=difficulty, in_inventory=in_inventory)
+
+def generate_question_batch(specialty: str, difficulty: str, count: int,
+                            in_inventory: bool = False) -> Dict:
+    """
+    Generate up to `count` tagged questions from a single completion.
+
+    Returns {"questions": [unsaved Question rows], "requested", "rejected", "tokens_used"}.
+    """
+    batch = get_openai_service().generate_clinical_questions_batch(
+        specialty=specialty,
+        difficulty=difficulty,
+        count=count
+    )
+    tags_list = tag_question_data_batch(batch["questions"]) if batch["questions"] else []
+    return _build_batch(batch, tags_list, specialty, difficulty, in_inventory)
+
+async def generate_question_batch_async(specialty: str, difficulty: str, count: int,
+                                        in_inventory: bool = False) -> Dict:
+    """Async variant of generate_question_batch; both LLM calls are awaited on the event loop"""
+    batch = await get_openai_service().generate_clinical_questions_batch_async(
+        specialty=specialty,
+        difficulty=difficulty,
+        count=count
+    )
+    tags_list = await tag_question_data_batch_async(batch["questions"]) if batch["questions"] else []
+    return _build_batch(batch, tags_list, specialty, difficulty, in_inventory)
+
+def _build_batch(batch: Dict, tags_list: List[Dict], specialty: str, difficulty: str, in_inventory: bool) -> Dict:
+    questions = [
+        build_question(question_data, tags, specialty=specialty, difficulty=difficulty, in_inventory=in_inventory)
+        for question_data, tags in zip(batch["questions"], tags_list)
+    ]
+    for question in questions:
+        # One completion served every question in the batch; split its tokens evenly
+        question.tokens_used = batch.get("tokens_used", 0) // len(questions)
+    return {**batch, "questions": questions}
+
+def bulk_insert_questions(db: Session, questions: List[Question]) -> int:
+    """Insert questions in a single transaction; returns the number inserted"""
+    if not questions:
+        return 0
+    try:
+        db.add_all(questions)
+        record_question_tags(db, questions)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(questions)
@@ -0,0 +1,77 @@
+import json
+from typing import Dict, Iterable, List
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.models import Question, QuestionTag, Response, UserCategoryStat, TAG_DIMENSIONS
+
+# Every Question column that decides which user_category_stats rows an answer counts towards
+CATEGORY_COLUMNS = TAG_DIMENSIONS + ("discipline", "question_type", "age_group", "acuity")
+
+def question_tag_rows(question_id: int, columns: dict) -> list:
+    """question_tags rows for one question from its JSON tag columns; bad JSON yields no rows"""
+    rows = []
+    for dimension in TAG_DIMENSIONS:
+        try:
+            values = json.loads(columns.get(dimension) or "[]")
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(values, list):
+            continue
+        for value in dict.fromkeys(v for v in values if isinstance(v, str) and v):
+            rows.append({"question_id": question_id, "dimension": dimension, "value": value})
+    return rows
+
+def replace_question_tags(connection, questions: list):
+    """Rewrite question_tags for questions given as dicts with an "id" and the JSON tag columns"""
+    if not questions:
+        return
+    connection.execute(delete(QuestionTag).where(QuestionTag.question_id.in_([q["id"] for q in questions])))
+    rows = [row for q in questions for row in question_tag_rows(q["id"], q)]
+    if rows:
+        connection.execute(insert(QuestionTag), rows)
+
+def invalidate_category_stats(connection, question_ids: list) -> List[int]:
+    """
+    Drop the user_category_stats rows of every user who answered these re-tagged
+    questions; they are rebuilt from responses on the user's next read or answer.
+    Returns the affected user ids.
+    """
+    if not question_ids:
+        return []
+    user_ids = list(connection.scalars(
+        select(Response.user_id).where(Response.question_id.in_(question_ids)).distinct()
+    ))
+    if user_ids:
+        connection.execute(delete(UserCategoryStat).where(UserCategoryStat.user_id.in_(user_ids)))
+    return user_ids
+
+def record_question_tags(db: Session, questions: Iterable[Question]):
+    """Mirror the tag columns of newly added questions into question_tags; the caller commits"""
+    questions = list(questions)
+    if not questions:
+        return
+    db.flush()
+    replace_question_tags(db.connection(), [
+        {"id": q.id, **{d: getattr(q, d) for d in TAG_DIMENSIONS}} for q in questions
+    ])
+
+def retag_questions(db: Session, updates: List[Dict]) -> List[int]:
+    """
+    Write new category columns for existing questions, given as dicts with an "id", and
+    everything derived from them: question_tags and the category rollups of users who
+    answered them. Returns the affected user ids; the caller commits, then bumps their
+    analytics cache versions.
+    """
+    if not updates:
+        return []
+    db.execute(update(Question), updates)
+    connection = db.connection()
+    ids = [u["id"] for u in updates]
+    # Read the columns back so a partial update keeps the dimensions it didn't touch
+    current = connection.execute(
+        select(Question.id, *(getattr(Question, d) for d in TAG_DIMENSIONS)).where(Question.id.in_(ids))
+    ).mappings()
+    replace_question_tags(connection, [dict(row) for row in current])
+    return invalidate_category_stats(connection, ids)
@@ -0,0 +1,171 @@
+"""
+Per-user token-bucket rate limiting for the routes that can trigger paid LLM calls.
+
+Each (rule, user) pair has a bucket of `capacity` requests refilled continuously over
+`period` seconds, so users get short bursts but not sustained scripted load. Requests
+over the limit get 429 with Retry-After before they reach the route. Buckets live in
+process memory by default; set RATE_LIMIT_REDIS_URL (requires the optional `redis`
+package) to share them between workers.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from backend.auth.principal import principal_cache
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    method: str
+    path_prefix: str
+    capacity: int
+    period_seconds: float
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period_seconds
+
+def _parse_limit(raw: str) -> Tuple[int, float]:
+    """Parse "30/60" (30 requests per 60 seconds)"""
+    capacity, period = raw.split("/", 1)
+    return int(capacity), float(period)
+
+class MemoryBucketStore:
+    """Process-local buckets, least recently used evicted beyond `max_keys`"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, refill_per_second: float, now: Optional[float] = None) -> float:
+        """Take one token; returns 0 when allowed, else seconds until a token is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - updated) * refill_per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / refill_per_second
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class RedisBucketStore:
+    """Buckets shared by every worker; the refill-and-take runs atomically in Redis"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis  # Optional dependency, only needed for the shared store
+
+        self.client = redis.Redis.from_url(url)
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: int, refill_per_second: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return float(self._take(keys=[f"ratelimit:{key}"], args=[capacity, refill_per_second, now]))
+
+    def clear(self):
+        for key in self.client.scan_iter("ratelimit:*"):
+            self.client.delete(key)
+
+class RateLimiter:
+    def __init__(self, store=None):
+        self.enabled = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+        question_limit = _parse_limit(os.getenv("RATE_LIMIT_QUESTION", "30/60"))
+        answer_limit = _parse_limit(os.getenv("RATE_LIMIT_ANSWER", "30/60"))
+        self.rules: List[RateLimitRule] = [
+            RateLimitRule("question", "GET", "/api/v1/chat/question", *question_limit),
+            RateLimitRule("answer", "POST", "/api/v1/chat/answer", *answer_limit),
+        ]
+        if store is None:
+            redis_url = os.getenv("RATE_LIMIT_REDIS_URL")
+            store = RedisBucketStore(redis_url) if redis_url else MemoryBucketStore()
+        self.store = store
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "limited": 0, "errors": 0}
+
+    def rule_for(self, method: str, path: str) -> Optional[RateLimitRule]:
+        for rule in self.rules:
+            if method == rule.method and path.startswith(rule.path_prefix):
+                return rule
+        return None
+
+    @staticmethod
+    def client_key(request: Request) -> str:
+        """The token's user id, else the client address for anonymous or invalid tokens"""
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                claims = principal_cache.claims(authorization[7:], HTTPException(status_code=401))
+                return f"user:{claims['sub']}"
+            except HTTPException:
+                pass
+        return f"ip:{request.client.host if request.client else 'unknown'}"
+
+    def check(self, rule: RateLimitRule, key: str) -> float:
+        """Seconds to wait before retrying, 0 when the request may proceed"""
+        try:
+            wait = self.store.take(f"{rule.name}:{key}", rule.capacity, rule.refill_per_second)
+        except Exception as e:
+            # Fail open: a broken shared store must not take the API down
+            logger.error(f"Rate limit store failed: {str(e)}")
+            with self._lock:
+                self._counters["errors"] += 1
+            return 0.0
+        with self._lock:
+            self._counters["limited" if wait > 0 else "allowed"] += 1
+        return wait
+
+    def clear(self):
+        self.store.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "store": type(self.store).__name__, **self._counters}
+
+rate_limiter = RateLimiter()
+
+async def rate_limit_middleware(request: Request, call_next):
+    rule = rate_limiter.rule_for(request.method, request.url.path) if rate_limiter.enabled else None
+    if rule is not None:
+        wait = rate_limiter.check(rule, rate_limiter.client_key(request))
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded, please slow down."},
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+    return await call_next(request)
@@ -0,0 +1,346 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+import openai
+
+from backend.services.metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# Overall budget per operation, including retries; override with LLM_DEADLINE_<OPERATION>
+DEFAULT_DEADLINES = {
+    "generate_question": 45.0,
+    "generate_question_batch": 180.0,
+    "stream_question": 15.0,
+    "evaluate_answer": 30.0,
+    "stream_feedback": 15.0,
+    "tag_question": 20.0,
+    "tag_questions": 60.0,
+}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while its circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one LLM provider.
+
+    Errors and calls slower than the latency SLO both count as failures. After
+    `failure_threshold` in a row the breaker opens and calls fail fast; once
+    `reset_timeout` has passed it goes half-open and lets `half_open_max_calls`
+    probes through. A successful probe closes it, a failed one re-opens it, and so
+    does a probe that has not reported back within `probe_timeout`. A probe abandoned
+    without an outcome (the caller was cancelled) gives its slot back.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1,
+                 probe_timeout: float = max(DEFAULT_DEADLINES.values()),
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.probe_timeout = probe_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_started_at = 0.0
+        self._counters = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"Circuit breaker {self.name} half-open, probing provider")
+        elif self._state == self.HALF_OPEN and self._probes_in_flight \
+                and self._clock() - self._probe_started_at >= self.probe_timeout:
+            # A probe stuck past every operation deadline counts as failed
+            self._counters["failures"] += 1
+            self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probes_in_flight = 0
+        self._counters["opened"] += 1
+        logger.warning(f"Circuit breaker {self.name} opened after {self._consecutive_failures} consecutive failures")
+
+    def allow_request(self) -> bool:
+        """Whether a call may go to the provider now; half-open probes are counted"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                self._probe_started_at = self._clock()
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self, slow: bool = False):
+        """Record a completed call; `slow` marks a latency SLO breach, which counts as a failure"""
+        if slow:
+            with self._lock:
+                self._counters["slow_calls"] += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self._counters["successes"] += 1
+            self._consecutive_failures = 0
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._probes_in_flight = 0
+                logger.info(f"Circuit breaker {self.name} closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def release_probe(self):
+        """Give back a half-open probe slot whose call was abandoned without an outcome"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probes_in_flight = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._maybe_half_open()
+            retry_in = max(0.0, self.reset_timeout - (self._clock() - self._opened_at)) if self._state == self.OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in_seconds": round(retry_in, 1),
+                **self._counters
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """Shared breaker per provider, so question, feedback and tagging calls trip it together"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                provider,
+                failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+                half_open_max_calls=int(os.getenv("LLM_BREAKER_HALF_OPEN_CALLS", "1")),
+                probe_timeout=float(os.getenv("LLM_BREAKER_PROBE_SECONDS", str(max(DEFAULT_DEADLINES.values()))))
+            )
+            _breakers[provider] = breaker
+        return breaker
+
+def reset_breakers():
+    """Close every provider breaker (used by tests and after manual recovery)"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
+
+def breaker_states() -> Dict[str, Dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
+
+def is_retryable(error: Exception) -> bool:
+    """Transient provider errors worth another attempt"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def counts_as_failure(error: Exception) -> bool:
+    """Client errors (bad request, auth) mean the provider is up, so they don't trip the breaker"""
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500 or error.status_code in (408, 429)
+    return True
+
+class LLMResilience:
+    """
+    Wraps provider calls with a per-operation deadline, jittered bounded retries and
+    the provider's circuit breaker. `fn` is called with the request kwargs plus
+    `timeout` set to the time left before the deadline, so the OpenAI clients
+    should be built with max_retries=0 and leave retrying to this wrapper.
+    """
+
+    def __init__(self, provider: str, breaker: Optional[CircuitBreaker] = None):
+        self.provider = provider
+        self.breaker = breaker or get_breaker(provider)
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.retry_base = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+        self.retry_max = float(os.getenv("LLM_RETRY_MAX_SECONDS", "4"))
+        # A call slower than this fraction of its deadline counts as a latency SLO breach
+        self.slow_call_ratio = float(os.getenv("LLM_SLOW_CALL_RATIO", "0.5"))
+
+    def available(self) -> bool:
+        """False while the breaker is open, so callers can skip straight to a fallback"""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    def deadline(self, operation: str) -> float:
+        default = DEFAULT_DEADLINES.get(operation, 30.0)
+        return float(os.getenv(f"LLM_DEADLINE_{operation.upper()}", str(default)))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform between zero and the capped exponential step
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (attempt - 1)))
+
+    def _before_attempt(self, operation: str):
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"{self.provider} circuit open, skipping {operation}")
+
+    def _after_error(self, operation: str, error: Exception, attempt: int, deadline_at: float) -> Optional[float]:
+        """Record a failed attempt; returns the delay before retrying, or None to give up"""
+        if not counts_as_failure(error):
+            self.breaker.record_success()
+            return None
+        self.breaker.record_failure()
+
+        delay = self._backoff(attempt)
+        if attempt > self.max_retries or not is_retryable(error) or time.monotonic() + delay >= deadline_at \
+                or self.breaker.state == CircuitBreaker.OPEN:
+            return None
+        logger.warning(f"{operation} attempt {attempt} on {self.provider} failed ({type(error).__name__}), retrying in {delay:.2f}s")
+        return delay
+
+    def _after_success(self, operation: str, started: float):
+        elapsed = time.monotonic() - started
+        self.breaker.record_success(slow=elapsed > self.deadline(operation) * self.slow_call_ratio)
+
+    def call(self, operation: str, fn: Callable[..., Any], **kwargs) -> Any:
+        started = time.perf_counter()
+        outcome, result = "error", None
+        try:
+            result = self._call(operation, fn, **kwargs)
+            outcome = "success"
+            return result
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        finally:
+            record_llm_call(operation, self.provider, outcome, time.perf_counter() - started, result)
+
+    async def call_async(self, operation: str, fn: Callable[..., Any], **kwargs) -> Any:
+        started = time.perf_counter()
+        outcome, result = "error", None
+        try:
+            result = await self._call_async(operation, fn, **kwargs)
+            outcome = "success"
+            return result
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        finally:
+            record_llm_call(operation, self.provider, outcome, time.perf_counter() - started, result)
+
+    async def stream_async(self, operation: str, fn: Callable[..., Any], **kwargs) -> AsyncIterator[Any]:
+        """
+        Open a streamed completion through call_async's retries and yield its chunks. The
+        breaker hears the outcome only when the stream ends: a success (slow if it took past
+        opening past the SLO) once it is exhausted, a failure if it breaks off. A consumer that
+        stops reading early gives no verdict.
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            stream = await self._call_async(operation, fn, settle=False, **kwargs)
+            # Long completions stream for a while; only the wait for the stream counts towards the SLO
+            slow = time.perf_counter() - started > self.deadline(operation) * self.slow_call_ratio
+            try:
+                async for chunk in stream:
+                    yield chunk
+            except Exception as e:
+                if counts_as_failure(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                raise
+            except BaseException:
+                self.breaker.release_probe()
+                outcome = "abandoned"
+                raise
+            self.breaker.record_success(slow=slow)
+            outcome = "success"
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        finally:
+            record_llm_call(operation, self.provider, outcome, time.perf_counter() - started)
+
+    def _call(self, operation: str, fn: Callable[..., Any], **kwargs) -> Any:
+        deadline_at = time.monotonic() + self.deadline(operation)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(operation)
+            started = time.monotonic()
+            try:
+                result = fn(**kwargs, timeout=max(0.1, deadline_at - started))
+            except Exception as e:
+                delay = self._after_error(operation, e, attempt, deadline_at)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Interrupted, not a verdict on the provider
+                self.breaker.release_probe()
+                raise
+            self._after_success(operation, started)
+            return result
+
+    async def _call_async(self, operation: str, fn: Callable[..., Any], settle: bool = True, **kwargs) -> Any:
+        """Without `settle`, a successful call leaves its outcome (and any probe slot) to the caller"""
+        deadline_at = time.monotonic() + self.deadline(operation)
+        attempt = 0
+        while True:
+            attempt += 1
+            self._before_attempt(operation)
+            started = time.monotonic()
+            try:
+                result = await fn(**kwargs, timeout=max(0.1, deadline_at - started))
+            except Exception as e:
+                delay = self._after_error(operation, e, attempt, deadline_at)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (client disconnect, wait_for), not a verdict on the provider
+                self.breaker.release_probe()
+                raise
+            if settle:
+                self._after_success(operation, started)
+            return result
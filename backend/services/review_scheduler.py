@@ -0,0 +1,124 @@
+import os
+import datetime
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend.database import dialect_insert
+from backend.models import Question, ReviewCard
+
+logger = logging.getLogger(__name__)
+
+# SM-2 answer grades (0-5); the chat flow only knows right or wrong
+QUALITY_CORRECT = 4
+QUALITY_INCORRECT = 1
+MIN_EASE_FACTOR = 1.3
+
+def sm2(repetitions: int, interval_days: float, ease_factor: float, quality: int,
+        lapse_interval_days: float) -> Tuple[int, float, float]:
+    """
+    One SM-2 step: returns the new (repetitions, interval_days, ease_factor).
+
+    A failed recall (quality < 3) restarts the repetition count and brings the card
+    back after `lapse_interval_days`, so missed questions return within the session.
+    """
+    if quality < 3:
+        repetitions, interval_days = 0, lapse_interval_days
+    else:
+        if repetitions == 0:
+            interval_days = 1.0
+        elif repetitions == 1:
+            interval_days = 6.0
+        else:
+            interval_days = interval_days * ease_factor
+        repetitions += 1
+    ease_factor = ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    return repetitions, interval_days, max(MIN_EASE_FACTOR, ease_factor)
+
+class ReviewScheduler:
+    """
+    SM-2 review scheduling over the review_cards table.
+
+    Every answer updates the card for its (user, question) pair in the same transaction
+    as the response. The review queue pops the earliest due cards for a user with one
+    range scan on (user_id, due_at) and leases them for a few minutes so a second
+    request does not serve them again before they are answered.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("REVIEW_SCHEDULER_ENABLED", "true").lower() == "true"
+        self.lapse_interval = datetime.timedelta(minutes=float(os.getenv("REVIEW_LAPSE_MINUTES", "10")))
+        self.lease = datetime.timedelta(minutes=float(os.getenv("REVIEW_LEASE_MINUTES", "10")))
+        self.max_batch = int(os.getenv("REVIEW_MAX_BATCH", "20"))
+
+    def _card_for_update(self, db: Session, user_id: int, question_id: int) -> Optional[ReviewCard]:
+        return db.scalars(
+            select(ReviewCard)
+            .where(ReviewCard.user_id == user_id, ReviewCard.question_id == question_id)
+            .with_for_update()
+        ).first()
+
+    def record_answer(self, db: Session, user_id: int, question_id: int, is_correct: bool,
+                      now: Optional[datetime.datetime] = None) -> Optional[ReviewCard]:
+        """Update the card for an answer; the caller commits with the response"""
+        if not self.enabled:
+            return None
+        now = now or datetime.datetime.utcnow()
+
+        card = self._card_for_update(db, user_id, question_id)
+        if card is None:
+            # Concurrent first answers to the same question must not create two cards
+            db.execute(
+                dialect_insert(db, ReviewCard.__table__)
+                .values(user_id=user_id, question_id=question_id, repetitions=0, interval_days=0.0,
+                        ease_factor=2.5, lapses=0, due_at=now)
+                .on_conflict_do_nothing(index_elements=["user_id", "question_id"])
+            )
+            card = self._card_for_update(db, user_id, question_id)
+
+        quality = QUALITY_CORRECT if is_correct else QUALITY_INCORRECT
+        card.repetitions, card.interval_days, card.ease_factor = sm2(
+            card.repetitions, card.interval_days, card.ease_factor, quality,
+            self.lapse_interval / datetime.timedelta(days=1)
+        )
+        if not is_correct:
+            card.lapses += 1
+        card.last_reviewed_at = now
+        card.due_at = now + datetime.timedelta(days=card.interval_days)
+        return card
+
+    def pop_due(self, db: Session, user_id: int, limit: int = 1,
+                now: Optional[datetime.datetime] = None) -> List[Question]:
+        """Lease and return up to `limit` of the user's earliest due questions"""
+        now = now or datetime.datetime.utcnow()
+        due = (
+            select(ReviewCard.id)
+            .where(ReviewCard.user_id == user_id, ReviewCard.due_at <= now)
+            .order_by(ReviewCard.due_at)
+            .limit(max(1, min(limit, self.max_batch)))
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(ReviewCard)
+            .where(ReviewCard.id.in_(due), ReviewCard.due_at <= now)
+            .values(due_at=now + self.lease)
+            .returning(ReviewCard.question_id)
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            question_ids = list(db.scalars(stmt))
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error popping due reviews for user {user_id}: {str(e)}")
+            db.rollback()
+            return []
+        if not question_ids:
+            return []
+
+        questions = {question.id: question for question in db.scalars(select(Question).where(Question.id.in_(question_ids)))}
+        return [questions[question_id] for question_id in question_ids if question_id in questions]
+
+review_scheduler = ReviewScheduler()
@@ -1,9 +1,20 @@
 import os
+import copy
 import json
+import hashlib
+import asyncio
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
-from openai import AzureOpenAI
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from openai import AzureOpenAI, AsyncAzureOpenAI
+
+from backend.services.taxonomy import TAXONOMY, LEXICON, LIST_CATEGORIES, SINGLE_CATEGORIES
+from backend.services.cache import LRUCache
+from backend.services.fake_llm import FakeLLMClient, AsyncFakeLLMClient, fake_provider_enabled
+from backend.services.metrics import record_fallback
+from backend.services.resilience import LLMResilience
+from backend.services.taxonomy_matcher import TaxonomyMatcher, tokenize
 
 logger = logging.getLogger(__name__)
 
@@ -15,125 +26,389 @@ class TaggingBackend(ABC):
         """Tag a medical question with structured categories"""
         pass
 
+    async def tag_question_async(self, question_content: str, question_options: Dict) -> Dict:
+        """Async variant of tag_question; backends without a native async client run in a worker thread"""
+        return await asyncio.to_thread(self.tag_question, question_content, question_options)
+
+    def tag_questions(self, questions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Tag several (content, options) pairs; backends that can batch requests override this"""
+        return [self.tag_question(content, options) for content, options in questions]
+
+    async def tag_questions_async(self, questions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Async variant of tag_questions"""
+        return list(await asyncio.gather(*(self.tag_question_async(content, options) for content, options in questions)))
+
+def _taxonomy_schema() -> str:
+    """Render TAXONOMY as the JSON-like schema shown to the tagging model"""
+    lines = []
+    for category, values in TAXONOMY.items():
+        rendered = json.dumps(values) if category in LIST_CATEGORIES else f'"{"|".join(values)}"'
+        lines.append(f'    "{category}": {rendered}')
+    return "{\n" + ",\n".join(lines) + "\n}"
+
 class AzureOpenAITagger(TaggingBackend):
     """Azure OpenAI backend for question tagging"""
     
     def __init__(self):
-        self.client = AzureOpenAI(
-            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01"),
-            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-        )
-        self.deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4")
+        if fake_provider_enabled():
+            # LLM_PROVIDER=fake swaps in the offline fake client, as in OpenAIService
+            self.client = FakeLLMClient()
+            self.async_client = AsyncFakeLLMClient()
+            self.deployment_name = "fake-llm"
+            provider = "fake"
+        else:
+            azure_settings = dict(
+                api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-10-21"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                # Retries and deadlines are handled by LLMResilience
+                max_retries=0
+            )
+            self.client = AzureOpenAI(**azure_settings)
+            self.async_client = AsyncAzureOpenAI(**azure_settings)
+            self.deployment_name = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4")
+            provider = "azure"
+        # Shares the provider's breaker with OpenAIService
+        self.resilience = LLMResilience(provider)
     
-    def tag_question(self, question_content: str, question_options: Dict) -> Dict:
-        """Tag question using Azure OpenAI"""
-        
-        system_prompt = """You are a medical education expert. Analyze the given medical question and categorize it using the structured taxonomy below.
+    def _system_prompt(self, instructions: str) -> str:
+        return f"""You are a medical education expert. {instructions}
 
 Return ONLY a JSON object with these exact keys:
 
-{
-    "disciplines": ["anatomy", "physiology", "biochemistry", "pharmacology", "pathology", "microbiology", "immunology", "histology", "embryology", "genetics", "biostatistics", "ethics", "behavioral_sciences"],
-    "body_systems": ["cardiovascular", "respiratory", "gastrointestinal", "genitourinary", "neurological", "musculoskeletal", "endocrine", "integumentary", "hematologic", "reproductive", "immune", "sensory"],
-    "specialties": ["internal_medicine", "surgery", "pediatrics", "ob_gyn", "psychiatry", "emergency", "family_medicine", "radiology", "pathology", "anesthesiology", "dermatology", "ophthalmology", "orthopedics", "neurology", "cardiology"],
-    "question_type": "diagnosis|treatment|mechanism|prevention|prognosis|anatomy|normal_vs_abnormal",
-    "age_group": "neonate|infant|child|adolescent|adult|elderly",
-    "acuity": "life_threatening|urgent|semi_urgent|routine|preventive",
-    "pathophysiology": ["infectious", "neoplastic", "autoimmune", "genetic", "metabolic", "degenerative", "traumatic", "toxic", "congenital", "iatrogenic"]
-}
+{_taxonomy_schema()}
 
 Select only the most relevant 1-3 items for list fields. Use null for any category that doesn't clearly apply."""
 
+    def _tagging_messages(self, question_content: str, question_options: Dict) -> List[Dict]:
+        """Build the chat messages for question tagging"""
+        system_prompt = self._system_prompt(
+            "Analyze the given medical question and categorize it using the structured taxonomy below."
+        )
+
         user_prompt = f"""Question: {question_content}
 
 Options: {json.dumps(question_options) if question_options else 'None'}
 
 Categorize this medical question:"""
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _batch_tagging_messages(self, questions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Build the chat messages for tagging several questions in one request"""
+        system_prompt = self._system_prompt(
+            "Analyze each of the numbered medical questions and categorize it using the structured taxonomy below. "
+            'Respond with {"results": [...]} holding one such object per question, in the order given.'
+        )
+
+        numbered = "\n\n".join(
+            f"""Question {index}: {content}
+
+Options: {json.dumps(options) if options else 'None'}"""
+            for index, (content, options) in enumerate(questions, start=1)
+        )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"{numbered}\n\nCategorize these {len(questions)} medical questions:"}
+        ]
+
+    def _parse_tagging_response(self, response) -> Dict:
+        """Parse a tagging completion into a tags dict"""
+        tags_json = response.choices[0].message.content.strip()
+        tags_data = json.loads(tags_json)
         
+        logger.info(f"Tagged question - Tokens: {response.usage.total_tokens}")
+        tags_data["tokens_used"] = response.usage.total_tokens
+        return tags_data
+
+    def tag_question(self, question_content: str, question_options: Dict) -> Dict:
+        """Tag question using Azure OpenAI; errors propagate so QuestionTaggingService can fall back"""
+        response = self.resilience.call("tag_question", self.client.chat.completions.create,
+            model=self.deployment_name,
+            messages=self._tagging_messages(question_content, question_options),
+            temperature=0.1,
+            max_tokens=500
+        )
+        return self._parse_tagging_response(response)
+
+    async def tag_question_async(self, question_content: str, question_options: Dict) -> Dict:
+        """Tag question using the async Azure OpenAI client"""
+        response = await self.resilience.call_async("tag_question", self.async_client.chat.completions.create,
+            model=self.deployment_name,
+            messages=self._tagging_messages(question_content, question_options),
+            temperature=0.1,
+            max_tokens=500
+        )
+        return self._parse_tagging_response(response)
+
+    def tag_questions(self, questions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Tag several questions with one request, falling back to one request each if the batch reply is unusable"""
+        if len(questions) <= 1:
+            return super().tag_questions(questions)
         try:
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500
+            response = self.resilience.call("tag_questions", self.client.chat.completions.create,
+                **self._batch_tagging_request(questions)
             )
-            
-            tags_json = response.choices[0].message.content.strip()
-            tags_data = json.loads(tags_json)
-            
-            logger.info(f"Tagged question - Tokens: {response.usage.total_tokens}")
-            return tags_data
-            
+            return self._parse_batch_tagging_response(response, len(questions))
         except Exception as e:
-            logger.error(f"Error tagging question: {str(e)}")
-            return self._get_fallback_tags()
-    
-    def _get_fallback_tags(self) -> Dict:
-        """Return basic fallback tags if tagging fails"""
-        return {
-            "disciplines": ["general_medicine"],
-            "body_systems": ["general"],
-            "specialties": ["internal_medicine"],
-            "question_type": "diagnosis",
-            "age_group": "adult",
-            "acuity": "routine",
-            "pathophysiology": []
-        }
+            logger.warning(f"Batch tagging failed, tagging individually: {str(e)}")
+            return super().tag_questions(questions)
+
+    async def tag_questions_async(self, questions: List[Tuple[str, Dict]]) -> List[Dict]:
+        """Async variant of tag_questions using the async Azure OpenAI client"""
+        if len(questions) <= 1:
+            return await super().tag_questions_async(questions)
+        try:
+            response = await self.resilience.call_async("tag_questions", self.async_client.chat.completions.create,
+                **self._batch_tagging_request(questions)
+            )
+            return self._parse_batch_tagging_response(response, len(questions))
+        except Exception as e:
+            logger.warning(f"Batch tagging failed, tagging individually: {str(e)}")
+            return await super().tag_questions_async(questions)
+
+    def _batch_tagging_request(self, questions: List[Tuple[str, Dict]]) -> Dict:
+        return dict(
+            model=self.deployment_name,
+            messages=self._batch_tagging_messages(questions),
+            temperature=0.1,
+            max_tokens=300 * len(questions) + 200
+        )
+
+    def _parse_batch_tagging_response(self, response, count: int) -> List[Dict]:
+        results = json.loads(response.choices[0].message.content.strip()).get("results")
+        if not isinstance(results, list) or len(results) != count or not all(isinstance(r, dict) for r in results):
+            raise ValueError(f"expected {count} results")
+        logger.info(f"Tagged {count} questions in one request - Tokens: {response.usage.total_tokens}")
+        for tags in results:
+            # One completion tagged every question in the batch; split its tokens evenly
+            tags["tokens_used"] = response.usage.total_tokens // count
+        return results
 
 class LocalLLMTagger(TaggingBackend):
-    """Local LLM backend for question tagging (placeholder for future implementation)"""
-    
+    """
+    Offline, deterministic tagging backend.
+
+    The taxonomy synonym lexicon is compiled once into a TaxonomyMatcher; a question's
+    content and options are scored in a single pass over their tokens. Matches in the
+    options count for less than matches in the stem, since most options are distractors.
+    """
+
+    OPTION_WEIGHT = 0.5
+    AGE_WEIGHT = 3.0
+    MIN_SCORE = 1.0
+    MAX_LIST_ITEMS = 3
+
+    _AGE_MARKER = ("age", "years")
+    _SEPARATOR = "|"
+
     def __init__(self):
-        # TODO: Initialize local model (Ollama, etc.)
-        self.model_endpoint = os.getenv("LOCAL_LLM_ENDPOINT", "http://localhost:11434")
-        logger.info("LocalLLMTagger initialized - not yet implemented")
-    
-    def tag_question(self, question_content: str, question_options: Dict) -> Dict:
-        """Tag question using local LLM (placeholder)"""
-        logger.warning("Local LLM tagging not yet implemented, using fallback")
-        return {
-            "disciplines": ["general_medicine"],
-            "body_systems": ["general"],
-            "specialties": ["internal_medicine"],
-            "question_type": "diagnosis",
-            "age_group": "adult",
-            "acuity": "routine",
-            "pathophysiology": []
+        lexicon = dict(LEXICON)
+        lexicon[self._AGE_MARKER] = ["year old", "yo"]
+        self.matcher = TaxonomyMatcher(lexicon)
+        self._order = {
+            (category, value): index
+            for category, values in TAXONOMY.items()
+            for index, value in enumerate(values)
         }
+        logger.info(f"LocalLLMTagger initialized - {self.matcher.state_count} matcher states")
+
+    def tag_question(self, question_content: str, question_options: Dict) -> Dict:
+        """Tag question from taxonomy phrase matches"""
+        content_tokens = tokenize(question_content or "")
+        option_text = " ".join(str(value) for value in (question_options or {}).values())
+        tokens = content_tokens + [self._SEPARATOR] + tokenize(option_text)
+        boundary = len(content_tokens)
+
+        scores = defaultdict(float)
+        for label, start, end in self.matcher.scan(tokens):
+            weight = 1.0 if end <= boundary else self.OPTION_WEIGHT
+            if label == self._AGE_MARKER:
+                age_group = self._age_group(tokens[start - 1]) if start > 0 else None
+                if age_group:
+                    scores[("age_group", age_group)] += self.AGE_WEIGHT * weight
+            else:
+                scores[label] += weight
+
+        # Patient age implies the specialty for children even when no pediatric term appears
+        if max(scores.get(("age_group", group), 0) for group in ("neonate", "infant", "child", "adolescent")) >= self.AGE_WEIGHT:
+            scores[("specialties", "pediatrics")] += 1.0
+
+        tags = {}
+        for category in LIST_CATEGORIES:
+            ranked = self._ranked(scores, category)
+            top = ranked[0][1] if ranked else 0
+            tags[category] = [
+                value for value, score in ranked[:self.MAX_LIST_ITEMS]
+                if score >= self.MIN_SCORE and score >= top / 2
+            ]
+        for category in SINGLE_CATEGORIES:
+            ranked = self._ranked(scores, category)
+            tags[category] = ranked[0][0] if ranked and ranked[0][1] >= self.MIN_SCORE else None
+        return tags
+
+    def _ranked(self, scores: Dict, category: str) -> List:
+        ranked = [(value, score) for (label_category, value), score in scores.items() if label_category == category]
+        ranked.sort(key=lambda item: (-item[1], self._order[(category, item[0])]))
+        return ranked
+
+    @staticmethod
+    def _age_group(token: str) -> Optional[str]:
+        if not token.isdigit():
+            return None
+        age = int(token)
+        if age < 1:
+            return "infant"
+        if age < 12:
+            return "child"
+        if age < 18:
+            return "adolescent"
+        if age < 65:
+            return "adult"
+        return "elderly"
+
+def tag_cache_key(question_content: str, question_options: Optional[Dict]) -> str:
+    """Hash of the case- and whitespace-normalized content and options, independent of option order"""
+    normalized = " ".join((question_content or "").lower().split())
+    options = sorted(
+        (str(key).strip().upper(), " ".join(str(value).lower().split()))
+        for key, value in (question_options or {}).items()
+    )
+    payload = json.dumps([normalized, options], separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 class QuestionTaggingService:
     """Main service for tagging medical questions with configurable backends"""
     
     def __init__(self, backend_type: str = "azure_openai"):
         self.backend = self._create_backend(backend_type)
+        # Tags depend only on the question text, so identical questions are tagged once
+        self.cache_enabled = os.getenv("TAG_CACHE_ENABLED", "true").lower() == "true"
+        self.cache = LRUCache(
+            maxsize=int(os.getenv("TAG_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("TAG_CACHE_TTL_SECONDS", "604800"))
+        )
         logger.info(f"QuestionTaggingService initialized with {backend_type} backend")
     
     def _create_backend(self, backend_type: str) -> TaggingBackend:
         """Factory method to create the appropriate tagging backend"""
         if backend_type == "azure_openai":
             return AzureOpenAITagger()
-        elif backend_type == "local_llm":
+        elif backend_type in ("local_llm", "local"):
             return LocalLLMTagger()
         else:
             raise ValueError(f"Unknown backend type: {backend_type}")
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        if not self.cache_enabled:
+            return None
+        tags = self.cache.get(key)
+        return copy.deepcopy(tags) if tags is not None else None
+
+    def _remember(self, key: str, tags: Dict):
+        if self.cache_enabled:
+            self.cache.set(key, copy.deepcopy(tags))
+
+    def _fresh(self, key: str, tags: Dict) -> Dict:
+        """
+        Clean and cache tags the backend just produced. The returned dict keeps the
+        call's "tokens_used" for the caller to charge; the cached copy (served for free) doesn't.
+        """
+        tokens_used = tags.pop("tokens_used", 0)
+        cleaned_tags = self._validate_tags(tags)
+        self._remember(key, cleaned_tags)
+        return {**cleaned_tags, "tokens_used": tokens_used} if tokens_used else cleaned_tags
     
-    def tag_question(self, question_content: str, question_options: Dict = None) -> Dict:
-        """Tag a medical question with structured categories"""
+    def tag_question(self, question_content: str, question_options: Dict = None, fallback: bool = True) -> Optional[Dict]:
+        """Tag a medical question with structured categories; without `fallback`, None when the backend fails"""
+        key = tag_cache_key(question_content, question_options)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
         try:
             tags = self.backend.tag_question(question_content, question_options or {})
+            return self._fresh(key, tags)
             
-            # Validate and clean the tags
-            cleaned_tags = self._validate_tags(tags)
-            return cleaned_tags
+        except Exception as e:
+            logger.error(f"Error in question tagging: {str(e)}")
+            if not fallback:
+                return None
+            record_fallback("tagging", "backend_error")
+            return self._get_emergency_fallback()
+
+    async def tag_question_async(self, question_content: str, question_options: Dict = None) -> Dict:
+        """Async variant of tag_question"""
+        key = tag_cache_key(question_content, question_options)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        try:
+            tags = await self.backend.tag_question_async(question_content, question_options or {})
+            return self._fresh(key, tags)
             
         except Exception as e:
             logger.error(f"Error in question tagging: {str(e)}")
+            record_fallback("tagging", "backend_error")
             return self._get_emergency_fallback()
+
+    def tag_questions(self, questions: List[Tuple[str, Optional[Dict]]], fallback: bool = True) -> List[Optional[Dict]]:
+        """
+        Tag several (content, options) pairs, in order.
+
+        Cache hits are served locally and the misses go to the backend together, so
+        backends that support it tag them with a single request. Without `fallback`,
+        questions the backend could not tag come back as None instead of placeholder tags.
+        """
+        keys = [tag_cache_key(content, options) for content, options in questions]
+        results: List[Optional[Dict]] = [self._cached(key) for key in keys]
+        misses = [index for index, tags in enumerate(results) if tags is None]
+        if not misses:
+            return results
+
+        try:
+            tagged = self.backend.tag_questions([(questions[i][0], questions[i][1] or {}) for i in misses])
+        except Exception as e:
+            logger.error(f"Error in batch question tagging: {str(e)}")
+            tagged = [None] * len(misses)
+        if len(tagged) != len(misses):
+            logger.error(f"Backend returned {len(tagged)} tag sets for {len(misses)} questions")
+            tagged = [None] * len(misses)
+
+        for index, tags in zip(misses, tagged):
+            if tags is None:
+                results[index] = self.tag_question(*questions[index], fallback=fallback)
+            else:
+                results[index] = self._fresh(keys[index], tags)
+        return results
     
+    async def tag_questions_async(self, questions: List[Tuple[str, Optional[Dict]]]) -> List[Dict]:
+        """Async variant of tag_questions; questions the backend could not tag get fallback tags"""
+        keys = [tag_cache_key(content, options) for content, options in questions]
+        results: List[Optional[Dict]] = [self._cached(key) for key in keys]
+        misses = [index for index, tags in enumerate(results) if tags is None]
+        if not misses:
+            return results
+
+        try:
+            tagged = await self.backend.tag_questions_async([(questions[i][0], questions[i][1] or {}) for i in misses])
+        except Exception as e:
+            logger.error(f"Error in batch question tagging: {str(e)}")
+            tagged = [None] * len(misses)
+        if len(tagged) != len(misses):
+            logger.error(f"Backend returned {len(tagged)} tag sets for {len(misses)} questions")
+            tagged = [None] * len(misses)
+
+        for index, tags in zip(misses, tagged):
+            if tags is None:
+                results[index] = await self.tag_question_async(*questions[index])
+            else:
+                results[index] = self._fresh(keys[index], tags)
+        return results
+
     def _validate_tags(self, tags: Dict) -> Dict:
         """Validate and clean the returned tags"""
         # Ensure all expected keys exist
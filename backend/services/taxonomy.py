@@ -0,0 +1,107 @@
+"""
+Question tagging taxonomy and the synonym lexicon used by the offline tagger.
+
+TAXONOMY is the single source of the allowed tag values: AzureOpenAITagger renders it
+into its prompt and LocalLLMTagger compiles LEXICON into a multi-pattern matcher.
+"""
+from typing import Dict, List, Tuple
+
+# Categories that hold up to three values; the rest hold a single value or None
+LIST_CATEGORIES = ["disciplines", "body_systems", "specialties", "pathophysiology"]
+SINGLE_CATEGORIES = ["question_type", "age_group", "acuity"]
+
+TAXONOMY: Dict[str, List[str]] = {
+    "disciplines": ["anatomy", "physiology", "biochemistry", "pharmacology", "pathology", "microbiology", "immunology", "histology", "embryology", "genetics", "biostatistics", "ethics", "behavioral_sciences"],
+    "body_systems": ["cardiovascular", "respiratory", "gastrointestinal", "genitourinary", "neurological", "musculoskeletal", "endocrine", "integumentary", "hematologic", "reproductive", "immune", "sensory"],
+    "specialties": ["internal_medicine", "surgery", "pediatrics", "ob_gyn", "psychiatry", "emergency", "family_medicine", "radiology", "pathology", "anesthesiology", "dermatology", "ophthalmology", "orthopedics", "neurology", "cardiology"],
+    "question_type": ["diagnosis", "treatment", "mechanism", "prevention", "prognosis", "anatomy", "normal_vs_abnormal"],
+    "age_group": ["neonate", "infant", "child", "adolescent", "adult", "elderly"],
+    "acuity": ["life_threatening", "urgent", "semi_urgent", "routine", "preventive"],
+    "pathophysiology": ["infectious", "neoplastic", "autoimmune", "genetic", "metabolic", "degenerative", "traumatic", "toxic", "congenital", "iatrogenic"],
+}
+
+# (category, value) -> phrases that count as evidence for that tag. Matching is on
+# lowercase words, so phrases are plain words separated by spaces.
+LEXICON: Dict[Tuple[str, str], List[str]] = {
+    # Disciplines
+    ("disciplines", "anatomy"): ["anatomy", "anatomical", "artery", "nerve", "ligament", "tendon", "innervation", "innervated", "landmark", "foramen", "muscle injured", "blood supply"],
+    ("disciplines", "physiology"): ["physiology", "physiologic", "cardiac output", "stroke volume", "preload", "afterload", "compliance", "glomerular filtration", "clearance", "oxygen saturation", "ventilation perfusion", "homeostasis", "feedback"],
+    ("disciplines", "biochemistry"): ["enzyme", "enzyme deficiency", "metabolism", "vitamin", "glycogen", "lysosomal", "cofactor", "amino acid", "lipid", "urea cycle", "biochemical"],
+    ("disciplines", "pharmacology"): ["drug", "medication", "mechanism of action", "adverse effect", "side effect", "dose", "dosing", "inhibitor", "agonist", "antagonist", "toxicity", "pharmacokinetics", "half life", "prescribed", "antibiotic", "started on"],
+    ("disciplines", "pathology"): ["biopsy", "histopathology", "lesion", "necrosis", "granuloma", "tumor", "malignancy", "infarct", "inflammation", "autopsy"],
+    ("disciplines", "microbiology"): ["bacteria", "bacterial", "virus", "viral", "fungal", "fungus", "gram positive", "gram negative", "culture", "organism", "pathogen", "parasite", "spirochete"],
+    ("disciplines", "immunology"): ["antibody", "antibodies", "immunoglobulin", "hypersensitivity", "complement", "t cell", "b cell", "vaccine", "immunodeficiency", "anaphylaxis", "autoantibody", "transplant rejection"],
+    ("disciplines", "histology"): ["histology", "histologic", "epithelium", "microscopy", "cell type", "stained", "staining"],
+    ("disciplines", "embryology"): ["embryology", "embryologic", "embryonic", "neural tube", "pharyngeal arch", "fetal development", "week of gestation"],
+    ("disciplines", "genetics"): ["genetic", "gene", "mutation", "autosomal", "x linked", "chromosome", "trisomy", "inheritance", "karyotype", "family history"],
+    ("disciplines", "biostatistics"): ["sensitivity", "specificity", "positive predictive value", "negative predictive value", "relative risk", "odds ratio", "confidence interval", "p value", "study design", "cohort study", "randomized", "number needed to treat"],
+    ("disciplines", "ethics"): ["informed consent", "consent", "confidentiality", "autonomy", "capacity", "advance directive", "ethical", "surrogate", "power of attorney"],
+    ("disciplines", "behavioral_sciences"): ["counseling", "motivational interviewing", "behavior", "substance use", "alcohol use", "smoking cessation", "grief", "defense mechanism", "adherence"],
+
+    # Body systems
+    ("body_systems", "cardiovascular"): ["heart", "cardiac", "chest pain", "myocardial", "murmur", "coronary", "hypertension", "arrhythmia", "atrial fibrillation", "heart failure", "ecg", "ekg", "troponin", "st elevation", "aortic", "palpitations", "valve"],
+    ("body_systems", "respiratory"): ["lung", "pulmonary", "dyspnea", "shortness of breath", "cough", "wheezing", "asthma", "copd", "pneumonia", "pleural", "chest x ray", "respiratory", "hypoxia", "bronchi", "breath sounds", "hemoptysis", "pneumothorax", "tracheal deviation"],
+    ("body_systems", "gastrointestinal"): ["abdominal pain", "abdomen", "liver", "hepatic", "bowel", "colon", "stomach", "gastric", "diarrhea", "vomiting", "jaundice", "pancreas", "pancreatitis", "gallbladder", "esophagus", "rectal bleeding", "hepatitis", "cirrhosis", "appendicitis"],
+    ("body_systems", "genitourinary"): ["kidney", "renal", "urine", "urinary", "bladder", "dysuria", "creatinine", "hematuria", "proteinuria", "prostate", "nephrotic", "nephritic"],
+    ("body_systems", "neurological"): ["headache", "seizure", "stroke", "weakness", "numbness", "neurologic", "brain", "spinal cord", "confusion", "altered mental status", "ataxia", "aphasia", "tremor", "meningitis", "dementia", "neuropathy", "memory loss"],
+    ("body_systems", "musculoskeletal"): ["bone", "fracture", "joint", "arthritis", "back pain", "knee", "hip", "shoulder", "muscle", "osteoporosis", "gout", "swollen joint"],
+    ("body_systems", "endocrine"): ["thyroid", "diabetes", "insulin", "glucose", "adrenal", "cortisol", "pituitary", "hyperthyroidism", "hypothyroidism", "hba1c", "tsh", "parathyroid", "diabetic ketoacidosis"],
+    ("body_systems", "integumentary"): ["skin", "rash", "lesion on", "pruritus", "itchy", "eczema", "psoriasis", "mole", "melanoma", "ulcer on", "blister", "dermatitis"],
+    ("body_systems", "hematologic"): ["anemia", "hemoglobin", "platelet", "bleeding", "coagulation", "leukemia", "lymphoma", "iron deficiency", "sickle cell", "thrombocytopenia", "inr", "transfusion", "blood smear"],
+    ("body_systems", "reproductive"): ["pregnant", "pregnancy", "menstrual", "ovarian", "uterus", "uterine", "vaginal bleeding", "infertility", "testicular", "amenorrhea", "menopause", "gestation"],
+    ("body_systems", "immune"): ["immunodeficiency", "hiv", "immunocompromised", "lupus", "anaphylaxis", "allergic reaction", "autoimmune"],
+    ("body_systems", "sensory"): ["vision", "visual", "eye", "hearing", "ear", "blurred vision", "tinnitus", "vertigo", "retina", "glaucoma"],
+
+    # Specialties
+    ("specialties", "internal_medicine"): ["hypertension", "diabetes", "chronic kidney disease", "anemia", "pneumonia", "hepatitis", "outpatient", "primary care"],
+    ("specialties", "surgery"): ["surgery", "surgical", "laparotomy", "laparoscopic", "appendectomy", "postoperative", "operating room", "incision", "resection", "appendicitis", "bowel obstruction"],
+    ("specialties", "pediatrics"): ["child", "infant", "newborn", "neonate", "toddler", "pediatric", "boy", "girl", "vaccination schedule", "developmental milestone"],
+    ("specialties", "ob_gyn"): ["pregnant", "pregnancy", "weeks gestation", "prenatal", "labor", "delivery", "postpartum", "menstrual", "contraception", "pap smear", "ectopic"],
+    ("specialties", "psychiatry"): ["depression", "depressed", "anxiety", "psychosis", "hallucination", "delusion", "suicidal", "bipolar", "schizophrenia", "mood", "antidepressant", "panic"],
+    ("specialties", "emergency"): ["emergency department", "trauma", "unresponsive", "motor vehicle", "overdose", "resuscitation", "brought in by", "paramedics"],
+    ("specialties", "family_medicine"): ["annual", "well visit", "routine checkup", "screening", "health maintenance", "primary care", "follow up visit"],
+    ("specialties", "radiology"): ["radiologist", "imaging study", "interventional radiology", "contrast study", "radiation exposure"],
+    ("specialties", "pathology"): ["biopsy", "histopathology", "autopsy", "blood smear", "frozen section"],
+    ("specialties", "anesthesiology"): ["anesthesia", "anesthetic", "intubation", "sedation", "malignant hyperthermia", "neuromuscular blocker", "airway management"],
+    ("specialties", "dermatology"): ["rash", "skin", "eczema", "psoriasis", "melanoma", "mole", "dermatitis", "pruritus", "acne"],
+    ("specialties", "ophthalmology"): ["eye", "vision", "visual acuity", "retina", "glaucoma", "cataract", "conjunctivitis", "blurred vision"],
+    ("specialties", "orthopedics"): ["fracture", "dislocation", "ligament tear", "joint", "bone", "osteomyelitis", "cast", "orthopedic"],
+    ("specialties", "neurology"): ["seizure", "stroke", "headache", "migraine", "neuropathy", "multiple sclerosis", "parkinson", "dementia", "weakness", "aphasia", "memory loss"],
+    ("specialties", "cardiology"): ["chest pain", "myocardial infarction", "heart failure", "atrial fibrillation", "murmur", "ecg", "ekg", "troponin", "coronary", "palpitations", "st elevation"],
+
+    # Question types
+    ("question_type", "diagnosis"): ["most likely diagnosis", "most likely cause", "diagnosis", "most likely explanation", "which of the following conditions", "most likely has", "most likely to show", "most likely finding"],
+    ("question_type", "treatment"): ["most appropriate next step", "next step in management", "most appropriate treatment", "management", "treated with", "best initial treatment", "pharmacotherapy", "most appropriate therapy"],
+    ("question_type", "mechanism"): ["mechanism of action", "mechanism", "pathogenesis", "underlying cause", "responsible for", "acts by", "inhibits"],
+    ("question_type", "prevention"): ["prevent", "prevention", "prophylaxis", "screening", "vaccine", "vaccination", "reduce the risk", "risk reduction"],
+    ("question_type", "prognosis"): ["prognosis", "most likely complication", "long term outcome", "survival", "at greatest risk", "likely to develop"],
+    ("question_type", "anatomy"): ["which structure", "which nerve", "which artery", "structure most likely", "most likely injured", "innervated by"],
+    ("question_type", "normal_vs_abnormal"): ["normal finding", "normal variant", "expected finding", "physiologic change", "normal for age"],
+
+    # Age groups
+    ("age_group", "neonate"): ["newborn", "neonate", "neonatal", "day old", "days old", "hours after birth", "born at"],
+    ("age_group", "infant"): ["infant", "month old", "months old", "baby"],
+    ("age_group", "child"): ["child", "toddler", "boy", "girl", "school age", "kindergarten"],
+    ("age_group", "adolescent"): ["adolescent", "teenager", "teenage", "high school", "puberty"],
+    ("age_group", "adult"): ["man", "woman", "adult"],
+    ("age_group", "elderly"): ["elderly", "older adult", "nursing home", "retired", "geriatric"],
+
+    # Acuity
+    ("acuity", "life_threatening"): ["unresponsive", "cardiac arrest", "shock", "hypotensive", "septic shock", "respiratory failure", "pulseless", "massive", "st elevation", "tension pneumothorax", "anaphylaxis", "status epilepticus"],
+    ("acuity", "urgent"): ["emergency department", "acute", "sudden onset", "severe", "brought in", "fever and", "worsening"],
+    ("acuity", "semi_urgent"): ["several days", "for a week", "progressive", "subacute"],
+    ("acuity", "routine"): ["routine", "follow up", "clinic", "office", "chronic", "for months", "for years", "outpatient"],
+    ("acuity", "preventive"): ["screening", "annual", "well visit", "health maintenance", "vaccination", "vaccine", "prophylaxis", "counseling"],
+
+    # Pathophysiology
+    ("pathophysiology", "infectious"): ["infection", "infectious", "bacterial", "viral", "fungal", "sepsis", "fever", "pneumonia", "abscess", "cellulitis", "meningitis", "tuberculosis", "hiv", "culture"],
+    ("pathophysiology", "neoplastic"): ["cancer", "carcinoma", "tumor", "malignancy", "malignant", "neoplasm", "lymphoma", "leukemia", "metastasis", "metastatic", "mass", "melanoma"],
+    ("pathophysiology", "autoimmune"): ["autoimmune", "lupus", "rheumatoid", "autoantibody", "antinuclear antibody", "celiac", "graves", "hashimoto", "multiple sclerosis", "type 1 diabetes"],
+    ("pathophysiology", "genetic"): ["genetic", "mutation", "autosomal", "x linked", "trisomy", "inherited", "family history", "chromosomal"],
+    ("pathophysiology", "metabolic"): ["metabolic", "diabetes", "diabetic ketoacidosis", "hyperglycemia", "hypoglycemia", "electrolyte", "hyponatremia", "hyperkalemia", "acidosis", "obesity", "enzyme deficiency", "gout", "uric acid", "urate"],
+    ("pathophysiology", "degenerative"): ["degenerative", "osteoarthritis", "dementia", "alzheimer", "parkinson", "age related", "wear and tear", "progressive memory loss", "osteophyte", "joint space narrowing"],
+    ("pathophysiology", "traumatic"): ["trauma", "injury", "fall", "motor vehicle", "collision", "fracture", "laceration", "blunt", "stab wound", "gunshot"],
+    ("pathophysiology", "toxic"): ["overdose", "ingestion", "poisoning", "toxicity", "toxin", "carbon monoxide", "intoxication", "withdrawal"],
+    ("pathophysiology", "congenital"): ["congenital", "birth defect", "present at birth", "since birth", "neural tube defect", "ventricular septal defect"],
+    ("pathophysiology", "iatrogenic"): ["iatrogenic", "adverse effect", "side effect", "after starting", "postoperative", "complication of", "drug induced", "medication induced"],
+}
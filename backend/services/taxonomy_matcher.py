@@ -0,0 +1,82 @@
+import re
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def normalize_token(token: str) -> str:
+    """Fold simple plurals so "arteries"/"artery" and "nerves"/"nerve" match the same pattern"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with plurals folded"""
+    return [normalize_token(token) for token in _WORD.findall(text.lower())]
+
+class TaxonomyMatcher:
+    """
+    Word-level Aho-Corasick automaton over a phrase lexicon.
+
+    Every phrase for every label is compiled into one trie with failure links, so a
+    text is matched against the whole lexicon in a single pass over its tokens,
+    independent of how many phrases the lexicon holds.
+    """
+
+    def __init__(self, lexicon: Dict[Hashable, Iterable[str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Each output is (label, phrase length in tokens)
+        self._out: List[List[Tuple[Hashable, int]]] = [[]]
+
+        for label, phrases in lexicon.items():
+            for phrase in phrases:
+                self._add(tokenize(phrase), label)
+        self._build_failure_links()
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def _add(self, tokens: List[str], label: Hashable):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        if (label, len(tokens)) not in self._out[state]:
+            self._out[state].append((label, len(tokens)))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                # Outputs of the longest proper suffix are inherited so one lookup reports all matches
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def scan(self, tokens: List[str]) -> Iterator[Tuple[Hashable, int, int]]:
+        """Yield (label, start, end) for every phrase occurrence; `end` is exclusive"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for label, length in out[state]:
+                yield label, position + 1 - length, position + 1
@@ -0,0 +1,246 @@
+import os
+import json
+import math
+import hashlib
+import logging
+import datetime
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.database import SessionLocal, dialect_insert
+from backend.models import DailyUsageRollup, Question, Response
+
+logger = logging.getLogger(__name__)
+
+# 4096 one-byte registers per day (~1.6% standard error); fixed so every row merges
+SKETCH_PRECISION = 12
+
+def _register_max(a: bytes, b: bytes) -> bytes:
+    """
+    Bytewise max of two register arrays as whole-integer arithmetic (SWAR) rather than
+    a Python loop per register. Ranks stay below 0x80, so setting each byte's high bit
+    and subtracting leaves that bit set exactly where a >= b, with no borrow between bytes.
+    """
+    high = int.from_bytes(b"\x80" * len(a), "big")
+    x, y = int.from_bytes(a, "big"), int.from_bytes(b, "big")
+    a_wins = ((((x | high) - y) & high) >> 7) * 0xFF
+    return ((x & a_wins) | (y & ~a_wins)).to_bytes(len(a), "big")
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch over a fixed number of registers"""
+
+    def __init__(self, precision: int = SKETCH_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"Expected {self.m} registers, got {len(self.registers)}")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(int(math.log2(len(data))), data)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.m != self.m:
+            raise ValueError("Cannot merge sketches of different precision")
+        self.registers = bytearray(_register_max(bytes(self.registers), other.registers))
+
+    @classmethod
+    def union(cls, sketches: Iterable[bytes], precision: int = SKETCH_PRECISION) -> "HyperLogLog":
+        """Merge serialized sketches in one pass"""
+        merged = bytes(1 << precision)
+        for data in sketches:
+            if len(data) != len(merged):
+                raise ValueError("Cannot merge sketches of different precision")
+            merged = _register_max(merged, data)
+        return cls(precision, merged)
+
+    def count(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        # Ranks take at most 64 - precision values, so sum per distinct rank
+        estimate = alpha * self.m * self.m / sum(self.registers.count(r) * 2.0 ** -r for r in set(self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Linear counting is far more accurate for small cardinalities
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+class UsageRollup:
+    """
+    Maintains daily_usage_rollup from responses and answers system usage stats from it.
+
+    A background job recomputes today's and yesterday's rows every few minutes (late
+    answers around midnight land in yesterday) and backfills missing days once, so older
+    rows are never touched again. A window of N days reads and sums at most N rows; a
+    read that finds days missing answers from what is there and asks the job to fill them.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.enabled = os.getenv("USAGE_ROLLUP_ENABLED", "true").lower() == "true"
+        self.interval = float(os.getenv("USAGE_ROLLUP_INTERVAL_SECONDS", "300"))
+        self.backfill_days = int(os.getenv("USAGE_ROLLUP_BACKFILL_DAYS", "90"))
+        self.max_days = int(os.getenv("USAGE_ROLLUP_MAX_DAYS", "365"))
+
+        self._session_factory = session_factory
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._requested_days = 0
+
+    # --- Maintenance ---
+
+    def compute_day(self, db: Session, day: datetime.date):
+        """Recompute and upsert one day's row; the caller commits"""
+        start = datetime.datetime.combine(day, datetime.time.min)
+        rows = db.execute(
+            select(Response.user_id, Question.discipline, func.count())
+            .select_from(Response)
+            .outerjoin(Question, Response.question_id == Question.id)
+            .where(Response.created_at >= start, Response.created_at < start + datetime.timedelta(days=1))
+            .group_by(Response.user_id, Question.discipline)
+        ).all()
+
+        users, disciplines, sketch = set(), Counter(), HyperLogLog()
+        for user_id, discipline, count in rows:
+            users.add(user_id)
+            disciplines[discipline or "General Medicine"] += count
+        for user_id in users:
+            sketch.add(user_id)
+
+        values = {
+            "active_users": len(users),
+            "answers": sum(disciplines.values()),
+            "discipline_counts": json.dumps(disciplines, sort_keys=True),
+            "user_sketch": sketch.to_bytes(),
+            "refreshed_at": datetime.datetime.utcnow()
+        }
+        stmt = dialect_insert(db, DailyUsageRollup.__table__).values(day=day, **values)
+        db.execute(stmt.on_conflict_do_update(index_elements=["day"], set_=values))
+
+    def refresh(self, db: Session, today: Optional[datetime.date] = None, backfill_days: Optional[int] = None) -> int:
+        """Recompute today and yesterday plus any missing day in the backfill range; returns days computed"""
+        today = today or datetime.datetime.utcnow().date()
+        backfill_days = self.backfill_days if backfill_days is None else backfill_days
+        first = today - datetime.timedelta(days=max(backfill_days, 2) - 1)
+        present = set(db.scalars(
+            select(DailyUsageRollup.day).where(DailyUsageRollup.day >= first, DailyUsageRollup.day <= today)
+        ))
+        due = {today, today - datetime.timedelta(days=1)}
+        due.update(day for day in self._days(first, today) if day not in present)
+
+        for day in sorted(due):
+            self.compute_day(db, day)
+        db.commit()
+        return len(due)
+
+    @staticmethod
+    def _days(first: datetime.date, last: datetime.date) -> Iterable[datetime.date]:
+        for offset in range((last - first).days + 1):
+            yield first + datetime.timedelta(days=offset)
+
+    def start(self):
+        """Start the background refresh thread"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-rollup", daemon=True)
+        self._thread.start()
+        logger.info(f"Usage rollup job started (interval={self.interval}s, backfill={self.backfill_days} days)")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def request_backfill(self, days: int):
+        """Ask the background job to cover the last `days` days on its next run, which starts now"""
+        with self._lock:
+            self._requested_days = max(self._requested_days, days)
+        self._wakeup.set()
+
+    def run_once(self, today: Optional[datetime.date] = None) -> int:
+        """One job run: refresh recent days and backfill the largest window asked for; returns days computed"""
+        with self._lock:
+            requested, self._requested_days = self._requested_days, 0
+        db = self._session_factory()
+        try:
+            return self.refresh(db, today, backfill_days=max(self.backfill_days, requested))
+        except Exception:
+            db.rollback()
+            # Retried on the next scheduled run
+            with self._lock:
+                self._requested_days = max(self._requested_days, requested)
+            raise
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.clear()
+            try:
+                computed = self.run_once()
+                logger.debug(f"Usage rollup refreshed {computed} days")
+            except Exception as e:
+                logger.error(f"Usage rollup refresh failed: {str(e)}")
+            self._wakeup.wait(self.interval)
+
+    # --- Reads ---
+
+    def system_stats(self, db: Session, days: int = 30, today: Optional[datetime.date] = None) -> Dict:
+        """
+        Usage over the last `days` UTC days, including today, summed from the rollup.
+        Days the job has not computed yet are left out and reported in `missing_days`.
+        """
+        today = today or datetime.datetime.utcnow().date()
+        days = max(1, min(days, self.max_days))
+        first = today - datetime.timedelta(days=days - 1)
+
+        rows = db.scalars(
+            select(DailyUsageRollup).where(DailyUsageRollup.day >= first, DailyUsageRollup.day <= today)
+        ).all()
+        if len(rows) < days:
+            # Not covered yet (job just started, or the window is past its backfill range)
+            self.request_backfill(days)
+
+        answers, disciplines = 0, Counter()
+        for row in rows:
+            answers += row.answers
+            disciplines.update(json.loads(row.discipline_counts))
+        sketch = HyperLogLog.union(row.user_sketch for row in rows)
+
+        # Daily counts are exact, so they bound the sketch estimate from both sides
+        daily = [row.active_users for row in rows]
+        active_users = min(max(sketch.count(), max(daily, default=0)), sum(daily))
+        return {
+            "period_days": days,
+            "active_users": active_users,
+            "total_questions_answered": answers,
+            "avg_questions_per_user": round(answers / active_users, 1) if active_users > 0 else 0,
+            "popular_specialties": [
+                {"specialty": specialty, "usage_count": count}
+                for specialty, count in disciplines.most_common(10)
+            ],
+            "refreshed_at": max((row.refreshed_at for row in rows), default=None),
+            "missing_days": days - len(rows)
+        }
+
+usage_rollup = UsageRollup()
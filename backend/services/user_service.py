@@ -1,5 +1,20 @@
+import os
+import re
+import csv
+import json
+import codecs
+import logging
+import datetime
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from backend.models import User, Identity
+
+from backend.database import dialect_insert
+from backend.models import User, Identity, SSOConfiguration
+
+logger = logging.getLogger(__name__)
 
 def get_or_create_user_from_identity(
     db: Session,
@@ -19,7 +34,8 @@ def get_or_create_user_from_identity(
     if identity:
         return identity.user
 
-    user = db.query(User).filter(User.email == email).first()
+    # Signup stores emails as typed, so link accounts regardless of case
+    user = db.query(User).filter(func.lower(User.email) == email.lower()).order_by(User.id).first()
 
     if not user:
         user = User(email=email, name=name)
@@ -35,4 +51,223 @@ def get_or_create_user_from_identity(
     db.commit()
     db.refresh(user)
 
-    return user
\ No newline at end of file
+    return user
+
+# Splits after every line break, keeping it, so the last piece is the unfinished line
+_LINE_END = re.compile(r"(?<=\n)")
+
+SSO_PROVIDER = "sso"
+
+def sso_provider_user_id(domain: str, subject: str) -> str:
+    """
+    Identity.provider_user_id is unique across providers, so SSO subjects are namespaced
+    by institution domain and never collide with password identities keyed by email.
+    """
+    return f"{domain}:{subject}"
+
+class RosterProvisioner:
+    """
+    Provision a partner institution's roster in batches.
+
+    Rows are fed as raw CSV (header with email, name and optional external_id) or NDJSON
+    bytes in arbitrary chunks, so the roster is never held in memory. Each batch costs
+    two lookups (identities by subject, users by email), two multi-row inserts and one
+    commit, however many users it holds.
+    """
+
+    def __init__(self, db: Session, sso_config: SSOConfiguration, fmt: str = "csv",
+                 batch_size: Optional[int] = None):
+        self.db = db
+        self.domain = sso_config.domain.lower()
+        self.fmt = fmt
+        self.batch_size = batch_size or int(os.getenv("SSO_PROVISION_BATCH_SIZE", "1000"))
+        self.counts = {"created": 0, "linked": 0, "skipped": 0, "invalid": 0}
+        self.errors: List[str] = []
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._header: Optional[List[str]] = None
+        self._line_number = 0
+        self._pending: List[Dict] = []
+        # CSV records are fed to one csv.reader as their physical lines complete
+        self._record: List[str] = []
+        self._quotes = 0
+        self._lines: Deque[str] = deque()
+        self._reader = csv.reader(self._queued_lines())
+
+    # --- Parsing ---
+
+    def feed(self, chunk: bytes) -> List[List[Dict]]:
+        """Parse a chunk of the roster; returns the batches that are now full"""
+        self._buffer += self._decoder.decode(chunk)
+        *lines, self._buffer = _LINE_END.split(self._buffer)
+        return self._add_lines(lines)
+
+    def finish(self) -> List[List[Dict]]:
+        """Parse whatever is left after the last chunk; returns the remaining batches"""
+        self._buffer += self._decoder.decode(b"", final=True)
+        batches = self._add_lines([self._buffer] if self._buffer else [])
+        self._buffer = ""
+        if self._record:
+            # A quoted field was still open when the roster ended
+            self._line_number += len(self._record)
+            self._invalid(f"line {self._line_number}: unterminated quoted field")
+            self._record, self._quotes = [], 0
+        if self._pending:
+            batches.append(self._pending)
+            self._pending = []
+        return batches
+
+    def _add_lines(self, lines: List[str]) -> List[List[Dict]]:
+        batches = []
+        for line in lines:
+            row = self._parse_ndjson(line) if self.fmt == "ndjson" else self._parse_csv(line)
+            if row is None:
+                continue
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                batches.append(self._pending)
+                self._pending = []
+        return batches
+
+    def _queued_lines(self) -> Iterator[str]:
+        # Only pulled once a whole record is queued, so the reader never runs dry mid-record
+        while True:
+            yield self._lines.popleft()
+
+    def _parse_csv(self, line: str) -> Optional[Dict]:
+        """
+        Collect physical lines until the record's quotes balance, then hand the record to
+        the csv reader, so quoted fields may hold commas, quotes and line breaks.
+        """
+        self._record.append(line)
+        self._quotes += line.count('"')
+        if self._quotes % 2:
+            return None
+        self._lines.extend(self._record)
+        self._line_number += len(self._record)
+        self._record, self._quotes = [], 0
+        try:
+            values = next(self._reader)
+        except csv.Error as e:
+            self._invalid(f"line {self._line_number}: {str(e)}")
+            return None
+        if not values:
+            return None
+        if self._header is None:
+            self._header = [value.strip().lower() for value in values]
+            if "email" not in self._header:
+                self._invalid(f"line {self._line_number}: CSV header must contain an email column")
+            return None
+        return self._parse_record(dict(zip(self._header, values)))
+
+    def _parse_ndjson(self, line: str) -> Optional[Dict]:
+        self._line_number += 1
+        if not line.strip():
+            return None
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._invalid(f"line {self._line_number}: {str(e)}")
+            return None
+        return self._parse_record(record)
+
+    def _parse_record(self, record: Dict) -> Optional[Dict]:
+        email = str(record.get("email") or "").strip().lower()
+        if "@" not in email or email.rsplit("@", 1)[1] != self.domain:
+            self._invalid(f"line {self._line_number}: email not in domain {self.domain}")
+            return None
+        subject = str(record.get("external_id") or email).strip()
+        name = str(record.get("name") or "").strip() or None
+        return {"email": email, "name": name, "provider_user_id": sso_provider_user_id(self.domain, subject)}
+
+    def _invalid(self, message: str):
+        self.counts["invalid"] += 1
+        if len(self.errors) < 20:
+            self.errors.append(message)
+
+    # --- Writing ---
+
+    def _user_ids(self, emails) -> Dict[str, int]:
+        """Existing user ids by lowercased email; the oldest account wins if several differ only in case"""
+        rows = self.db.execute(
+            select(func.lower(User.email), User.id)
+            .where(func.lower(User.email).in_(list(emails)))
+            .order_by(User.id.desc())
+        ).all()
+        return dict(rows)
+
+    def provision(self, rows: List[Dict]):
+        """Create or link every row of one batch in a single transaction"""
+        by_subject: Dict[str, Dict] = {}
+        for row in rows:
+            if row["provider_user_id"] in by_subject:
+                self.counts["skipped"] += 1  # Repeated within the batch
+            else:
+                by_subject[row["provider_user_id"]] = row
+
+        try:
+            existing = set(self.db.scalars(
+                select(Identity.provider_user_id).where(Identity.provider_user_id.in_(list(by_subject)))
+            ))
+            self.counts["skipped"] += len(existing)
+            pending = [row for subject, row in by_subject.items() if subject not in existing]
+
+            emails = {row["email"] for row in pending}
+            user_ids = self._user_ids(emails)
+
+            new_users = {row["email"]: row["name"] for row in pending if row["email"] not in user_ids}
+            created = 0
+            if new_users:
+                stmt = (
+                    dialect_insert(self.db, User.__table__)
+                    .values([{"email": email, "name": name, "created_at": datetime.datetime.utcnow()}
+                             for email, name in new_users.items()])
+                    .on_conflict_do_nothing(index_elements=["email"])
+                    .returning(User.__table__.c.email, User.__table__.c.id)
+                )
+                inserted_users = dict(self.db.execute(stmt).all())
+                created = len(inserted_users)
+                user_ids.update(inserted_users)
+                missing = set(new_users) - set(inserted_users)
+                if missing:
+                    # Signed up concurrently; link instead of create
+                    user_ids.update(self._user_ids(missing))
+
+            identities = [
+                {"user_id": user_ids[row["email"]], "provider": SSO_PROVIDER, "provider_user_id": row["provider_user_id"]}
+                for row in pending
+            ]
+            inserted = 0
+            if identities:
+                inserted = len(self.db.execute(
+                    dialect_insert(self.db, Identity.__table__)
+                    .values(identities)
+                    .on_conflict_do_nothing(index_elements=["provider_user_id"])
+                    .returning(Identity.__table__.c.provider_user_id)
+                ).all())
+            # Every new identity belongs to a new user or links an existing one; identities
+            # provisioned concurrently by another request count as skipped
+            self.counts["created"] += created
+            self.counts["linked"] += max(0, inserted - created)
+            self.counts["skipped"] += len(identities) - inserted
+            self.db.commit()
+        except Exception as e:
+            logger.error(f"Provisioning batch for {self.domain} failed: {str(e)}")
+            self.db.rollback()
+            raise
+
+    def report(self) -> Dict:
+        return {"domain": self.domain, **self.counts, "errors": self.errors}
+
+def provision_users(db: Session, sso_config: SSOConfiguration, roster: Iterable[bytes], fmt: str = "csv",
+                    batch_size: Optional[int] = None) -> Dict:
+    """Provision a roster read from an iterable of byte chunks (e.g. an open file)"""
+    provisioner = RosterProvisioner(db, sso_config, fmt, batch_size)
+    for chunk in roster:
+        for batch in provisioner.feed(chunk):
+            provisioner.provision(batch)
+    for batch in provisioner.finish():
+        provisioner.provision(batch)
+    return provisioner.report()
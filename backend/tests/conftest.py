@@ -5,10 +5,19 @@ from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 
+# Route any LLM call the tests don't mock to the instant offline fake provider
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("FAKE_LLM_LATENCY", "fixed:0")
+os.environ.setdefault("FAKE_LLM_STREAM_CHUNK_MS", "0")
+
 from backend.main import app
 from backend.database import get_db
 from backend.models import Base
 from backend.auth.jwt import create_access_token
+from backend.services.resilience import reset_breakers
+from backend.services.analytics_cache import analytics_cache
+from backend.auth.principal import principal_cache
+from backend.services.rate_limit import rate_limiter
 
 # Test database configuration
 TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite:///./test.db")
@@ -22,6 +31,30 @@ def db_setup():
     yield
     Base.metadata.drop_all(bind=test_engine)
 
+@pytest.fixture(autouse=True)
+def closed_circuit_breakers():
+    """Start every test with closed LLM circuit breakers"""
+    reset_breakers()
+    yield
+
+@pytest.fixture(autouse=True)
+def empty_analytics_cache():
+    """Tests reuse user ids with rolled-back data, so cached analytics must not carry over"""
+    analytics_cache.clear()
+    yield
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    """Cached principals would outlive the rolled-back users of earlier tests"""
+    principal_cache.clear()
+    yield
+
+@pytest.fixture(autouse=True)
+def full_rate_limit_buckets():
+    """Every test starts with full token buckets"""
+    rate_limiter.clear()
+    yield
+
 @pytest.fixture
 def db_session(db_setup):
     """Create a fresh database session for each test"""
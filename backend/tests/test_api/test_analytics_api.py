@@ -1,5 +1,6 @@
 import pytest
 from backend.models import Question, Response
+from backend.services.question_tags import record_question_tags, retag_questions
 
 def test_analytics_summary_returns_correct_aggregations(authenticated_client, db_session):
     client, user = authenticated_client
@@ -36,4 +37,127 @@ def test_analytics_summary_returns_correct_aggregations(authenticated_client, db
     assert biochem_stats is not None
     assert biochem_stats["total_answered"] == 1
     assert biochem_stats["correct_count"] == 1
-    assert biochem_stats["accuracy"] == 1.0
\ No newline at end of file
+    assert biochem_stats["accuracy"] == 1.0
+
+
+def test_analytics_summary_groups_by_tag_with_fallback_categories(authenticated_client, db_session):
+    client, user = authenticated_client
+
+    tagged = Question(content="Tagged", discipline="Cardiology", body_systems='["cardiovascular", "respiratory"]',
+                      pathophysiology="[]", question_type="diagnosis")
+    untagged = Question(content="Untagged", discipline="Cardiology")
+    db_session.add_all([tagged, untagged])
+    record_question_tags(db_session, [tagged, untagged])
+    db_session.commit()
+    db_session.add_all([
+        Response(user_id=user.id, question_id=tagged.id, user_answer="A", is_correct=True),
+        Response(user_id=user.id, question_id=tagged.id, user_answer="B", is_correct=False),
+        Response(user_id=user.id, question_id=untagged.id, user_answer="C", is_correct=True),
+    ])
+    db_session.commit()
+
+    def summary(group_by):
+        data = client.get(f"/api/v1/analytics/summary?group_by={group_by}").json()["performance_by_discipline"]
+        return {item["discipline"]: (item["total_answered"], item["correct_count"]) for item in data}
+
+    assert summary("body_systems") == {"cardiovascular": (2, 1), "respiratory": (2, 1), "General": (1, 1)}
+    assert summary("pathophysiology") == {"Unknown": (3, 2)}
+    assert summary("question_type") == {"diagnosis": (2, 1), "Unknown": (1, 1)}
+    assert summary("disciplines") == {"Cardiology": (3, 2)}
+
+def test_question_tags_follow_tag_column_changes(db_session):
+    from backend.models import QuestionTag
+
+    question = Question(content="Retagged", disciplines='["pharmacology"]', specialties='["cardiology"]')
+    db_session.add(question)
+    record_question_tags(db_session, [question])
+    db_session.commit()
+
+    def tags():
+        return sorted((t.dimension, t.value) for t in db_session.query(QuestionTag).filter_by(question_id=question.id))
+
+    assert tags() == [("disciplines", "pharmacology"), ("specialties", "cardiology")]
+
+    # A partial update keeps the dimensions it leaves out
+    retag_questions(db_session, [{"id": question.id, "disciplines": '["pathology", "pathology"]'}])
+    db_session.commit()
+    assert tags() == [("disciplines", "pathology"), ("specialties", "cardiology")]
+
+def test_summary_reflects_answers_submitted_after_first_load(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+
+    monkeypatch.setattr(chat.feedback_service, "generate_feedback", lambda **kwargs: {"feedback": "ok"})
+    client, user = authenticated_client
+    question = Question(content="Rollup question", discipline="Neurology", correct_answer="A")
+    db_session.add(question)
+    db_session.commit()
+
+    assert client.get("/api/v1/analytics/summary").json()["performance_by_discipline"] == []
+
+    client.post("/api/v1/chat/answer", json={"question_id": question.id, "user_answer": "A"})
+    client.post("/api/v1/chat/answer", json={"question_id": question.id, "user_answer": "B"})
+
+    data = client.get("/api/v1/analytics/summary").json()["performance_by_discipline"]
+    assert [(item["discipline"], item["total_answered"], item["correct_count"]) for item in data] == [("Neurology", 2, 1)]
+
+def test_summary_revalidates_with_etag_until_next_answer(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+
+    monkeypatch.setattr(chat.feedback_service, "generate_feedback", lambda **kwargs: {"feedback": "ok"})
+    client, user = authenticated_client
+    question = Question(content="ETag question", discipline="Nephrology", correct_answer="A")
+    db_session.add(question)
+    db_session.commit()
+
+    first = client.get("/api/v1/analytics/summary")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    unchanged = client.get("/api/v1/analytics/summary", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag
+
+    other_grouping = client.get("/api/v1/analytics/summary?group_by=body_systems", headers={"If-None-Match": etag})
+    assert other_grouping.status_code == 200
+
+    client.post("/api/v1/chat/answer", json={"question_id": question.id, "user_answer": "A"})
+    changed = client.get("/api/v1/analytics/summary", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["performance_by_discipline"][0]["discipline"] == "Nephrology"
+
+def test_detailed_cache_entries_expire_with_the_day(authenticated_client, monkeypatch):
+    from backend.api.v1 import analytics
+
+    client, user = authenticated_client
+    calls = []
+    monkeypatch.setattr(analytics.analytics_service, "get_user_performance_stats",
+                        lambda user_id, db, days, start=None, end=None: calls.append(days) or {"days": days})
+
+    class Clock(analytics.datetime):
+        now = analytics.datetime(2024, 3, 1, 12)
+
+        @classmethod
+        def utcnow(cls):
+            return cls.now
+
+    monkeypatch.setattr(analytics, "datetime", Clock)
+    etag = client.get("/api/v1/analytics/detailed?days=7").headers["ETag"]
+    assert client.get("/api/v1/analytics/detailed?days=7", headers={"If-None-Match": etag}).status_code == 304
+
+    Clock.now = analytics.datetime(2024, 3, 2, 0, 5)
+    moved = client.get("/api/v1/analytics/detailed?days=7", headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["ETag"] != etag
+    assert calls == [7, 7]
+
+def test_local_analytics_cache_turns_off_with_several_workers(monkeypatch):
+    from backend.services.analytics_cache import AnalyticsCache, configured_workers
+
+    assert configured_workers(["uvicorn", "backend.main:app", "--workers", "4"]) == 4
+    assert configured_workers(["uvicorn", "backend.main:app", "--workers=2"]) == 2
+    monkeypatch.delenv("ANALYTICS_CACHE_REDIS_URL", raising=False)
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    assert AnalyticsCache().enabled is True
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert AnalyticsCache().enabled is False
@@ -1,7 +1,11 @@
 import pytest
 from faker import Faker
+from sqlalchemy import event
+from backend.api.v1 import auth as auth_api
 from backend.api.v1.auth import oauth
-from backend.models import Identity
+from backend.models import Identity, SSOConfiguration, User
+from backend.auth.password import PasswordHashingBusy
+from backend.auth.principal import principal_cache
 
 fake = Faker()
 
@@ -101,4 +105,120 @@ async def test_sso_login_placeholder(async_client):
 async def test_sso_callback_placeholder(async_client):
     response = await async_client.post("/api/v1/auth/sso/callback")
     assert response.status_code == 200
-    assert "callback received" in response.json()["message"]
\ No newline at end of file
+    assert "callback received" in response.json()["message"]
+
+def _count_queries(db_session):
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_chat_test_endpoint_runs_no_queries_once_the_principal_is_cached(authenticated_client, db_session):
+    client, user = authenticated_client
+    user_id = user.id
+    assert client.get("/api/v1/chat/test").status_code == 200
+    statements = _count_queries(db_session)
+
+    response = client.get("/api/v1/chat/test")
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user_id
+    assert statements == []
+
+def test_id_only_routes_reject_deleted_users(authenticated_client, db_session):
+    client, user = authenticated_client
+    assert client.get("/api/v1/analytics/cache-stats").status_code == 200
+
+    db_session.delete(user)
+    db_session.commit()
+    assert client.get("/api/v1/analytics/cache-stats").status_code == 401
+
+def test_principal_cache_skips_user_lookup_until_user_changes(authenticated_client, db_session):
+    client, user = authenticated_client
+    assert client.get("/api/v1/chat/review/next").status_code == 200
+    cached = principal_cache.principals.get(user.id)
+    assert cached is not None and cached.email == user.email
+
+    statements = _count_queries(db_session)
+    client.get("/api/v1/chat/review/next")
+    assert not any("FROM users" in statement for statement in statements)
+
+    user.name = "Renamed"
+    db_session.commit()
+    assert principal_cache.principals.get(user.id) is None
+
+def test_principal_cache_rejects_deleted_user_after_invalidation(authenticated_client, db_session):
+    client, user = authenticated_client
+    assert client.get("/api/v1/chat/review/next").status_code == 200
+
+    db_session.delete(user)
+    db_session.commit()
+    assert client.get("/api/v1/chat/review/next").status_code == 401
+
+def _password_identity(db_session, email="rehash@example.com"):
+    user = User(email=email, name="Rehash")
+    db_session.add(user)
+    db_session.flush()
+    identity = Identity(user_id=user.id, provider="password", provider_user_id=email, password_hash="$2b$04$old")
+    db_session.add(identity)
+    db_session.commit()
+    return identity
+
+def test_login_rehashes_outdated_password_hash(client, db_session, monkeypatch):
+    identity = _password_identity(db_session)
+    monkeypatch.setattr(auth_api, "verify_and_update_password", lambda plain, hashed: (True, "$2b$12$new"))
+
+    response = client.post("/api/v1/auth/login", data={"username": "rehash@example.com", "password": "secret"})
+    assert response.status_code == 200
+    db_session.refresh(identity)
+    assert identity.password_hash == "$2b$12$new"
+
+def test_login_returns_429_when_hashing_queue_is_full(client, db_session, monkeypatch):
+    _password_identity(db_session, "busy@example.com")
+
+    def busy(plain, hashed):
+        raise PasswordHashingBusy(3)
+
+    monkeypatch.setattr(auth_api, "verify_and_update_password", busy)
+    response = client.post("/api/v1/auth/login", data={"username": "busy@example.com", "password": "secret"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+def _sso_institution(db_session, domain="partner.edu"):
+    db_session.add(SSOConfiguration(institution_name="Partner University", domain=domain, is_active=True))
+    db_session.commit()
+
+def test_bulk_provisioning_creates_links_and_skips(client, db_session, monkeypatch):
+    monkeypatch.setenv("SSO_PROVISIONING_API_KEY", "roster-key")
+    _sso_institution(db_session)
+    existing = User(email="existing@partner.edu", name="Existing")
+    db_session.add(existing)
+    db_session.commit()
+
+    roster = (
+        "email,name,external_id\n"
+        "new1@partner.edu,New One,s-1\n"
+        "Existing@Partner.edu,Existing,s-2\n"
+        "new1@partner.edu,New One,s-1\n"
+        "outsider@other.edu,Outsider,s-3\n"
+        "new2@partner.edu,New Two,\n"
+    )
+    headers = {"X-Provisioning-Key": "roster-key", "Content-Type": "text/csv"}
+    report = client.post("/api/v1/auth/sso/partner.edu/provision", content=roster, headers=headers).json()
+    assert {k: report[k] for k in ("created", "linked", "skipped", "invalid")} == {"created": 2, "linked": 1, "skipped": 1, "invalid": 1}
+
+    identity = db_session.query(Identity).filter(Identity.provider_user_id == "partner.edu:s-2").one()
+    assert identity.user_id == existing.id and identity.provider == "sso"
+    assert db_session.query(Identity).filter(Identity.provider_user_id == "partner.edu:new2@partner.edu").count() == 1
+
+    ndjson = '{"email": "new1@partner.edu", "external_id": "s-1"}\n{"email": "new3@partner.edu", "name": "New Three"}\n'
+    headers["Content-Type"] = "application/x-ndjson"
+    again = client.post("/api/v1/auth/sso/partner.edu/provision", content=ndjson, headers=headers).json()
+    assert (again["created"], again["linked"], again["skipped"]) == (1, 0, 1)
+
+def test_bulk_provisioning_requires_key_and_active_domain(client, db_session, monkeypatch):
+    monkeypatch.setenv("SSO_PROVISIONING_API_KEY", "roster-key")
+    _sso_institution(db_session)
+    url = "/api/v1/auth/sso/partner.edu/provision"
+
+    assert client.post(url, content="email\n", headers={"X-Provisioning-Key": "wrong"}).status_code == 401
+    assert client.post("/api/v1/auth/sso/unknown.edu/provision", content="email\n",
+                       headers={"X-Provisioning-Key": "roster-key"}).status_code == 404
@@ -32,4 +32,315 @@ def test_submit_answer_authenticated(authenticated_client):
     })
     assert response.status_code == 200
     assert "status" in response.json()
-    assert "is_correct" in response.json()
\ No newline at end of file
+    assert "is_correct" in response.json()
+
+def test_get_question_async_route_awaits_generation(authenticated_client, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question
+
+    async def fake_generate_questions(specialty, difficulty, count):
+        return [
+            Question(
+                content="Async generated question",
+                discipline=specialty,
+                difficulty=difficulty,
+                correct_answer="C"
+            )
+            for _ in range(count)
+        ]
+
+    def fail_generate_questions(specialty, difficulty, count):
+        raise AssertionError("the async route must not generate on a thread")
+
+    monkeypatch.setattr(chat.question_coalescer, "async_generator", fake_generate_questions)
+    monkeypatch.setattr(chat.question_coalescer, "generator", fail_generate_questions)
+
+    client, user = authenticated_client
+    response = client.get("/api/v1/chat/question/async?specialty=Neurology&difficulty=Advanced")
+    assert response.status_code == 200
+    assert response.json()["content"] == "Async generated question"
+    assert response.json()["discipline"] == "Neurology"
+
+def test_question_route_serves_the_bank_before_the_inventory(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question, Response
+
+    monkeypatch.setattr(chat.question_inventory, "enabled", True)
+    client, user = authenticated_client
+    banked = Question(content="Banked", discipline="Orderology", difficulty="Intermediate", correct_answer="A")
+    stocked = Question(content="Stocked", discipline="Orderology", difficulty="Intermediate", correct_answer="A",
+                       in_inventory=True)
+    db_session.add_all([banked, stocked])
+    db_session.commit()
+
+    assert client.get("/api/v1/chat/question?specialty=Orderology").json()["id"] == banked.id
+    db_session.refresh(stocked)
+    assert stocked.in_inventory is True
+
+    db_session.add(Response(user_id=user.id, question_id=banked.id, user_answer="A", is_correct=True))
+    db_session.commit()
+    assert client.get("/api/v1/chat/question?specialty=Orderology").json()["id"] == stocked.id
+
+def test_submit_answer_async_route_stores_feedback(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question, Response
+
+    async def fake_evaluate_answer_async(question, correct_answer, user_answer, explanation):
+        return {"feedback": "Async feedback", "tokens_used": 10}
+
+    monkeypatch.setattr(chat.openai_service, "evaluate_answer_async", fake_evaluate_answer_async)
+
+    question = Question(content="Which option?", correct_answer="A", explanation="Because A.")
+    db_session.add(question)
+    db_session.commit()
+
+    client, user = authenticated_client
+    response = client.post("/api/v1/chat/answer/async", json={
+        "question_id": question.id,
+        "user_answer": "a"
+    })
+    assert response.status_code == 200
+    assert response.json()["is_correct"] is True
+    assert response.json()["personalized_feedback"] == "Async feedback"
+
+    stored = db_session.query(Response).filter(Response.question_id == question.id).one()
+    assert stored.feedback == "Async feedback"
+
+def _parse_sse(body):
+    import json
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_llm_usage_is_recorded_outside_the_callers_transaction(db_session):
+    from backend.api.v1 import chat
+    from backend.models import Question, User
+
+    user = User(email="ledger@example.com", name="Ledger")
+    db_session.add(user)
+    db_session.commit()
+
+    pending = Question(content="Not committed yet")
+    db_session.add(pending)
+    chat.llm_usage.record(db_session, user.id, "tagging", 40)
+
+    assert pending in db_session.new
+    assert chat.llm_usage.tokens_today(db_session, user.id) == 40
+    db_session.expunge(pending)
+
+def test_stream_answer_sends_result_then_feedback(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question, Response
+
+    async def fake_stream_answer_feedback(question, correct_answer, user_answer, explanation, usage=None):
+        for delta in ["Not quite. ", "Review beta blockers."]:
+            yield delta
+        usage["tokens_used"] = 87
+
+    monkeypatch.setattr(chat.openai_service, "stream_answer_feedback", fake_stream_answer_feedback)
+
+    question = Question(content="Which drug?", correct_answer="B", explanation="B is a beta blocker.")
+    db_session.add(question)
+    db_session.commit()
+
+    client, user = authenticated_client
+    response = client.post("/api/v1/chat/answer/stream", json={
+        "question_id": question.id,
+        "user_answer": "A"
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == ["result", "feedback", "feedback", "done"]
+    assert events[0][1]["is_correct"] is False
+    assert events[0][1]["correct_answer"] == "B"
+    assert events[0][1]["explanation"] == "B is a beta blocker."
+    assert events[-1][1]["personalized_feedback"] == "Not quite. Review beta blockers."
+
+    stored = db_session.query(Response).filter(Response.id == events[0][1]["response_id"]).one()
+    assert stored.feedback == "Not quite. Review beta blockers."
+    # Charged with the usage the provider reported at the end of the stream
+    assert chat.llm_usage.usage(db_session, user.id)["operations"]["feedback"] == {"calls": 1, "tokens": 87}
+
+def test_stream_answer_hands_broken_streams_to_the_worker(authenticated_client, db_session, monkeypatch):
+    import asyncio
+    from backend import schemas
+    from backend.api.v1 import chat
+    from backend.auth.principal import Principal
+    from backend.models import Question, Response
+
+    submitted = []
+    monkeypatch.setattr(chat.feedback_service, "submit", submitted.append)
+
+    async def broken_stream(question, correct_answer, user_answer, explanation, usage=None):
+        yield "Not quite. "
+        raise RuntimeError("provider dropped the stream")
+
+    monkeypatch.setattr(chat.openai_service, "stream_answer_feedback", broken_stream)
+
+    question = Question(content="Which valve?", correct_answer="C", explanation="C is the mitral valve.")
+    db_session.add(question)
+    db_session.commit()
+
+    client, user = authenticated_client
+    events = _parse_sse(client.post("/api/v1/chat/answer/stream", json={
+        "question_id": question.id,
+        "user_answer": "A"
+    }).text)
+    assert events[-1] == ("done", {"response_id": events[0][1]["response_id"], "personalized_feedback": None,
+                                   "status": "pending"})
+    stored = db_session.query(Response).filter(Response.id == events[0][1]["response_id"]).one()
+    assert (stored.feedback, stored.feedback_status) == (None, "pending")
+    assert submitted == [stored.id]
+
+    # A client that disconnects after the first event leaves the row to the worker too
+    async def disconnect():
+        streaming = await chat.stream_answer(schemas.AnswerCreate(question_id=question.id, user_answer="B"),
+                                             Principal(id=user.id), db_session)
+        body = streaming.body_iterator
+        await body.__anext__()
+        await body.aclose()
+
+    asyncio.run(disconnect())
+    assert len(submitted) == 2
+    assert db_session.get(Response, submitted[1]).feedback_status == "pending"
+
+def test_deferred_feedback_is_pending_until_worker_runs(authenticated_client, db_session, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+    from backend.api.v1 import chat
+    from backend.models import Question
+
+    submitted = []
+    monkeypatch.setattr(chat.feedback_service, "submit", submitted.append)
+    monkeypatch.setattr(chat.feedback_service, "_session_factory", sessionmaker(bind=db_session.bind))
+    monkeypatch.setattr(
+        chat.feedback_service, "generate_feedback",
+        lambda **kwargs: {"feedback": "Deferred feedback", "tokens_used": 12}
+    )
+
+    question = Question(content="Which nerve?", correct_answer="D", explanation="D innervates it.")
+    db_session.add(question)
+    db_session.commit()
+
+    client, user = authenticated_client
+    response = client.post("/api/v1/chat/answer", json={
+        "question_id": question.id,
+        "user_answer": "D",
+        "defer_feedback": True
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["is_correct"] is True
+    assert body["feedback_status"] == "pending"
+    assert body["personalized_feedback"] is None
+    assert submitted == [body["response_id"]]
+
+    pending = client.get(f"/api/v1/chat/answer/{body['response_id']}/feedback")
+    assert pending.status_code == 200
+    assert pending.json()["status"] == "pending"
+
+    assert chat.feedback_service.process(body["response_id"]) == "ready"
+    db_session.expire_all()
+
+    ready = client.get(f"/api/v1/chat/answer/{body['response_id']}/feedback")
+    assert ready.json()["status"] == "ready"
+    assert ready.json()["personalized_feedback"] == "Deferred feedback"
+
+def test_answer_feedback_not_found_for_other_users(authenticated_client):
+    client, user = authenticated_client
+    response = client.get("/api/v1/chat/answer/999999/feedback")
+    assert response.status_code == 404
+
+def test_open_circuit_serves_fallback_without_generating(authenticated_client, monkeypatch):
+    from backend.api.v1 import chat
+
+    def fail_generate_questions(specialty, difficulty, count):
+        raise AssertionError("generation should be skipped while the circuit is open")
+
+    monkeypatch.setattr(chat.question_coalescer, "generator", fail_generate_questions)
+    monkeypatch.setattr(chat.openai_service.resilience, "available", lambda: False)
+
+    client, user = authenticated_client
+    response = client.get("/api/v1/chat/question?specialty=Dermatology")
+    assert response.status_code == 200
+    assert response.json()["discipline"] == "Dermatology"
+
+    status = client.get("/api/v1/chat/llm-status")
+    assert status.status_code == 200
+
+def test_missed_question_comes_back_in_review_queue(authenticated_client, db_session, monkeypatch):
+    import datetime
+    from backend.api.v1 import chat
+    from backend.models import Question
+
+    monkeypatch.setattr(chat.review_scheduler, "lapse_interval", datetime.timedelta(0))
+    monkeypatch.setattr(chat.feedback_service, "generate_feedback", lambda **kwargs: {"feedback": "Review it"})
+
+    question = Question(content="Which valve?", correct_answer="C", explanation="C is the mitral valve.")
+    db_session.add(question)
+    db_session.commit()
+
+    client, user = authenticated_client
+    answer = client.post("/api/v1/chat/answer", json={"question_id": question.id, "user_answer": "A"})
+    assert answer.json()["is_correct"] is False
+
+    due = client.get("/api/v1/chat/review/next")
+    assert due.status_code == 200
+    assert [item["id"] for item in due.json()] == [question.id]
+    assert client.get("/api/v1/chat/review/next").json() == []
+
+def test_generated_question_and_feedback_tokens_go_to_ledger(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question
+
+    def fake_generate_questions(specialty, difficulty, count):
+        question = Question(content="Ledger question", discipline=specialty, difficulty=difficulty, correct_answer="B")
+        question.tokens_used = 420
+        return [question]
+
+    monkeypatch.setattr(chat.question_coalescer, "generator", fake_generate_questions)
+    monkeypatch.setattr(chat.question_selector, "enabled", False)
+    monkeypatch.setattr(chat.question_inventory, "enabled", False)
+    monkeypatch.setattr(chat.feedback_service, "generate_feedback", lambda **kwargs: {"feedback": "Good", "tokens_used": 80})
+
+    client, user = authenticated_client
+    question = client.get("/api/v1/chat/question?specialty=Ledgerology").json()
+    client.post("/api/v1/chat/answer", json={"question_id": question["id"], "user_answer": "A"})
+
+    usage = client.get("/api/v1/chat/usage").json()
+    assert usage["tokens"] == 500
+    assert usage["operations"] == {"question": {"calls": 1, "tokens": 420}, "feedback": {"calls": 1, "tokens": 80}}
+
+def test_over_budget_user_gets_bank_question_and_no_llm_feedback(authenticated_client, db_session, monkeypatch):
+    from backend.api.v1 import chat
+    from backend.models import Question
+    from backend.services.feedback_service import BUDGET_FEEDBACK
+
+    def fail_generate_questions(specialty, difficulty, count):
+        raise AssertionError("over-budget users must not trigger generation")
+
+    def fail_evaluate(**kwargs):
+        raise AssertionError("over-budget users must not trigger feedback calls")
+
+    monkeypatch.setattr(chat.question_coalescer, "generator", fail_generate_questions)
+    monkeypatch.setattr(chat.question_inventory, "enabled", False)
+    monkeypatch.setattr(chat.openai_service, "evaluate_answer", fail_evaluate)
+    monkeypatch.setattr(chat.llm_usage, "daily_token_budget", 1000)
+
+    client, user = authenticated_client
+    chat.llm_usage.record(db_session, user.id, "question", 1200)
+
+    banked = Question(content="Banked", discipline="Budgetology", difficulty="Intermediate", correct_answer="A")
+    db_session.add(banked)
+    db_session.commit()
+
+    question = client.get("/api/v1/chat/question?specialty=Budgetology").json()
+    assert question["id"] == banked.id
+
+    answer = client.post("/api/v1/chat/answer", json={"question_id": banked.id, "user_answer": "B"}).json()
+    assert answer["personalized_feedback"] == BUDGET_FEEDBACK
+    assert answer["feedback_status"] == "ready"
+    assert client.get("/api/v1/chat/usage").json()["remaining"] == 0
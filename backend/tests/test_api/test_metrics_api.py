@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from backend.services.metrics import instrument_sessions
+from backend.services.resilience import LLMResilience
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_request_latency_is_labelled_by_route_template(authenticated_client):
+    client, user = authenticated_client
+    before = _sample("http_request_duration_seconds_count", method="GET", route="/api/v1/chat/answer/{response_id}/feedback", status="404")
+
+    assert client.get("/api/v1/chat/answer/999999/feedback").status_code == 404
+
+    after = _sample("http_request_duration_seconds_count", method="GET", route="/api/v1/chat/answer/{response_id}/feedback", status="404")
+    assert after == before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'route="/api/v1/chat/answer/{response_id}/feedback"' in response.text
+
+def test_llm_calls_record_latency_and_tokens():
+    resilience = LLMResilience("metrics-test")
+    completion = SimpleNamespace(usage=SimpleNamespace(total_tokens=321))
+
+    resilience.call("evaluate_answer", lambda timeout: completion)
+
+    assert _sample("llm_tokens_total", operation="evaluate_answer", provider="metrics-test") == 321
+    assert _sample("llm_request_duration_seconds_count", operation="evaluate_answer", provider="metrics-test", outcome="success") == 1
+
+def test_session_checkout_time_is_observed(db_session):
+    session_factory = sessionmaker(bind=db_session.bind)
+    instrument_sessions(session_factory)
+    before = _sample("db_session_checkout_seconds_count")
+
+    session = session_factory()
+    session.execute(text("SELECT 1"))
+    session.close()
+
+    assert _sample("db_session_checkout_seconds_count") == before + 1
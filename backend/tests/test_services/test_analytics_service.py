@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from backend.models import Question, Response, User
+from backend.services.analytics_service import AnalyticsService
+
+NOW = datetime(2026, 3, 10, 12, 0, 0)
+
+def test_performance_stats_single_query_with_windows(db_session):
+    db_session.add(User(id=801, email="stats@example.com", name="Stats"))
+    cardio = Question(content="Cardio", discipline="Cardiology", difficulty="Easy")
+    neuro = Question(content="Neuro", discipline="Neurology", difficulty="Hard")
+    db_session.add_all([cardio, neuro])
+    db_session.commit()
+
+    answers = [
+        (cardio, True, NOW - timedelta(days=1)),
+        (cardio, False, NOW - timedelta(days=1, hours=2)),
+        (neuro, True, NOW - timedelta(days=3)),
+        (neuro, True, NOW - timedelta(days=20)),   # In the 30-day window, outside daily activity
+        (neuro, False, NOW - timedelta(days=45)),  # Outside both
+    ]
+    db_session.add_all([
+        Response(user_id=801, question_id=q.id, user_answer="A", is_correct=correct, created_at=created_at)
+        for q, correct, created_at in answers
+    ])
+    db_session.commit()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db_session.bind, "before_cursor_execute", listener)
+    try:
+        stats = AnalyticsService().get_user_performance_stats(801, db_session, days=30, end=NOW)
+    finally:
+        event.remove(db_session.bind, "before_cursor_execute", listener)
+
+    assert len(statements) == 1
+    assert stats["total_questions"] == 4
+    assert stats["correct_answers"] == 3
+    assert stats["overall_accuracy"] == 75.0
+    assert {s["specialty"]: (s["total"], s["correct"]) for s in stats["specialty_performance"]} == {
+        "Cardiology": (2, 1), "Neurology": (2, 2)
+    }
+    assert {s["difficulty"]: s["total"] for s in stats["difficulty_performance"]} == {"Easy": 2, "Hard": 2}
+    assert [(d["date"], d["questions_answered"]) for d in stats["daily_activity"]] == [
+        ("2026-03-07", 1), ("2026-03-09", 2)
+    ]
+
+    custom = AnalyticsService().get_user_performance_stats(801, db_session, start=NOW - timedelta(days=60), end=NOW - timedelta(days=10))
+    assert custom["total_questions"] == 2
+    assert custom["period_days"] == 50
+    assert custom["daily_activity"] == []
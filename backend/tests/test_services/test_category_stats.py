@@ -0,0 +1,63 @@
+from backend.models import Question, Response, User, UserCategoryStat
+from backend.services import category_stats
+from backend.services.question_tags import record_question_tags, retag_questions
+
+def _stats(db_session, user_id, dimension):
+    return {
+        row.category: (row.total, row.correct)
+        for row in db_session.query(UserCategoryStat).filter_by(user_id=user_id, dimension=dimension)
+    }
+
+def test_record_answer_rebuilds_history_then_increments(db_session):
+    db_session.add(User(id=701, email="rollup@example.com", name="Rollup"))
+    old = Question(content="Old", discipline="Cardiology", body_systems='["cardiovascular"]')
+    new = Question(content="New", discipline="Cardiology", body_systems='["cardiovascular", "renal"]',
+                   question_type="treatment")
+    db_session.add_all([old, new])
+    record_question_tags(db_session, [old, new])
+    db_session.commit()
+    # History from before the rollup existed
+    db_session.add(Response(user_id=701, question_id=old.id, user_answer="A", is_correct=False))
+    db_session.commit()
+
+    category_stats.record_answer(db_session, 701, new, True)
+    db_session.add(Response(user_id=701, question_id=new.id, user_answer="B", is_correct=True))
+    db_session.commit()
+
+    assert _stats(db_session, 701, "body_systems") == {"cardiovascular": (2, 1), "renal": (1, 1)}
+    assert _stats(db_session, 701, "question_type") == {"Unknown": (1, 0), "treatment": (1, 1)}
+    assert _stats(db_session, 701, "disciplines") == {"Cardiology": (2, 1)}
+
+    incremental = {d: _stats(db_session, 701, d) for d in category_stats.DIMENSIONS}
+    category_stats.rebuild(db_session, 701)
+    db_session.commit()
+    assert {d: _stats(db_session, 701, d) for d in category_stats.DIMENSIONS} == incremental
+
+def test_retagging_an_answered_question_refreshes_the_rollup(db_session, tmp_path, monkeypatch):
+    from backend.cli import backfill_tags
+
+    db_session.add(User(id=703, email="retag@example.com", name="Retag"))
+    question = Question(content="Legacy untagged question")
+    db_session.add(question)
+    db_session.commit()
+    category_stats.record_answer(db_session, 703, question, True)
+    db_session.add(Response(user_id=703, question_id=question.id, user_answer="A", is_correct=True))
+    db_session.commit()
+    assert _stats(db_session, 703, "disciplines") == {"General Medicine": (1, 1)}
+
+    class Tagger:
+        def tag_questions(self, questions, fallback=True):
+            return [{"disciplines": ["pharmacology"], "question_type": "treatment"} for _ in questions]
+
+    monkeypatch.setattr(backfill_tags, "get_tagging_service", lambda: Tagger())
+    version = backfill_tags.analytics_cache.backend.version(703)
+    backfill_tags.backfill(db_session, checkpoint=tmp_path / "checkpoint")
+    assert backfill_tags.analytics_cache.backend.version(703) != version
+    category_stats.category_performance(db_session, 703, "disciplines")
+    assert _stats(db_session, 703, "disciplines") == {"pharmacology": (1, 1)}
+    assert _stats(db_session, 703, "question_type") == {"treatment": (1, 1)}
+
+    retag_questions(db_session, [{"id": question.id, "disciplines": '["cardiology"]'}])
+    db_session.commit()
+    rows = category_stats.category_performance(db_session, 703, "disciplines")
+    assert [(row.category, row.total) for row in rows] == [("cardiology", 1)]
@@ -0,0 +1,86 @@
+import json
+import asyncio
+
+import openai
+import pytest
+
+from backend.services.fake_llm import FakeLLMClient, AsyncFakeLLMClient, FakeLLMProfile, parse_latency
+from backend.services.openai_service import OpenAIService
+from backend.services.resilience import CircuitBreaker, LLMResilience
+from backend.services.tagging_service import AzureOpenAITagger
+from backend.services.taxonomy import TAXONOMY
+
+@pytest.fixture
+def fake_env(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "fixed:0")
+    monkeypatch.setenv("FAKE_LLM_STREAM_CHUNK_MS", "0")
+    monkeypatch.setenv("FAKE_LLM_SEED", "7")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "0")
+    monkeypatch.delenv("FAKE_LLM_ERROR_RATE", raising=False)
+    monkeypatch.delenv("FAKE_LLM_MALFORMED_RATE", raising=False)
+    return monkeypatch
+
+def _fake_service():
+    service = OpenAIService()
+    service.resilience = LLMResilience("fake", breaker=CircuitBreaker("fake-test"))
+    return service
+
+def test_parse_latency_specs():
+    sampler = parse_latency("fixed:250")
+    assert sampler(None) == 0.25
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:1")
+
+def test_fake_provider_produces_valid_questions_and_feedback(fake_env):
+    service = _fake_service()
+    assert service.provider == "fake"
+
+    question = service.generate_clinical_question(specialty="Cardiology", difficulty="Advanced")
+    assert question["specialty"] == "Cardiology"
+    assert question["correct_answer"] in question["options"]
+
+    batch = service.generate_clinical_questions_batch("Cardiology", "Advanced", 3)
+    assert len(batch["questions"]) == 3
+    assert batch["rejected"] == 0
+    assert len({q["question"] for q in batch["questions"]}) == 3
+
+    feedback = service.evaluate_answer("Q", "A", "B", "Because")
+    assert feedback["feedback"].startswith("Fake feedback")
+    assert feedback["tokens_used"] > 0
+
+def test_fake_provider_streams_question_json(fake_env):
+    service = _fake_service()
+
+    async def collect():
+        return "".join([delta async for delta in service.stream_clinical_question(specialty="Neurology")])
+
+    content = asyncio.run(collect())
+    assert json.loads(content)["specialty"] == "Neurology"
+
+def test_fake_tagger_returns_taxonomy_values(fake_env):
+    tagger = AzureOpenAITagger()
+    tags = tagger.tag_questions([("Question one", {}), ("Question two", {})])
+    assert len(tags) == 2
+    for item in tags:
+        assert item["question_type"] in TAXONOMY["question_type"]
+        assert set(item["disciplines"]) <= set(TAXONOMY["disciplines"])
+
+def test_error_rate_raises_server_errors(fake_env):
+    fake_env.setenv("FAKE_LLM_ERROR_RATE", "1")
+    client = FakeLLMClient()
+    with pytest.raises(openai.InternalServerError):
+        client.chat.completions.create(messages=[{"role": "user", "content": "hi"}])
+
+def test_latency_beyond_timeout_raises_timeout(fake_env):
+    fake_env.setenv("FAKE_LLM_LATENCY", "fixed:5000")
+    client = AsyncFakeLLMClient()
+    with pytest.raises(openai.APITimeoutError):
+        asyncio.run(client.chat.completions.create(messages=[{"role": "user", "content": "hi"}], timeout=0.01))
+
+def test_malformed_rate_truncates_json(fake_env):
+    fake_env.setenv("FAKE_LLM_MALFORMED_RATE", "1")
+    profile = FakeLLMProfile()
+    content = profile.reply([{"role": "system", "content": "Format your response as JSON"}], 1)
+    with pytest.raises(ValueError):
+        json.loads(content)
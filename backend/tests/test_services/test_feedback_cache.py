@@ -0,0 +1,130 @@
+import pytest
+
+from backend.models import Question, FeedbackCacheEntry
+from backend.services import feedback_service as feedback_module
+from backend.services.feedback_cache import FeedbackCache, normalize_answer, question_hash
+from backend.services.feedback_service import FeedbackService
+
+@pytest.fixture
+def question(db_session):
+    question = Question(content="Which drug lowers heart rate?", correct_answer="B", explanation="Beta blockers.")
+    db_session.add(question)
+    db_session.commit()
+    return question
+
+def test_normalize_answer():
+    assert normalize_answer(" b ") == "B"
+    assert normalize_answer("B) Metoprolol") == "B"
+    assert normalize_answer("(c)") == "C"
+    assert normalize_answer("beta   blocker") == "BETA BLOCKER"
+
+def test_db_tier_serves_after_memory_is_cleared(db_session, question):
+    cache = FeedbackCache()
+    q_hash = question_hash(question.content, question.correct_answer, question.explanation)
+
+    assert cache.get(db_session, question.id, "A", q_hash) is None
+    cache.put(db_session, question.id, "a", q_hash, "A is a calcium channel blocker.")
+
+    assert cache.get(db_session, question.id, "A", q_hash) == "A is a calcium channel blocker."
+    cache.memory.clear()
+    assert cache.get(db_session, question.id, "A) Amlodipine", q_hash) == "A is a calcium channel blocker."
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["db_hits"] == 1
+    assert stats["misses"] == 1
+
+def test_changed_explanation_invalidates_entry(db_session, question):
+    cache = FeedbackCache()
+    old_hash = question_hash(question.content, question.correct_answer, question.explanation)
+    cache.put(db_session, question.id, "A", old_hash, "Old feedback")
+
+    new_hash = question_hash(question.content, question.correct_answer, "Beta blockers slow AV conduction.")
+    assert cache.get(db_session, question.id, "A", new_hash) is None
+
+    cache.put(db_session, question.id, "A", new_hash, "New feedback")
+    assert db_session.query(FeedbackCacheEntry).filter(FeedbackCacheEntry.question_id == question.id).count() == 1
+    assert cache.get(db_session, question.id, "A", new_hash) == "New feedback"
+
+def test_stores_leave_the_callers_session_alone_and_prune_off_request(db_session, question, monkeypatch):
+    import threading
+
+    cache = FeedbackCache()
+    cache.prune_every = 1
+    pruned = threading.Event()
+    prunes = []
+
+    def prune(prune_db):
+        prunes.append((threading.current_thread().name, prune_db is db_session))
+        pruned.set()
+        return 0
+
+    monkeypatch.setattr(cache, "prune", prune)
+    unsaved = Question(content="Unsaved question")
+    db_session.add(unsaved)
+    q_hash = question_hash(question.content, question.correct_answer, question.explanation)
+    cache.put(db_session, question.id, "A", q_hash, "Feedback A")
+
+    assert unsaved in db_session.new  # Nothing flushed or committed the caller's session
+    db_session.expunge(unsaved)
+    assert pruned.wait(5)
+    assert prunes == [("feedback-cache-prune", False)]
+    cache.memory.clear()
+    assert cache.get(db_session, question.id, "A", q_hash) == "Feedback A"
+
+def test_prune_keeps_most_recently_used_rows(db_session, question):
+    cache = FeedbackCache()
+    cache.db_max_rows = 1
+    q_hash = question_hash(question.content, question.correct_answer, question.explanation)
+    cache.put(db_session, question.id, "A", q_hash, "Feedback A")
+    cache.put(db_session, question.id, "C", q_hash, "Feedback C")
+    cache.memory.clear()
+    cache.get(db_session, question.id, "C", q_hash)
+
+    assert cache.prune(db_session) == 1
+    remaining = db_session.query(FeedbackCacheEntry).filter(FeedbackCacheEntry.question_id == question.id).all()
+    assert [entry.answer_key for entry in remaining] == ["C"]
+
+def test_feedback_service_calls_llm_once_per_choice(db_session, question, monkeypatch):
+    calls = []
+
+    class FakeOpenAIService:
+        def evaluate_answer(self, question, correct_answer, user_answer, explanation):
+            calls.append(user_answer)
+            return {"feedback": f"Feedback for {user_answer}", "tokens_used": 42}
+
+    monkeypatch.setattr(feedback_module, "get_openai_service", lambda: FakeOpenAIService())
+    service = FeedbackService()
+
+    kwargs = dict(
+        question=question.content,
+        correct_answer=question.correct_answer,
+        explanation=question.explanation,
+        question_id=question.id,
+        db=db_session
+    )
+    first = service.generate_feedback(user_answer="A", **kwargs)
+    second = service.generate_feedback(user_answer="a", **kwargs)
+
+    assert calls == ["A"]
+    assert first["feedback"] == second["feedback"] == "Feedback for A"
+    assert second["cached"] is True
+
+def test_reads_leave_the_callers_session_alone_and_hits_flush_in_batches(db_session, question):
+    cache = FeedbackCache()
+    q_hash = question_hash(question.content, question.correct_answer, question.explanation)
+    cache.put(db_session, question.id, "A", q_hash, "Feedback A")
+    cache.memory.clear()
+
+    unsaved = Question(content="Unsaved question")
+    db_session.add(unsaved)
+    for _ in range(3):
+        assert cache.get(db_session, question.id, "A", q_hash) == "Feedback A"
+    assert unsaved in db_session.new  # Nothing flushed or committed the caller's session
+    db_session.expunge(unsaved)
+
+    entry = db_session.query(FeedbackCacheEntry).filter(FeedbackCacheEntry.question_id == question.id).one()
+    assert entry.hit_count == 0
+    assert cache.flush_hits(db_session) == 1
+    db_session.refresh(entry)
+    assert entry.hit_count == 3
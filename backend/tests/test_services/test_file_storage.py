@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+
+from backend.services.file_storage import FileStorage
+
+def _seed(storage):
+    alice = storage.save_user({"email": "alice@example.com", "name": "Alice"})
+    bob = storage.save_user({"email": "bob@example.com", "name": "Bob"})
+    q1 = storage.save_question({"user_id": alice, "content": "Q1", "created_at": "2026-01-01T00:00:00"})
+    q2 = storage.save_question({"user_id": alice, "content": "Q2", "created_at": "2026-01-02T00:00:00"})
+    storage.save_question({"user_id": bob, "content": "Q3"})
+    storage.save_response({"user_id": alice, "question_id": q1, "created_at": "2026-01-03T00:00:00"})
+    storage.save_response({"user_id": alice, "question_id": q2, "created_at": "2026-01-04T00:00:00"})
+    storage.save_response({"user_id": bob, "question_id": q1, "created_at": "2026-01-05T00:00:00"})
+    return alice, bob, q1, q2
+
+def test_lookups_use_indexes_without_scanning(tmp_path, monkeypatch):
+    storage = FileStorage(str(tmp_path))
+    alice, bob, q1, q2 = _seed(storage)
+
+    monkeypatch.setattr(type(storage.users_dir), "glob", lambda *args: (_ for _ in ()).throw(AssertionError("scanned")))
+    assert storage.get_user_by_email("bob@example.com")["id"] == bob
+    assert storage.get_user_by_email("nobody@example.com") is None
+    assert [q["content"] for q in storage.get_questions_by_user(alice)] == ["Q2", "Q1"]
+    assert [r["question_id"] for r in storage.get_responses_by_user(alice)] == [q2, q1]
+    assert [r["user_id"] for r in storage.get_responses_by_question(q1)] == [bob, alice]
+
+def test_resave_moves_index_entries(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    alice, bob, q1, q2 = _seed(storage)
+
+    storage.save_user({"id": alice, "email": "alice@new.example.com"})
+    assert storage.get_user_by_email("alice@example.com") is None
+    assert storage.get_user_by_email("alice@new.example.com")["id"] == alice
+
+    storage.save_question({"id": q2, "user_id": bob, "content": "Q2", "created_at": "2026-01-02T00:00:00"})
+    assert [q["content"] for q in storage.get_questions_by_user(alice)] == ["Q1"]
+
+def test_indexes_rebuild_from_data_directory(tmp_path):
+    alice, bob, q1, q2 = _seed(FileStorage(str(tmp_path)))
+    (tmp_path / "index.sqlite3").unlink()
+
+    storage = FileStorage(str(tmp_path))
+    assert storage.get_user_by_email("alice@example.com")["id"] == alice
+    assert len(storage.get_responses_by_question(q1)) == 2
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+def test_locked_index_fails_the_save_before_the_file_is_written(tmp_path):
+    storage = FileStorage(str(tmp_path))
+    alice, bob, q1, q2 = _seed(storage)
+    storage.index_timeout = 0.05
+
+    blocker = sqlite3.connect(tmp_path / "index.sqlite3")
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            storage.save_user({"id": "carol", "email": "carol@example.com"})
+    finally:
+        blocker.rollback()
+        blocker.close()
+    assert storage.get_user("carol") is None
+
+def test_failed_save_settles_its_index_row_from_the_file(tmp_path, monkeypatch):
+    storage = FileStorage(str(tmp_path))
+    alice, bob, q1, q2 = _seed(storage)
+
+    def crash(file_path, data):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "save_json", crash)
+    with pytest.raises(OSError):
+        storage.save_response({"id": "lost", "user_id": bob, "question_id": q2})
+    with pytest.raises(OSError):
+        storage.save_question({"id": q2, "user_id": bob, "content": "Q2 moved"})
+    monkeypatch.undo()
+
+    assert [r["question_id"] for r in storage.get_responses_by_user(bob)] == [q1]
+    assert [q["id"] for q in storage.get_questions_by_user(alice)] == [q2, q1]
+    with sqlite3.connect(tmp_path / "index.sqlite3") as conn:
+        assert conn.execute("SELECT count(*) FROM responses WHERE id = 'lost' OR pending != 0").fetchone()[0] == 0
+
+def test_save_from_a_process_that_died_is_indexed_despite_later_saves(tmp_path, monkeypatch):
+    storage = FileStorage(str(tmp_path))
+    alice, bob, q1, q2 = _seed(storage)
+
+    class Died(BaseException):
+        pass
+
+    def die(*args):
+        raise Died()
+
+    def replace_then_die(file_path, data):
+        FileStorage.save_json(storage, file_path, data)
+        die()
+
+    # Process A replaces the file and dies before clearing its marker
+    monkeypatch.setattr(storage, "save_json", replace_then_die)
+    monkeypatch.setattr(storage, "_settle", die)
+    with pytest.raises(Died):
+        storage.save_response({"id": "late", "user_id": bob, "question_id": q2, "created_at": "2026-01-06T00:00:00"})
+    monkeypatch.undo()
+
+    # Process B saves later files, then a process starting after the grace period settles A's row
+    FileStorage(str(tmp_path)).save_response({"user_id": alice, "question_id": q1, "created_at": "2026-01-07T00:00:00"})
+    storage.save_user({"id": bob, "email": "bob@example.com"})
+    recovering = FileStorage(str(tmp_path))
+    recovering.pending_grace = 0
+    assert [r["id"] for r in recovering.get_responses_by_question(q2)][0] == "late"
+    with sqlite3.connect(tmp_path / "index.sqlite3") as conn:
+        assert conn.execute("SELECT pending FROM responses WHERE id = 'late'").fetchone() == (0,)
+
+def test_index_from_the_watermark_layout_is_rebuilt(tmp_path):
+    alice, bob, q1, q2 = _seed(FileStorage(str(tmp_path)))
+    with sqlite3.connect(tmp_path / "index.sqlite3") as conn:
+        conn.executescript("""
+            DROP TABLE users; CREATE TABLE users (id TEXT PRIMARY KEY, email TEXT);
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER);
+            PRAGMA user_version = 0;
+        """)
+
+    assert FileStorage(str(tmp_path)).get_user_by_email("alice@example.com")["id"] == alice
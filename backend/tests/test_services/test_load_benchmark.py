@@ -0,0 +1,46 @@
+from backend.benchmarks.load_benchmark import compare_to_baseline, percentile, summarize
+
+def _report(p95=100.0, p99=150.0, throughput=50.0, error_rate=0.0):
+    return {"scenarios": {"question": {
+        "latency_ms": {"p50": 50.0, "p95": p95, "p99": p99},
+        "throughput_rps": throughput,
+        "error_rate": error_rate
+    }}}
+
+def test_summarize_reports_percentiles_and_errors():
+    latencies = [i / 1000 for i in range(1, 101)]
+    statuses = [200] * 98 + [500, 0]
+    report = summarize(latencies, statuses, elapsed=2.0)
+
+    assert report["requests"] == 100
+    assert report["errors"] == 2
+    assert report["error_rate"] == 0.02
+    assert report["throughput_rps"] == 50.0
+    assert report["latency_ms"]["p50"] == 50.0
+    assert report["latency_ms"]["p99"] == 99.0
+    assert report["status_codes"] == {"200": 98, "500": 1, "0": 1}
+    assert percentile([], 95) == 0.0
+
+def test_compare_to_baseline_flags_regressions_beyond_tolerance():
+    baseline = _report()
+    assert compare_to_baseline(_report(p95=115.0, throughput=45.0), baseline, tolerance=0.2) == []
+
+    regressions = compare_to_baseline(_report(p95=130.0, throughput=30.0, error_rate=0.05), baseline, tolerance=0.2)
+    assert len(regressions) == 3
+    assert any("p95" in regression for regression in regressions)
+    assert any("throughput" in regression for regression in regressions)
+    assert any("error rate" in regression for regression in regressions)
+
+def test_seed_database_mirrors_question_tags(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, func, select
+    from backend.auth import password
+    from backend.benchmarks.load_benchmark import seed_database
+    from backend.models import QuestionTag
+
+    monkeypatch.setattr(password, "get_password_hash", lambda plain: "seeded-hash")
+    url = f"sqlite:///{tmp_path / 'bench.db'}"
+    seed_database(url, users=2, questions=1200, responses_per_user=3)
+
+    with create_engine(url).connect() as conn:
+        tagged = conn.execute(select(func.count(func.distinct(QuestionTag.question_id)))).scalar()
+    assert tagged == 1200
@@ -0,0 +1,44 @@
+from backend.benchmarks.tagging_benchmark import evaluate_accuracy, load_fixture
+from backend.services.tagging_service import LocalLLMTagger, QuestionTaggingService
+from backend.services.taxonomy_matcher import TaxonomyMatcher, tokenize
+
+def test_matcher_reports_overlapping_phrases_in_one_pass():
+    matcher = TaxonomyMatcher({
+        "chest": ["chest pain"],
+        "pain": ["pain"],
+        "radiating": ["pain radiating to"],
+    })
+    tokens = tokenize("Crushing chest pain radiating to the left arm")
+    matches = sorted(matcher.scan(tokens), key=lambda match: (match[1], match[0]))
+
+    assert matches == [("chest", 1, 3), ("pain", 2, 3), ("radiating", 2, 5)]
+
+def test_tokenize_folds_plurals():
+    assert tokenize("Arteries, NERVES and X-rays") == ["artery", "nerve", "and", "x", "ray"]
+
+def test_local_tagger_tags_cardiology_emergency():
+    tags = LocalLLMTagger().tag_question(
+        "A 67-year-old man presents to the emergency department with chest pain. ECG shows ST elevation. "
+        "What is the most appropriate next step in management?",
+        {"A": "Aspirin", "B": "Cardiac catheterization"}
+    )
+
+    assert tags["body_systems"][0] == "cardiovascular"
+    assert "cardiology" in tags["specialties"]
+    assert tags["question_type"] == "treatment"
+    assert tags["age_group"] == "elderly"
+    assert tags["acuity"] == "life_threatening"
+
+def test_option_only_terms_do_not_drive_tags():
+    tags = LocalLLMTagger().tag_question("Which of the following is correct?", {"A": "Pneumonia", "B": "Gout"})
+    assert tags["body_systems"] == []
+    assert tags["age_group"] is None
+
+def test_local_backend_selectable_and_meets_fixture_accuracy():
+    backend = QuestionTaggingService("local").backend
+    assert isinstance(backend, LocalLLMTagger)
+
+    report = evaluate_accuracy(backend, load_fixture())
+    assert report["question_type"]["accuracy"] >= 0.8
+    assert report["age_group"]["accuracy"] >= 0.8
+    assert report["body_systems"]["f1"] >= 0.7
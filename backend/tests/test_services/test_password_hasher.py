@@ -0,0 +1,84 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.auth.password import PasswordHasher, PasswordHashingBusy, PasswordHashingUnavailable
+
+def _thread_hasher(workers=1, max_queue=1):
+    hasher = PasswordHasher()
+    hasher.mode, hasher.workers, hasher.max_queue = "thread", workers, max_queue
+    return hasher
+
+def test_full_queue_fails_fast_with_retry_after():
+    hasher = _thread_hasher()
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def slow_hash(value):
+        started.release()
+        release.wait(5)
+        return value
+
+    with ThreadPoolExecutor(max_workers=2) as callers:
+        running = [callers.submit(hasher.run, "hash", slow_hash, n) for n in range(2)]
+        started.acquire(timeout=5)
+        while hasher.stats()["in_flight"] < 2:
+            pass
+
+        with pytest.raises(PasswordHashingBusy) as busy:
+            hasher.run("hash", slow_hash, 3)
+        assert busy.value.retry_after >= 1
+
+        release.set()
+        assert sorted(future.result() for future in running) == [0, 1]
+
+    assert hasher.stats()["in_flight"] == 0
+    assert hasher.run("hash", str.upper, "ok") == "OK"
+    hasher.shutdown()
+
+def test_failed_hash_releases_its_slot():
+    hasher = _thread_hasher(max_queue=0)
+
+    def broken(value):
+        raise ValueError(value)
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            hasher.run("verify", broken, "bad")
+    assert hasher.stats()["in_flight"] == 0
+    hasher.shutdown()
+
+def test_timed_out_jobs_keep_their_slots_until_the_pool_finishes():
+    hasher = _thread_hasher(workers=1, max_queue=2)
+    hasher.timeout = 0.05
+    release = threading.Event()
+
+    def stuck(value):
+        release.wait(5)
+        return value
+
+    for n in range(3):
+        with pytest.raises(PasswordHashingBusy):
+            hasher.run("hash", stuck, n)
+    # The running job still holds its slot; the queued ones were cancelled
+    assert hasher.stats()["in_flight"] == 1
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while hasher.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert hasher.stats()["in_flight"] == 0
+    hasher.shutdown()
+
+def test_broken_pool_is_replaced():
+    hasher = PasswordHasher()
+    hasher.mode, hasher.workers, hasher.max_queue = "process", 1, 1
+
+    with pytest.raises(PasswordHashingUnavailable):
+        hasher.run("hash", os._exit, 1)
+    assert hasher.stats()["in_flight"] == 0
+    assert hasher.run("hash", str.upper, "ok") == "OK"
+    hasher.shutdown()
@@ -0,0 +1,64 @@
+import json
+from types import SimpleNamespace
+
+from backend.models import Question
+from backend.services import question_service
+from backend.services.openai_service import OpenAIService, _extract_batch_items, validate_question_item
+from backend.services.question_service import bulk_insert_questions, generate_question_batch
+from backend.services.resilience import LLMResilience
+
+def _item(n, **overrides):
+    item = {
+        "question": f"Question {n}",
+        "options": {"A": "One", "B": "Two", "C": "Three", "D": "Four"},
+        "correct_answer": "b",
+        "explanation": f"Explanation {n}",
+        "topics": ["topic"]
+    }
+    item.update(overrides)
+    return item
+
+def _service_returning(content, total_tokens=1000):
+    service = OpenAIService.__new__(OpenAIService)
+    service.deployment_name = "test"
+    service.resilience = LLMResilience("test")
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(total_tokens=total_tokens)
+    )
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: completion)))
+    return service
+
+def test_validate_question_item_rejects_malformed_items():
+    assert validate_question_item(_item(1), "Cardiology", "Easy")["correct_answer"] == "B"
+    assert validate_question_item(_item(1, correct_answer="E"), "Cardiology", "Easy") is None
+    assert validate_question_item(_item(1, options=["A", "B"]), "Cardiology", "Easy") is None
+    assert validate_question_item(_item(1, explanation=""), "Cardiology", "Easy") is None
+    assert validate_question_item("not a question", "Cardiology", "Easy") is None
+
+def test_extract_batch_items_salvages_truncated_json():
+    content = json.dumps({"questions": [_item(1), _item(2)]})
+    assert len(_extract_batch_items(content)) == 2
+    assert [item["question"] for item in _extract_batch_items(content[:-40])] == ["Question 1"]
+    assert _extract_batch_items(None) == [] and _extract_batch_items("") == []
+
+def test_batch_drops_malformed_items_without_failing():
+    content = json.dumps({"questions": [_item(1), _item(2, options={}), _item(3)]})
+    batch = _service_returning(content).generate_clinical_questions_batch("Cardiology", "Easy", count=3)
+
+    assert [q["question"] for q in batch["questions"]] == ["Question 1", "Question 3"]
+    assert batch["rejected"] == 1
+    assert batch["tokens_used"] == 1000
+    assert all(q["specialty"] == "Cardiology" for q in batch["questions"])
+
+def test_generated_batch_is_bulk_inserted(db_session, monkeypatch):
+    content = json.dumps([_item(1), _item(2)])
+    monkeypatch.setattr(question_service, "get_openai_service", lambda: _service_returning(content))
+    monkeypatch.setattr(question_service, "tag_question_data_batch", lambda items: [{"question_type": "diagnosis"}] * len(items))
+
+    batch = generate_question_batch("Neurology", "Hard", 2)
+    assert bulk_insert_questions(db_session, batch["questions"]) == 2
+
+    stored = db_session.query(Question).filter(Question.discipline == "Neurology").all()
+    assert sorted(q.content for q in stored) == ["Question 1", "Question 2"]
+    assert all(q.difficulty == "Hard" and q.question_type == "diagnosis" for q in stored)
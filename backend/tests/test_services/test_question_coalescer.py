@@ -0,0 +1,175 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.models import Question
+from backend.services.question_coalescer import QuestionCoalescer, QuestionShortfall
+
+class BlockingGenerator:
+    """Records calls and holds every flight until released"""
+
+    def __init__(self, limit=None):
+        self.calls = []
+        self.release = threading.Event()
+        self.limit = limit
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def __call__(self, specialty, difficulty, count):
+        with self._lock:
+            self.calls.append(count)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        self.release.wait(5)
+        with self._lock:
+            self.active -= 1
+            number = len(self.calls)
+        produced = count if self.limit is None else min(count, self.limit)
+        return [Question(content=f"{specialty} flight {number} question {i}") for i in range(produced)]
+
+def _coalescer(generator, fan_out=2):
+    coalescer = QuestionCoalescer(generator=generator)
+    coalescer.enabled = True
+    coalescer.fan_out = fan_out
+    coalescer.max_batch = 10
+    coalescer.window = 0.05
+    coalescer.wait_timeout = 5
+    return coalescer
+
+def test_burst_is_bounded_by_fan_out_and_gets_distinct_questions():
+    generator = BlockingGenerator()
+    coalescer = _coalescer(generator, fan_out=2)
+
+    futures = [coalescer.submit("Cardiology", "Intermediate") for _ in range(12)]
+    generator.release.set()
+    questions = [future.result(timeout=5) for future in futures]
+
+    assert generator.max_active <= 2
+    assert sum(generator.calls) == 12
+    assert len(generator.calls) < 12
+    assert len({id(question) for question in questions}) == 12
+
+    stats = coalescer.stats()
+    assert stats["requests"] == 12
+    assert stats["coalesced"] == 12 - stats["flights"]
+    coalescer.shutdown()
+
+def test_sync_and_async_callers_share_flights():
+    generator = BlockingGenerator()
+    generator.release.set()
+    coalescer = _coalescer(generator, fan_out=1)
+
+    async def burst():
+        return await asyncio.gather(*[coalescer.generate_async("Neurology", "Advanced") for _ in range(3)])
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        sync_results = [pool.submit(coalescer.generate, "Neurology", "Advanced") for _ in range(3)]
+        async_results = asyncio.run(burst())
+        results = [future.result() for future in sync_results] + list(async_results)
+
+    assert len(results) == 6
+    assert sum(generator.calls) == 6
+    assert coalescer.stats()["coalesced"] > 0
+    coalescer.shutdown()
+
+def test_short_batches_requeue_and_failures_propagate():
+    generator = BlockingGenerator(limit=2)
+    generator.release.set()
+    coalescer = _coalescer(generator, fan_out=1)
+
+    futures = [coalescer.submit("Surgery", "Easy") for _ in range(5)]
+    assert all(future.result(timeout=5) is not None for future in futures)
+
+    def failing(specialty, difficulty, count):
+        raise RuntimeError("provider down")
+
+    coalescer.generator = failing
+    with pytest.raises(RuntimeError):
+        coalescer.generate("Surgery", "Easy")
+    assert coalescer.stats()["failures"] == 1
+    coalescer.shutdown()
+
+def test_empty_flight_raises_shortfall():
+    coalescer = _coalescer(lambda specialty, difficulty, count: [], fan_out=1)
+    with pytest.raises(QuestionShortfall):
+        coalescer.generate("Surgery", "Easy")
+    coalescer.shutdown()
+
+def test_cancelled_waiter_does_not_pin_the_pair():
+    generator = BlockingGenerator()
+    coalescer = _coalescer(generator, fan_out=1)
+
+    async def abandoned():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(coalescer.generate_async("Oncology", "Advanced"), timeout=0.01)
+
+    asyncio.run(abandoned())
+    generator.release.set()
+
+    assert coalescer.generate("Oncology", "Advanced") is not None
+    assert coalescer.stats()["in_flight"] == {}
+    coalescer.shutdown()
+
+def test_async_flights_await_the_async_generator_and_stop_when_abandoned():
+    def sync_generator(specialty, difficulty, count):
+        raise AssertionError("async callers must not fly on a thread")
+
+    started, cancelled = [], []
+
+    async def async_generator(specialty, difficulty, count):
+        started.append(threading.current_thread())
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(count)
+            raise
+        return []
+
+    coalescer = _coalescer(sync_generator, fan_out=1)
+    coalescer.async_generator = async_generator
+
+    async def abandon():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(coalescer.generate_async("Oncology", "Advanced"), timeout=0.1)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(abandon())
+    assert started == [threading.main_thread()]
+    assert cancelled == [1]
+    assert coalescer.stats()["abandoned"] == 1
+    assert coalescer.stats()["in_flight"] == {}
+
+def test_timed_out_sync_waiter_is_detached_and_its_question_goes_to_the_next():
+    generator = BlockingGenerator()
+    coalescer = _coalescer(generator, fan_out=1)
+    coalescer.window = 0
+    coalescer.wait_timeout = 0.05
+
+    with pytest.raises(TimeoutError):
+        coalescer.generate("Surgery", "Easy")
+    queued = coalescer.submit("Surgery", "Easy")
+    generator.release.set()
+
+    assert queued.result(timeout=5).content == "Surgery flight 1 question 0"
+    assert generator.calls == [1]
+    coalescer.shutdown()
+
+def test_slow_pairs_do_not_hold_up_other_pairs():
+    release = threading.Event()
+
+    def generator(specialty, difficulty, count):
+        if specialty.startswith("Slow"):
+            release.wait(5)
+        return [Question(content=specialty) for _ in range(count)]
+
+    coalescer = _coalescer(generator)
+    slow = [coalescer.submit(f"Slow {i}", "Easy") for i in range(12)]
+    try:
+        assert coalescer.generate("Cardiology", "Easy").content == "Cardiology"
+    finally:
+        release.set()
+    assert all(future.result(timeout=5) for future in slow)
+    coalescer.shutdown()
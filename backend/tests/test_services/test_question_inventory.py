@@ -0,0 +1,123 @@
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Question
+from backend.services.question_inventory import QuestionInventory
+
+def _make_inventory(db_session, generator=None):
+    inventory = QuestionInventory(
+        generator=generator,
+        session_factory=sessionmaker(bind=db_session.bind)
+    )
+    inventory.enabled = True
+    inventory.low_watermark = 2
+    inventory.high_watermark = 3
+    return inventory
+
+def _stocked_question(specialty="Cardiology", difficulty="Intermediate"):
+    return Question(
+        content=f"Stocked {specialty} question",
+        discipline=specialty,
+        difficulty=difficulty,
+        correct_answer="A",
+        in_inventory=True
+    )
+
+def test_claim_takes_stocked_question_once(db_session):
+    inventory = _make_inventory(db_session)
+    stocked = _stocked_question()
+    db_session.add(stocked)
+    db_session.commit()
+
+    claimed = inventory.claim(db_session, "Cardiology", "Intermediate")
+    assert claimed is not None
+    assert claimed.id == stocked.id
+    assert claimed.in_inventory is False
+
+    assert inventory.claim(db_session, "Cardiology", "Intermediate") is None
+
+    stats = inventory.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_claim_matches_specialty_and_difficulty(db_session):
+    inventory = _make_inventory(db_session)
+    db_session.add(_stocked_question(difficulty="Advanced"))
+    db_session.commit()
+
+    assert inventory.claim(db_session, "Cardiology", "Intermediate") is None
+    assert inventory.claim(db_session, "Cardiology", "Advanced") is not None
+
+def test_refill_tops_up_to_high_watermark(db_session):
+    generated = []
+
+    def generator(specialty, difficulty):
+        generated.append((specialty, difficulty))
+        return Question(content="Generated question", correct_answer="B")
+
+    inventory = _make_inventory(db_session, generator=generator)
+    inventory.register_pair("Neurology", "Basic")
+    inventory.check_levels()
+
+    assert len(generated) == 3
+    stocked = db_session.query(Question).filter(
+        Question.in_inventory == True,
+        Question.discipline == "Neurology",
+        Question.difficulty == "Basic"
+    ).count()
+    assert stocked == 3
+
+    # Above the low watermark nothing more is generated
+    inventory.check_levels()
+    assert len(generated) == 3
+    assert inventory.stats()["generated"] == 3
+
+def test_refill_stops_on_generation_failure(db_session):
+    def generator(specialty, difficulty):
+        raise RuntimeError("LLM unavailable")
+
+    inventory = _make_inventory(db_session, generator=generator)
+    assert inventory.refill("Neurology", "Basic") == 0
+    assert inventory.stats()["generation_failures"] == 1
+
+def test_claims_only_register_allowed_pairs_and_idle_pairs_are_dropped(db_session):
+    inventory = _make_inventory(db_session)
+    now = [1000.0]
+    inventory._clock = lambda: now[0]
+    inventory.pair_idle_seconds = 60
+
+    inventory.claim(db_session, "Cardiology", "Intermediate")
+    inventory.claim(db_session, "'; DROP TABLE questions; --", "Intermediate")
+    inventory.claim(db_session, "Cardiology", "Impossible")
+    assert [(p["specialty"], p["difficulty"]) for p in inventory.stats()["pairs"]] == [("Cardiology", "Intermediate")]
+
+    now[0] += 61
+    inventory.check_levels()
+    assert inventory.stats()["pairs"] == []
+
+def test_configured_pairs_are_stocked_only_once_the_bank_runs_dry(db_session, monkeypatch):
+    generated = []
+
+    def generator(specialty, difficulty):
+        generated.append((specialty, difficulty))
+        return Question(content="Generated question", correct_answer="B")
+
+    monkeypatch.setenv("QUESTION_INVENTORY_PAIRS", "Neurology:Basic")
+    inventory = _make_inventory(db_session, generator=generator)
+    now = [1000.0]
+    inventory._clock = lambda: now[0]
+    inventory.pair_idle_seconds = 60
+
+    inventory.check_levels()
+    assert generated == []
+
+    # Chat claims only after the bank had no unseen question for the user
+    assert inventory.claim(db_session, "Neurology", "Basic") is None
+    inventory.check_levels()
+    assert len(generated) == 3
+
+    now[0] += 61
+    db_session.query(Question).filter(Question.in_inventory == True).delete()
+    db_session.commit()
+    inventory.check_levels()
+    assert len(generated) == 3
+    assert [(p["specialty"], p["difficulty"]) for p in inventory.stats()["pairs"]] == [("Neurology", "Basic")]
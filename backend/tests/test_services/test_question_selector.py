@@ -0,0 +1,68 @@
+import random
+
+from backend.models import Question, Response, User
+from backend.services.question_selector import QuestionSelector
+
+def _selector():
+    selector = QuestionSelector(rng=random.Random(0))
+    selector.enabled = True
+    return selector
+
+def _bank_question(db_session, question_type="diagnosis", specialty="Cardiology", difficulty="Intermediate", **kwargs):
+    question = Question(content=f"{specialty} {question_type} question", discipline=specialty, difficulty=difficulty,
+                        correct_answer="A", question_type=question_type, **kwargs)
+    db_session.add(question)
+    db_session.commit()
+    return question
+
+def _answer(db_session, user, question, is_correct):
+    db_session.add(Response(user_id=user.id, question_id=question.id, user_answer="A", is_correct=is_correct))
+    db_session.commit()
+
+def _user(db_session, user_id=501):
+    user = User(id=user_id, email=f"selector-{user_id}@example.com", name="Selector")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+def test_select_skips_answered_questions_until_bank_runs_dry(db_session):
+    selector = _selector()
+    user = _user(db_session)
+    first = _bank_question(db_session)
+    second = _bank_question(db_session)
+    _bank_question(db_session, difficulty="Advanced")
+    _bank_question(db_session, in_inventory=True)
+
+    picked = selector.select(db_session, user.id, "Cardiology", "Intermediate")
+    assert picked.id in (first.id, second.id)
+    _answer(db_session, user, picked, True)
+
+    remaining = selector.select(db_session, user.id, "Cardiology", "Intermediate")
+    assert remaining.id == ({first.id, second.id} - {picked.id}).pop()
+    _answer(db_session, user, remaining, True)
+
+    assert selector.select(db_session, user.id, "Cardiology", "Intermediate") is None
+    assert selector.stats()["exhausted"] == 1
+
+def test_select_targets_weakest_question_type(db_session):
+    selector = _selector()
+    user = _user(db_session, 502)
+    for _ in range(3):
+        _answer(db_session, user, _bank_question(db_session, question_type="treatment"), False)
+        _answer(db_session, user, _bank_question(db_session, question_type="diagnosis"), True)
+
+    unseen_treatment = _bank_question(db_session, question_type="treatment")
+    for _ in range(5):
+        _bank_question(db_session, question_type="diagnosis")
+
+    assert selector.weak_categories(db_session, user.id, "Cardiology") == ["treatment"]
+    assert selector.select(db_session, user.id, "Cardiology", "Intermediate").id == unseen_treatment.id
+    assert selector.stats()["targeted"] == 1
+
+def test_answers_from_other_users_do_not_hide_questions(db_session):
+    selector = _selector()
+    user, other = _user(db_session, 503), _user(db_session, 504)
+    question = _bank_question(db_session, specialty="Neurology")
+    _answer(db_session, other, question, True)
+
+    assert selector.select(db_session, user.id, "Neurology", "Intermediate").id == question.id
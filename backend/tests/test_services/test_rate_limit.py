@@ -0,0 +1,31 @@
+from backend.services.rate_limit import MemoryBucketStore, RateLimitRule, rate_limiter
+
+def test_bucket_allows_burst_then_refills_over_time():
+    store = MemoryBucketStore()
+    assert [store.take("u", 3, 1.0, now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("u", 3, 1.0, now=0.0) == 1.0
+    assert store.take("u", 3, 1.0, now=0.5) == 0.5
+    assert store.take("u", 3, 1.0, now=1.5) == 0.0
+    assert store.take("other", 3, 1.0, now=1.5) == 0.0
+
+def test_bucket_store_evicts_least_recently_used_keys():
+    store = MemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, 1, 1.0, now=0.0)
+    # "a" was evicted, so it starts again from a full bucket
+    assert store.take("a", 1, 1.0, now=0.0) == 0.0
+    assert store.take("c", 1, 1.0, now=0.0) > 0
+
+def test_middleware_limits_each_user_separately(monkeypatch, authenticated_client):
+    monkeypatch.setattr(rate_limiter, "rules", [RateLimitRule("test", "GET", "/api/v1/chat/test", 2, 60)])
+    client, user = authenticated_client
+    auth_headers = {"Authorization": client.headers.pop("Authorization")}
+
+    statuses = [client.get("/api/v1/chat/test", headers=auth_headers).status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+
+    limited = client.get("/api/v1/chat/test", headers=auth_headers)
+    assert int(limited.headers["Retry-After"]) >= 1
+    # Anonymous requests are keyed by client address and get their own bucket
+    assert client.get("/api/v1/chat/test").status_code == 401
+    assert rate_limiter.stats()["limited"] == 2
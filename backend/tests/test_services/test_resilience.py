@@ -0,0 +1,173 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from backend.services.resilience import CircuitBreaker, CircuitOpenError, LLMResilience
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _status_error(status_code):
+    request = httpx.Request("POST", "https://llm.test/chat")
+    response = httpx.Response(status_code, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+def _resilience(threshold=2, clock=None):
+    breaker = CircuitBreaker("test", failure_threshold=threshold, reset_timeout=10, clock=clock or FakeClock())
+    resilience = LLMResilience("test", breaker=breaker)
+    resilience.retry_base = 0
+    resilience.retry_max = 0
+    return resilience
+
+def test_breaker_opens_then_half_open_probe_closes_it():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+
+    clock.now = 11
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_and_slow_calls_count_as_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_success(slow=True)
+    breaker.record_success(slow=True)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 11
+    assert breaker.allow_request() is True
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["slow_calls"] == 2
+
+def test_retries_transient_errors_with_remaining_deadline():
+    resilience = _resilience(threshold=5)
+    timeouts = []
+
+    def flaky(timeout, **kwargs):
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise _status_error(503)
+        return "ok"
+
+    assert resilience.call("evaluate_answer", flaky) == "ok"
+    assert len(timeouts) == 3
+    assert all(0 < timeout <= resilience.deadline("evaluate_answer") for timeout in timeouts)
+    assert resilience.breaker.state == CircuitBreaker.CLOSED
+
+def test_client_errors_are_not_retried_and_do_not_trip_breaker():
+    resilience = _resilience(threshold=1)
+    calls = []
+
+    def bad_request(timeout, **kwargs):
+        calls.append(timeout)
+        raise _status_error(400)
+
+    with pytest.raises(openai.APIStatusError):
+        resilience.call("evaluate_answer", bad_request)
+    assert len(calls) == 1
+    assert resilience.available()
+
+def test_open_breaker_fails_fast_without_calling_provider():
+    resilience = _resilience(threshold=1)
+    calls = []
+
+    async def down(timeout, **kwargs):
+        calls.append(timeout)
+        raise _status_error(500)
+
+    with pytest.raises(openai.APIStatusError):
+        asyncio.run(resilience.call_async("generate_question", down))
+    assert len(calls) == 1  # the breaker opened, so no retry was attempted
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilience.call_async("generate_question", down))
+    assert len(calls) == 1
+    assert not resilience.available()
+
+def test_cancelled_probe_releases_its_slot():
+    clock = FakeClock()
+    resilience = _resilience(threshold=1, clock=clock)
+    resilience.breaker.record_failure()
+    clock.now = 11
+
+    async def hangs(timeout, **kwargs):
+        await asyncio.sleep(10)
+
+    async def abandon():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(resilience.call_async("generate_question", hangs), timeout=0.01)
+
+    asyncio.run(abandon())
+    assert resilience.breaker.state == CircuitBreaker.HALF_OPEN
+    assert resilience.breaker.allow_request() is True
+
+def test_stuck_probe_reopens_after_probe_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, probe_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now = 11
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    clock.now = 41
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now = 51
+    assert breaker.allow_request() is True
+
+def _chunk_stream(chunks, error=None):
+    async def create(timeout, **kwargs):
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+            if error is not None:
+                raise error
+        return stream()
+    return create
+
+def test_streams_that_break_off_mid_way_trip_the_breaker():
+    resilience = _resilience(threshold=2)
+
+    async def read(create):
+        return [chunk async for chunk in resilience.stream_async("stream_feedback", create)]
+
+    for _ in range(2):
+        with pytest.raises(openai.APIConnectionError):
+            asyncio.run(read(_chunk_stream(["Not ", "quite"], openai.APIConnectionError(request=httpx.Request("POST", "https://llm.test")))))
+    assert resilience.breaker.state == CircuitBreaker.OPEN
+    assert resilience.breaker.stats()["successes"] == 0
+
+def test_stream_outcome_is_recorded_when_it_ends():
+    clock = FakeClock()
+    resilience = _resilience(threshold=1, clock=clock)
+    resilience.breaker.record_failure()
+    clock.now = 11
+
+    async def read_one_then_stop():
+        stream = resilience.stream_async("stream_feedback", _chunk_stream(["Not ", "quite"]))
+        assert await stream.__anext__() == "Not "
+        # The probe is still out while the stream is being read
+        assert resilience.breaker.allow_request() is False
+        await stream.aclose()
+
+    asyncio.run(read_one_then_stop())
+    assert resilience.breaker.state == CircuitBreaker.HALF_OPEN
+
+    async def read_all():
+        return [chunk async for chunk in resilience.stream_async("stream_feedback", _chunk_stream(["Not ", "quite"]))]
+
+    assert asyncio.run(read_all()) == ["Not ", "quite"]
+    assert resilience.breaker.state == CircuitBreaker.CLOSED
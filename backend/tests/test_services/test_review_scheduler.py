@@ -0,0 +1,53 @@
+import datetime
+
+from backend.models import Question, ReviewCard, User
+from backend.services.review_scheduler import ReviewScheduler, sm2
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+def _setup(db_session, user_id=601, questions=2):
+    db_session.add(User(id=user_id, email=f"review-{user_id}@example.com", name="Reviewer"))
+    rows = [Question(content=f"Review question {i}", correct_answer="A") for i in range(questions)]
+    db_session.add_all(rows)
+    db_session.commit()
+    return user_id, rows
+
+def test_sm2_grows_intervals_and_resets_on_lapse():
+    state = (0, 0.0, 2.5)
+    intervals = []
+    for _ in range(3):
+        state = sm2(*state, quality=4, lapse_interval_days=0.01)
+        intervals.append(state[1])
+    assert intervals == [1.0, 6.0, 15.0]
+
+    repetitions, interval, ease = sm2(*state, quality=1, lapse_interval_days=0.01)
+    assert (repetitions, interval) == (0, 0.01)
+    assert 1.3 <= ease < state[2]
+
+def test_record_answer_creates_and_updates_one_card(db_session):
+    scheduler = ReviewScheduler()
+    user_id, (question, _) = _setup(db_session)
+
+    scheduler.record_answer(db_session, user_id, question.id, False, now=NOW)
+    scheduler.record_answer(db_session, user_id, question.id, True, now=NOW)
+    db_session.commit()
+
+    card = db_session.query(ReviewCard).filter_by(user_id=user_id, question_id=question.id).one()
+    assert card.lapses == 1
+    assert card.repetitions == 1
+    assert card.due_at == NOW + datetime.timedelta(days=1)
+
+def test_pop_due_serves_missed_questions_once(db_session):
+    scheduler = ReviewScheduler()
+    user_id, (missed, known) = _setup(db_session, user_id=602)
+    scheduler.record_answer(db_session, user_id, missed.id, False, now=NOW)
+    scheduler.record_answer(db_session, user_id, known.id, True, now=NOW)
+    db_session.commit()
+
+    assert scheduler.pop_due(db_session, user_id, limit=5, now=NOW) == []
+
+    later = NOW + datetime.timedelta(minutes=15)
+    due = scheduler.pop_due(db_session, user_id, limit=5, now=later)
+    assert [question.id for question in due] == [missed.id]
+    # Leased until answered again
+    assert scheduler.pop_due(db_session, user_id, limit=5, now=later) == []
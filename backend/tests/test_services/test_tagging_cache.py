@@ -0,0 +1,117 @@
+import json
+
+from backend.cli import backfill_tags
+from backend.models import Question
+from backend.services.tagging_service import QuestionTaggingService, TaggingBackend
+
+class CountingBackend(TaggingBackend):
+    def __init__(self, fail=False):
+        self.calls = []
+        self.batches = []
+        self.fail = fail
+
+    def tag_question(self, question_content, question_options):
+        self.calls.append(question_content)
+        if self.fail:
+            raise RuntimeError("backend down")
+        return {"disciplines": ["pharmacology"], "question_type": "treatment"}
+
+    def tag_questions(self, questions):
+        self.batches.append([content for content, _ in questions])
+        return super().tag_questions(questions)
+
+def _service(backend):
+    service = QuestionTaggingService("local_llm")
+    service.backend = backend
+    return service
+
+def test_identical_content_is_tagged_once():
+    backend = CountingBackend()
+    service = _service(backend)
+
+    first = service.tag_question("What is the  treatment?", {"B": "Beta", "A": "Alpha"})
+    first["disciplines"].append("mutated")
+    second = service.tag_question("what is the treatment?", {"A": "alpha", "B": "beta"})
+
+    assert backend.calls == ["What is the  treatment?"]
+    assert second["disciplines"] == ["pharmacology"]
+
+def test_failures_are_not_cached():
+    backend = CountingBackend(fail=True)
+    service = _service(backend)
+
+    assert service.tag_question("Q", {})["disciplines"] == ["general_medicine"]
+    service.tag_question("Q", {})
+    assert len(backend.calls) == 2
+
+def test_tag_questions_sends_only_misses_in_one_batch():
+    backend = CountingBackend()
+    service = _service(backend)
+    service.tag_question("Q1", {})
+
+    results = service.tag_questions([("Q1", {}), ("Q2", {}), ("Q3", None)])
+
+    assert backend.batches == [["Q2", "Q3"]]
+    assert [tags["question_type"] for tags in results] == ["treatment"] * 3
+
+def test_only_freshly_tagged_questions_carry_tokens_to_charge():
+    class MeteredBackend(CountingBackend):
+        def tag_question(self, question_content, question_options):
+            return {**super().tag_question(question_content, question_options), "tokens_used": 120}
+
+    service = _service(MeteredBackend())
+
+    assert service.tag_question("Q", {})["tokens_used"] == 120
+    assert "tokens_used" not in service.tag_question("Q", {})
+    assert [tags.get("tokens_used") for tags in service.tag_questions([("Q", {}), ("Q2", {})])] == [None, 120]
+
+def test_backfill_tags_untagged_rows_and_resumes(db_session, tmp_path, monkeypatch):
+    service = _service(CountingBackend())
+    monkeypatch.setattr(backfill_tags, "get_tagging_service", lambda: service)
+
+    untagged = [Question(content=f"Untagged question {n}", options=json.dumps({"A": "x"})) for n in range(5)]
+    tagged = Question(content="Already tagged", disciplines='["anatomy"]', question_type="anatomy")
+    db_session.add_all(untagged + [tagged])
+    db_session.commit()
+
+    checkpoint = tmp_path / "checkpoint"
+    first = backfill_tags.backfill(db_session, chunk_size=2, batch_size=2, concurrency=2, checkpoint=checkpoint, limit=3)
+    assert first["tagged"] == 3
+    assert backfill_tags.read_checkpoint(checkpoint) == untagged[2].id
+
+    second = backfill_tags.backfill(db_session, chunk_size=2, batch_size=2, concurrency=2, checkpoint=checkpoint)
+    assert second["tagged"] == 2
+
+    db_session.expire_all()
+    assert all(json.loads(q.disciplines) == ["pharmacology"] for q in untagged)
+    assert all(q.question_type == "treatment" for q in untagged)
+    assert tagged.disciplines == '["anatomy"]'
+
+def test_backfill_leaves_rows_the_backend_fails_on_untagged(db_session, tmp_path, monkeypatch):
+    class FlakyBackend(CountingBackend):
+        def tag_question(self, question_content, question_options):
+            if "flaky" in question_content:
+                raise RuntimeError("backend down")
+            return super().tag_question(question_content, question_options)
+
+    service = _service(FlakyBackend())
+    monkeypatch.setattr(backfill_tags, "get_tagging_service", lambda: service)
+
+    questions = [Question(content=f"Question {n}" + (" flaky" if n == 1 else "")) for n in range(4)]
+    db_session.add_all(questions)
+    db_session.commit()
+
+    checkpoint = tmp_path / "checkpoint"
+    report = backfill_tags.backfill(db_session, chunk_size=2, batch_size=2, concurrency=1, checkpoint=checkpoint)
+    assert (report["tagged"], report["failed"]) == (3, 1)
+    assert backfill_tags.read_checkpoint(checkpoint) == questions[1].id - 1
+
+    db_session.expire_all()
+    assert questions[1].disciplines in (None, "", "[]") and questions[1].question_type is None
+    assert questions[3].question_type == "treatment"
+
+    service.backend = CountingBackend()
+    retry = backfill_tags.backfill(db_session, chunk_size=2, batch_size=2, concurrency=1, checkpoint=checkpoint)
+    assert (retry["tagged"], retry["failed"]) == (1, 0)
+    db_session.expire_all()
+    assert questions[1].question_type == "treatment"
@@ -0,0 +1,81 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import DailyUsageRollup, Question, Response, User
+from backend.services.usage_rollup import HyperLogLog, UsageRollup
+
+TODAY = date(2026, 3, 10)
+
+def _at(days_ago, hour=12):
+    return datetime.combine(TODAY - timedelta(days=days_ago), datetime.min.time()) + timedelta(hours=hour)
+
+def _seed(db_session):
+    db_session.add_all([User(id=uid, email=f"usage-{uid}@example.com", name="Usage") for uid in (901, 902, 903)])
+    cardio = Question(content="Cardio", discipline="Cardiology")
+    neuro = Question(content="Neuro", discipline="Neurology")
+    db_session.add_all([cardio, neuro])
+    db_session.commit()
+    answers = [
+        (901, cardio, 0), (901, cardio, 0), (902, neuro, 0),
+        (901, neuro, 1), (903, cardio, 1),
+        (902, cardio, 5),
+        (903, neuro, 40),  # Outside a 30-day window
+    ]
+    db_session.add_all([
+        Response(user_id=uid, question_id=q.id, user_answer="A", is_correct=True, created_at=_at(days_ago))
+        for uid, q, days_ago in answers
+    ])
+    db_session.commit()
+
+def test_system_stats_sum_daily_rows_and_merge_distinct_users(db_session):
+    _seed(db_session)
+    rollup = UsageRollup(session_factory=sessionmaker(bind=db_session.bind))
+    rollup.backfill_days = 7
+
+    # A read never computes rows itself; it reports the gap and hands the window to the job
+    empty = rollup.system_stats(db_session, 30, today=TODAY)
+    assert (empty["total_questions_answered"], empty["missing_days"]) == (0, 30)
+    assert db_session.query(DailyUsageRollup).count() == 0
+
+    assert rollup.run_once(today=TODAY) == 30
+    stats = rollup.system_stats(db_session, 30, today=TODAY)
+    assert stats["missing_days"] == 0
+    assert stats["active_users"] == 3
+    assert stats["total_questions_answered"] == 6
+    assert stats["avg_questions_per_user"] == 2.0
+    assert stats["popular_specialties"] == [
+        {"specialty": "Cardiology", "usage_count": 4},
+        {"specialty": "Neurology", "usage_count": 2}
+    ]
+
+    today_only = rollup.system_stats(db_session, 1, today=TODAY)
+    assert (today_only["active_users"], today_only["total_questions_answered"]) == (2, 3)
+
+def test_refresh_recomputes_recent_days_and_only_backfills_missing_ones(db_session):
+    _seed(db_session)
+    rollup = UsageRollup(session_factory=lambda: db_session)
+
+    assert rollup.refresh(db_session, TODAY, backfill_days=7) == 7
+    assert rollup.refresh(db_session, TODAY, backfill_days=7) == 2
+
+    late = Response(user_id=902, question_id=db_session.query(Question.id).first()[0], user_answer="B",
+                    is_correct=False, created_at=_at(1, hour=23))
+    db_session.add(late)
+    db_session.commit()
+    rollup.refresh(db_session, TODAY, backfill_days=7)
+    yesterday = db_session.get(DailyUsageRollup, TODAY - timedelta(days=1))
+    assert (yesterday.active_users, yesterday.answers) == (3, 3)
+
+def test_hyperloglog_merge_estimates_union():
+    first, second = HyperLogLog(), HyperLogLog()
+    for value in range(0, 6000):
+        first.add(value)
+    for value in range(4000, 10000):
+        second.add(value)
+
+    expected = bytearray(max(a, b) for a, b in zip(first.registers, second.registers))
+    union = HyperLogLog.union([first.to_bytes(), second.to_bytes()])
+    first.merge(HyperLogLog.from_bytes(second.to_bytes()))
+    assert first.registers == union.registers == expected
+    assert abs(first.count() - 10000) < 500
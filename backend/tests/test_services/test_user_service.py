@@ -1,6 +1,6 @@
-from backend.services.user_service import get_or_create_user_from_identity
+from backend.services.user_service import RosterProvisioner, get_or_create_user_from_identity
 from backend.tests.factories import UserFactory, IdentityFactory
-from backend.models import User, Identity
+from backend.models import User, Identity, SSOConfiguration
 
 def test_creates_new_user_and_identity(db_session):
     user_count = db_session.query(User).count()
@@ -59,4 +59,33 @@ def test_links_new_identity_to_existing_user_by_email(db_session):
     assert db_session.query(Identity).count() == identity_count + 1
     assert user.id == existing_user.id
     assert len(user.identities) == 1
-    assert user.identities[0].provider == "github"
\ No newline at end of file
+    assert user.identities[0].provider == "github"
+
+def test_roster_links_existing_user_regardless_of_email_case(db_session):
+    sso_config = SSOConfiguration(institution_name="Partner University", domain="partner.edu", is_active=True)
+    existing = User(email="Jane@Partner.edu", name="Jane")
+    db_session.add_all([sso_config, existing])
+    db_session.commit()
+    user_count = db_session.query(User).count()
+
+    provisioner = RosterProvisioner(db_session, sso_config)
+    for batch in provisioner.feed(b"email,name,external_id\njane@partner.edu,Jane,s-9\n") + provisioner.finish():
+        provisioner.provision(batch)
+
+    assert (provisioner.counts["created"], provisioner.counts["linked"]) == (0, 1)
+    assert db_session.query(User).count() == user_count
+    identity = db_session.query(Identity).filter(Identity.provider_user_id == "partner.edu:s-9").one()
+    assert identity.user_id == existing.id
+
+def test_roster_csv_fields_may_span_chunks_and_lines():
+    provisioner = RosterProvisioner(None, SSOConfiguration(domain="partner.edu"))
+    roster = b'email,name,external_id\r\nann@partner.edu,"Smith, Ann ""Annie""\nMD",s-1\r\nbad@elsewhere.org,Bad,s-2\nbo@partner.edu,Bo,s-3'
+
+    batches = [batch for i in range(0, len(roster), 7) for batch in provisioner.feed(roster[i:i + 7])]
+    rows = [row for batch in batches + provisioner.finish() for row in batch]
+
+    assert [(row["name"], row["provider_user_id"]) for row in rows] == [
+        ('Smith, Ann "Annie"\nMD', "partner.edu:s-1"),
+        ("Bo", "partner.edu:s-3"),
+    ]
+    assert provisioner.errors == ["line 4: email not in domain partner.edu"]